@@ -0,0 +1,109 @@
+# 基准测试 - 提示的调用方阻塞时间、投递延迟与重叠播放
+#
+# 按突发生成一串“判断为是”的提示（每次突发若干条，间隔很短），比较：
+#   legacy        每条提示都初始化 mixer 并从磁盘解码提示音（用 --init-cost 模拟），在调用线程中完成；
+#   service       AlertService，通道只打开一次，后台投递，不限速（min_interval 0）；
+#   service+limit AlertService，两次投递至少间隔 --min-interval 秒，间隔内的提示合并。
+# 统计：调用方（流水线 alert 阶段）阻塞时间、投递延迟、实际播放次数，以及与上一次播放重叠
+# （间隔短于提示音长度 --sound-length）的次数。
+# 用法: python benchmarks/bench_alerts.py [--bursts 20] [--burst-size 5] [--init-cost 0.15] [--min-interval 1]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.pipeline import percentile
+from services.alert_service import AlertService, NullSink
+from utils.logger import LOGGER
+
+LOGGER.remove()
+
+
+class SimulatedSoundSink(NullSink):
+    """打开时模拟一次 mixer 初始化与解码，投递只记录播放时间"""
+    name = "sound"
+
+    def __init__(self, init_cost: float):
+        super().__init__()
+        self.init_cost = init_cost
+
+    def open(self) -> None:
+        time.sleep(self.init_cost)
+
+
+def arrivals(rng: random.Random, bursts: int, burst_size: int, gap: float, spread: float):
+    """每次突发 burst_size 条、相邻两条间隔 0-spread 秒，突发之间间隔约 gap 秒"""
+    delays = []
+    for _ in range(bursts):
+        delays.append(rng.uniform(0.5, 1.5) * gap)
+        delays.extend(rng.uniform(0, spread) for _ in range(burst_size - 1))
+    return delays
+
+
+def run_legacy(delays, init_cost: float):
+    blocked, plays = [], []
+    for delay in delays:
+        time.sleep(delay)
+        start = time.monotonic()
+        time.sleep(init_cost)  # mixer.init() + Sound("alert.wav")
+        plays.append(time.monotonic())
+        blocked.append(time.monotonic() - start)
+    # 在调用线程中播放：投递延迟即阻塞时间
+    return blocked, plays, list(blocked)
+
+
+def run_service(delays, init_cost: float, min_interval: float):
+    sink = SimulatedSoundSink(init_cost)
+    service = AlertService([sink], min_interval=min_interval)
+    service.wait_ready()
+    blocked = []
+    for delay in delays:
+        time.sleep(delay)
+        start = time.monotonic()
+        service.notify("bench", "alert")
+        blocked.append(time.monotonic() - start)
+    service.flush()
+    service.close()
+    plays = [delivered for _, delivered in sink.delivered]
+    latencies = [delivered - alert.queued for alert, delivered in sink.delivered]
+    return blocked, plays, latencies
+
+
+def overlaps(plays, sound_length: float) -> int:
+    return sum(1 for a, b in zip(plays, plays[1:]) if b - a < sound_length)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alert delivery benchmark")
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--burst-size", type=int, default=5)
+    parser.add_argument("--gap", type=float, default=1.0, help="mean seconds between bursts")
+    parser.add_argument("--spread", type=float, default=0.1, help="max seconds between alerts in a burst")
+    parser.add_argument("--init-cost", type=float, default=0.15, help="simulated mixer init + wav decode seconds")
+    parser.add_argument("--sound-length", type=float, default=1.0, help="alert sound duration in seconds")
+    parser.add_argument("--min-interval", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    delays = arrivals(random.Random(args.seed), args.bursts, args.burst_size, args.gap, args.spread)
+    print(f"{len(delays)} alerts in {args.bursts} bursts, init cost {args.init_cost * 1000:.0f}ms, "
+          f"sound length {args.sound_length}s")
+    print(f"{'mode':<16}{'blocked p50':>12}{'blocked p95':>12}{'latency p50':>12}{'latency p95':>12}"
+          f"{'plays':>7}{'overlaps':>10}")
+    runs = [
+        ("legacy", run_legacy(delays, args.init_cost)),
+        ("service", run_service(delays, args.init_cost, 0.0)),
+        (f"service+{args.min_interval:g}s", run_service(delays, args.init_cost, args.min_interval)),
+    ]
+    for name, (blocked, plays, latencies) in runs:
+        print(f"{name:<16}{percentile(sorted(blocked), 50) * 1000:>10.2f}ms{percentile(sorted(blocked), 95) * 1000:>10.2f}ms"
+              f"{percentile(sorted(latencies), 50) * 1000:>10.1f}ms{percentile(sorted(latencies), 95) * 1000:>10.1f}ms"
+              f"{len(plays):>7}{overlaps(plays, args.sound_length):>10}")
+
+
+if __name__ == "__main__":
+    main()
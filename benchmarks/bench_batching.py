@@ -0,0 +1,105 @@
+# 基准测试 - AI判断请求的微批处理
+#
+# 启动本地模拟 /chat/completions 接口（固定往返延迟），按泊松过程向 AsyncDashscopeAnalyzer 提交消息，
+# 比较逐条请求与 BatchingAnalyzer 合并请求的：请求数、发送的字符数（系统提示词只发一次）、
+# 每条消息的判断延迟分位数与总耗时。--garble 让一部分批量响应无法解析，以验证退回单条请求。
+# 用法: python benchmarks/bench_batching.py [--messages 64] [--rate 20] [--latency 0.4] [--max-batch 8] [--max-wait 0.1]
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests"))
+
+from core.ai_analyzer import AsyncDashscopeAnalyzer
+from core.batch_analyzer import BatchingAnalyzer
+from core.pipeline import percentile
+from stub_chat_server import StubChatServer
+from utils.logger import LOGGER
+
+LOGGER.remove()
+
+PROMPT = ("The above is part of the chat record. Based on this, please guess whether Python should be used "
+          "to solve the content description in the text? Please answer 'yes', 'no' or 'not sure'.")
+RECORD = re.compile(r"^### Record (\d+)\n", re.MULTILINE)
+
+
+def verdict(text: str) -> str:
+    return "yes" if hashlib.md5(text.encode("utf-8")).digest()[0] < 50 else "no"
+
+
+def make_reply(garble: float, seed: int):
+    rng = random.Random(seed)
+
+    def reply(messages):
+        content = messages[-1]["content"]
+        parts = RECORD.split(content)
+        if len(parts) == 1:
+            return verdict(content)
+        if rng.random() < garble:
+            return "Sure! Here are the results: 1. yes 2. no"
+        records = [(int(parts[i]), parts[i + 1].strip()) for i in range(1, len(parts), 2)]
+        return json.dumps({"results": [{"id": i, "answer": verdict(text)} for i, text in records]})
+    return reply
+
+
+async def run(analyzer, texts, rate, seed):
+    rng = random.Random(seed)
+    latencies, results = [], {}
+
+    async def one(text):
+        start = time.perf_counter()
+        results[text] = await analyzer.analyze_text(text, PROMPT)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    tasks = []
+    for text in texts:
+        tasks.append(asyncio.create_task(one(text)))
+        await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    await analyzer.aclose()
+    return sorted(latencies), elapsed, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM micro-batching benchmark against a local stub server")
+    parser.add_argument("--messages", type=int, default=64)
+    parser.add_argument("--rate", type=float, default=20, help="mean messages per second")
+    parser.add_argument("--latency", type=float, default=0.4, help="stub round-trip seconds per request")
+    parser.add_argument("--concurrency", type=int, default=4, help="ai.max_concurrency")
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait", type=float, default=0.1)
+    parser.add_argument("--garble", type=float, default=0.0, help="fraction of batch replies that are not JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    texts = [f"张伟 10:{i % 60:02d}\n消息 {i}：每天要把表格合并成一个，能不能自动处理？" for i in range(args.messages)]
+    print(f"{args.messages} messages at {args.rate:g}/s, stub latency {args.latency}s, "
+          f"concurrency {args.concurrency}, max_batch {args.max_batch}, max_wait {args.max_wait}s")
+    print(f"{'mode':<10}{'requests':>9}{'sent kB':>9}{'p50 ms':>9}{'p95 ms':>9}{'total s':>9}{'correct':>9}")
+    for mode in ("single", "batched"):
+        with StubChatServer(reply=make_reply(args.garble, args.seed), latency=args.latency) as server:
+            analyzer = AsyncDashscopeAnalyzer(api_key="bench", base_url=server.base_url,
+                                              max_concurrency=args.concurrency, max_connections=args.concurrency)
+            if mode == "batched":
+                analyzer = BatchingAnalyzer(analyzer, args.max_batch, args.max_wait)
+            latencies, elapsed, results = asyncio.run(run(analyzer, texts, args.rate, args.seed))
+            sent = sum(len(m["content"].encode("utf-8")) for r in server.requests for m in r["messages"])
+            correct = sum(results[text] == verdict(text) for text in texts)
+            print(f"{mode:<10}{len(server.requests):>9}{sent / 1000:>9.1f}{percentile(latencies, 50) * 1000:>9.0f}"
+                  f"{percentile(latencies, 95) * 1000:>9.0f}{elapsed:>9.2f}{correct:>9}")
+            if mode == "batched":
+                print(f"batching: {analyzer.stats()}")
+
+
+if __name__ == "__main__":
+    main()
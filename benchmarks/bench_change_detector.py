@@ -0,0 +1,112 @@
+# 基准测试 - 变化检测
+#
+# 对比旧版 ChatMonitor.check_updates（RGB→BGR→absdiff→GRAY→count_nonzero）
+# 与 ChangeDetector 的单帧耗时和内存分配。
+# 用法: python benchmarks/bench_change_detector.py [--frames 2000] [--change-every 20]
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.change_detector import ChangeDetector
+from utils.logger import LOGGER
+
+# 关闭日志输出，避免日志开销干扰计时
+LOGGER.remove()
+
+WIDTH, HEIGHT = 330, 150
+THRESHOLD = 5000
+
+
+class LegacyDetector:
+    """旧版 ChatMonitor.check_updates 的检测部分（不含防抖）"""
+
+    def __init__(self, change_threshold):
+        self.previous_screenshot = None
+        self.change_threshold = change_threshold
+
+    def detect(self, image):
+        screenshot_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+        if self.previous_screenshot is None:
+            self.previous_screenshot = screenshot_cv
+            return False
+        diff = cv2.absdiff(screenshot_cv, self.previous_screenshot)
+        gray_diff = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
+        if np.count_nonzero(gray_diff) > self.change_threshold:
+            self.previous_screenshot = screenshot_cv
+            return True
+        return False
+
+
+def make_frames(count, change_every):
+    """生成模拟聊天框帧：静止背景，每 change_every 帧出现一个新气泡"""
+    rng = np.random.default_rng(0)
+    base = np.full((HEIGHT, WIDTH, 3), 245, dtype=np.uint8)
+    frames = []
+    current = base.copy()
+    for i in range(count):
+        if i and i % change_every == 0:
+            current = np.roll(current, -30, axis=0)
+            current[-30:] = 245
+            current[-26:-4, 20:20 + int(rng.integers(80, 300))] = rng.integers(0, 120, 3)
+        frames.append(Image.fromarray(current, "RGB"))
+    return frames
+
+
+def run(name, detect, frames):
+    detected = 0
+    start = time.perf_counter()
+    for frame in frames:
+        detected += bool(detect(frame))
+    elapsed = time.perf_counter() - start
+
+    per_frame_us = elapsed / len(frames) * 1e6
+    print(f"{name:>8}: {per_frame_us:8.1f}us/frame, detected {detected} changes")
+    return per_frame_us
+
+
+def measure_allocations(detect, previous, current):
+    """统计单帧检测过程中的峰值分配字节数（tracemalloc 会放慢计时，因此与计时分开）"""
+    detect(previous)
+    tracemalloc.start()
+    detect(current)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat change detection micro-benchmark")
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--change-every", type=int, default=20)
+    parser.add_argument("--downscale", type=int, default=2)
+    args = parser.parse_args()
+
+    frames = make_frames(args.frames, args.change_every)
+
+    legacy = LegacyDetector(THRESHOLD)
+    legacy_us = run("legacy", legacy.detect, frames)
+    detector = ChangeDetector(THRESHOLD, downscale=args.downscale)
+    new_us = run("detector", lambda f: detector.detect(f).changed, frames)
+    print(f"speedup: {legacy_us / new_us:.2f}x")
+
+    changed = frames[args.change_every]
+    for label, previous, current in (("static", frames[0], frames[1]), ("changed", frames[0], changed)):
+        legacy_bytes = measure_allocations(LegacyDetector(THRESHOLD).detect, previous, current)
+        new_bytes = measure_allocations(
+            ChangeDetector(THRESHOLD, downscale=args.downscale).detect, previous, current
+        )
+        print(f"{label:>8} frame peak allocation: legacy {legacy_bytes / 1024:.1f} KiB, "
+              f"detector {new_bytes / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
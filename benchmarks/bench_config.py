@@ -0,0 +1,116 @@
+# 基准测试 - 配置访问开销与热加载延迟
+#
+# 1. 比较每帧/每条消息读取配置的方式：逐级查找嵌套 dict 的 get('a.b')（原实现）、
+#    快照的 get('a.b')（按键缓存）与快照的类型化属性（settings.detector.change_threshold）。
+# 2. 修改配置文件后，到订阅者收到新快照的时间（文件监视间隔 --interval）。
+# 用法: python benchmarks/bench_config.py [--lookups 200000] [--reloads 20] [--interval 0.2]
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from config.config import Config
+from config.settings import Settings
+from core.pipeline import percentile
+from utils.logger import LOGGER
+
+LOGGER.remove()
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+KEYS = ["thresholds.change_detection", "scheduler.quiet_period", "paths.judgments", "details_window.deadline"]
+
+
+def dict_get(data, key, default=None):
+    """原 Config.get：逐级查找"""
+    value = data
+    for k in key.split("."):
+        value = value.get(k, default)
+        if value == default:
+            break
+    return value
+
+
+def per_lookup(func, lookups: int) -> float:
+    start = time.perf_counter()
+    for _ in range(lookups // len(KEYS)):
+        func()
+    return (time.perf_counter() - start) / (lookups // len(KEYS) * len(KEYS))
+
+
+def reload_latencies(data: dict, reloads: int, interval: float):
+    latencies = []
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "config.yaml")
+        with open(path, "w", encoding="utf-8") as f:
+            yaml.safe_dump(data, f, allow_unicode=True)
+        config = Config(path)
+        updated = threading.Event()
+        config.subscribe(lambda old, new, changed: updated.set())
+        config.watch(interval)
+        try:
+            for i in range(reloads):
+                data["thresholds"]["change_detection"] = 4000 + i
+                updated.clear()
+                start = time.perf_counter()
+                with open(path, "w", encoding="utf-8") as f:
+                    yaml.safe_dump(data, f, allow_unicode=True)
+                if updated.wait(interval * 10):
+                    latencies.append(time.perf_counter() - start)
+        finally:
+            config.stop_watching()
+    return latencies
+
+
+def validation_seconds(data: dict, runs: int = 200) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        Settings.from_dict(data)
+    return (time.perf_counter() - start) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Config access and reload benchmark")
+    parser.add_argument("--lookups", type=int, default=200000)
+    parser.add_argument("--reloads", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.2, help="file watch interval in seconds")
+    args = parser.parse_args()
+
+    config = Config(os.path.join(ROOT, "config.yaml"))
+    with open(config.config_path, encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+
+    def nested_dict():
+        for key in KEYS:
+            dict_get(data, key)
+
+    def snapshot_get():
+        for key in KEYS:
+            config.get(key)
+
+    def typed():
+        snapshot = config.snapshot
+        snapshot.detector.change_threshold
+        snapshot.scheduler.quiet_period
+        snapshot.paths.judgments
+        snapshot.details_window.deadline
+
+    print(f"{'access':<20}{'ns/lookup':>12}")
+    for name, func in (("dict get('a.b')", nested_dict), ("snapshot get('a.b')", snapshot_get),
+                       ("typed attribute", typed)):
+        print(f"{name:<20}{per_lookup(func, args.lookups) * 1e9:>12.0f}")
+
+    latencies = sorted(reload_latencies(data, args.reloads, args.interval))
+    print(f"hot reload ({len(latencies)}/{args.reloads} applied, watch interval {args.interval}s): "
+          f"p50 {percentile(latencies, 50) * 1000:.0f}ms, p95 {percentile(latencies, 95) * 1000:.0f}ms; "
+          f"snapshot validation {validation_seconds(data) * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# 基准测试 - 消息去重对OCR噪声的识别率、误判率与查找耗时
+#
+# 生成一串聊天记录，其中一部分是前面某条记录被重新打开后的再次OCR（时间变化、随机替换若干字符），
+# 依次交给 DedupIndex，统计：重复记录被识别的比例、不同记录被误判为重复的比例、每条的平均耗时，
+# 以及按给定的大模型延迟估计节省的时间。
+# 用法: python benchmarks/bench_dedup.py [--records 5000] [--repeat 0.3] [--noise 2] [--threshold 0.6]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.dedup import DedupIndex
+from utils.logger import LOGGER
+
+LOGGER.remove()
+
+NAMES = ["张伟", "王芳", "李娜", "刘洋", "陈静", "杨磊", "赵敏", "黄强"]
+WORDS = (
+    "我们 今天 明天 下午 会议 客户 合同 报表 数据 表格 文件 整理 提交 审批 发票 项目 进度 测试 上线 版本 "
+    "需求 评审 方案 预算 采购 供应商 快递 前台 领导 同事 部门 周报 月报 总结 计划 安排 时间 地点 确认 修改 "
+    "更新 系统 账号 密码 网络 打印机 会议室 投影仪 附件 邮件 群里 通知 大家 注意 尽快 麻烦 帮忙 看一下 处理 "
+    "一下 已经 还没 可以 不行 问题 原因 结果 方法 工具 脚本 自动 批量 导出 导入 汇总 统计 分析 图表"
+).split()
+CONFUSABLE = "的地得己已巳未末人入0OlI1"
+
+
+def make_record(rng: random.Random) -> str:
+    """1-6 条消息，每条由随机词语拼成"""
+    return "\n".join(
+        f"{rng.choice(NAMES)} {rng.randint(8, 20)}:{rng.randint(0, 59):02d}\n"
+        + "".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))
+        for _ in range(rng.randint(1, 6))
+    )
+
+
+def reocr(rng: random.Random, text: str, noise: int) -> str:
+    """模拟重新打开后的再次识别：替换 noise 个字符、时间改变"""
+    chars = list(text)
+    for _ in range(noise):
+        i = rng.randrange(len(chars))
+        if chars[i] not in "\n: ":
+            chars[i] = rng.choice(CONFUSABLE)
+    return "".join(chars).replace(":", "：", 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Message dedup benchmark")
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--repeat", type=float, default=0.3, help="fraction of captures that re-open a record")
+    parser.add_argument("--noise", type=int, default=2, help="characters misrecognized per re-OCR")
+    parser.add_argument("--threshold", type=float, default=0.6, help="estimated Jaccard similarity")
+    parser.add_argument("--num-perm", type=int, default=64)
+    parser.add_argument("--bands", type=int, default=16)
+    parser.add_argument("--max-entries", type=int, default=5000)
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="LLM seconds saved per skipped record")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    originals, stream = [], []
+    for _ in range(args.records):
+        if originals and rng.random() < args.repeat:
+            stream.append((reocr(rng, rng.choice(originals), args.noise), True))
+        else:
+            text = make_record(rng)
+            originals.append(text)
+            stream.append((text, False))
+
+    index = DedupIndex(threshold=args.threshold, num_perm=args.num_perm, bands=args.bands,
+                       max_entries=args.max_entries)
+    detected = false_positives = 0
+    start = time.perf_counter()
+    for text, duplicate in stream:
+        seen = index.seen(text)
+        if not seen:
+            index.record(text)
+        detected += seen and duplicate
+        false_positives += seen and not duplicate
+    elapsed = time.perf_counter() - start
+
+    duplicates = sum(duplicate for _, duplicate in stream)
+    distinct = len(stream) - duplicates
+    print(f"{len(stream)} captures, {duplicates} re-opened, noise {args.noise} chars, "
+          f"threshold {args.threshold}")
+    print(f"duplicates detected: {detected}/{duplicates} ({detected / max(1, duplicates):.1%})")
+    print(f"distinct records flagged: {false_positives}/{distinct} ({false_positives / max(1, distinct):.2%})")
+    print(f"mean check + record: {elapsed / len(stream) * 1e6:.0f}us, index size {len(index)}")
+    print(f"LLM calls skipped: {index.hits} (~{index.hits * args.llm_latency:.0f}s at {args.llm_latency}s each)")
+
+
+if __name__ == "__main__":
+    main()
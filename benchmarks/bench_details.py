@@ -0,0 +1,133 @@
+# 基准测试 - 详情窗口 打开-截图-关闭 交互的耗时分布
+#
+# 模拟一个详情窗口在点击后经过随机延迟（对数正态分布，含长尾）才出现/消失、偶尔丢失点击的界面，
+# 用 ScreenshotService.capture_details 的轮询等待实际执行若干次，报告耗时分位数、重试与失败次数；
+# 旧实现（点击后与关闭后各固定 sleep 0.5 秒）按同一组延迟样本计算，作为对照。
+# 用法: python benchmarks/bench_details.py [--runs 40] [--open-median 0.15] [--close-median 0.08] [--drop-rate 0.05]
+# 需在项目根目录运行（读取 config.yaml）。
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from config.config import CONFIG
+from core.frame import Frame, BGRX
+from core.image_processor import ImageProcessor
+from core.pipeline import percentile
+from core.targets import MonitorTarget
+from core.window_manager import WindowManager
+from services.screenshot_service import ScreenshotService
+from utils.logger import LOGGER
+from utils.metrics import METRICS
+
+LOGGER.remove()
+
+MAIN_HWND = 1
+DETAILS_HWND = 2
+LEGACY_WAIT = 0.5
+
+
+class SlowUIWindowManager(WindowManager):
+    """点击主窗口后详情窗口经过 open_delay 才出现，点击关闭按钮后经过 close_delay 才消失"""
+
+    def __init__(self, open_delays, close_delays, drops):
+        self.open_delays = iter(open_delays)
+        self.close_delays = iter(close_delays)
+        self.drops = iter(drops)
+        self.open_at = self.close_at = None
+
+    def find_window(self, title):
+        now = time.monotonic()
+        if title == "main":
+            return {"hwnd": MAIN_HWND, "x": 0, "y": 0, "width": 900, "height": 900}
+        if self.open_at is not None and self.open_at <= now and (self.close_at is None or now < self.close_at):
+            return {"hwnd": DETAILS_HWND, "x": 100, "y": 100, "width": 600, "height": 420}
+        return None
+
+    def capture_screenshot(self, hwnd, region=None):
+        return Frame(np.full((420, 600, 4), 235, dtype=np.uint8), BGRX)
+
+    def simulate_click(self, hwnd, x, y):
+        now = time.monotonic()
+        if hwnd == MAIN_HWND and self.open_at is None:
+            if not next(self.drops):
+                self.open_at, self.close_at = now + next(self.open_delays), None
+        elif hwnd == DETAILS_HWND and self.close_at is None:
+            if not next(self.drops):
+                self.close_at = now + next(self.close_delays)
+        if self.close_at is not None and hwnd == MAIN_HWND:
+            # 恢复界面的点击，下一轮重新开始
+            self.open_at = self.close_at = None
+
+
+def sample(rng, median, sigma, n):
+    return [median * rng.lognormvariate(0, sigma) for _ in range(n)]
+
+
+def legacy(open_delays, close_delays, drops):
+    """旧实现：固定等待 0.5 秒后查找一次，超过即失败，不重试"""
+    successes = [o <= LEGACY_WAIT and c <= LEGACY_WAIT and not d1 and not d2
+                 for o, c, d1, d2 in zip(open_delays, close_delays, drops[0::2], drops[1::2])]
+    return [2 * LEGACY_WAIT] * len(successes), successes.count(False)
+
+
+async def run(args, open_delays, close_delays, drops):
+    manager = SlowUIWindowManager(open_delays, close_delays, drops)
+    target = MonitorTarget("bench", "main", "details", CONFIG.get("chat_box"))
+    service = ScreenshotService(manager, ImageProcessor(), target)
+    latencies, failures = [], 0
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        frame = await service.capture_details()
+        latencies.append(time.perf_counter() - start)
+        if frame is None:
+            failures += 1
+            manager.open_at = manager.close_at = None
+    service.close()
+    return latencies, failures
+
+
+def report(name, latencies, failures):
+    latencies = sorted(latencies)
+    print(f"{name:<10}{percentile(latencies, 50) * 1000:>9.0f}{percentile(latencies, 95) * 1000:>9.0f}"
+          f"{percentile(latencies, 99) * 1000:>9.0f}{latencies[-1] * 1000:>9.0f}{failures:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Details window interaction latency")
+    parser.add_argument("--runs", type=int, default=40)
+    parser.add_argument("--open-median", type=float, default=0.15, help="median seconds for the window to appear")
+    parser.add_argument("--close-median", type=float, default=0.08, help="median seconds for the window to close")
+    parser.add_argument("--sigma", type=float, default=0.8, help="log-normal spread of the UI delays")
+    parser.add_argument("--drop-rate", type=float, default=0.05, help="probability that a click is ignored")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    METRICS.configure(enabled=True)
+
+    rng = random.Random(args.seed)
+    # 重试会多消耗样本，多生成一些
+    open_delays = sample(rng, args.open_median, args.sigma, args.runs * 4)
+    close_delays = sample(rng, args.close_median, args.sigma, args.runs * 4)
+    drops = [rng.random() < args.drop_rate for _ in range(args.runs * 8)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        CONFIG.apply({**CONFIG.config, "paths": {**CONFIG.config["paths"], "screenshots": workdir}})
+        latencies, failures = asyncio.run(run(args, open_delays, close_delays, drops))
+    print(f"{args.runs} interactions, UI open median {args.open_median}s, close median {args.close_median}s, "
+          f"sigma {args.sigma}, drop rate {args.drop_rate}")
+    print(f"{'policy':<10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'failures':>10}")
+    report("sleep 0.5", *legacy(open_delays[:args.runs], close_delays[:args.runs], drops[:args.runs * 2]))
+    report("wait", latencies, failures)
+    print(f"metrics: {METRICS.format_summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# 基准测试 - 单帧拷贝量
+#
+# 模拟一次 "截图 -> 变化检测 -> 详情截图转灰度 -> OCR预处理" 流程，对比旧版 PIL 路径与
+# Frame 路径每一步新分配的像素字节数、tracemalloc 峰值和耗时。
+# 用法: python benchmarks/bench_frame_copies.py [--width 1280 --height 900] [--repeat 200]
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.frame import Frame
+from utils.logger import LOGGER
+
+LOGGER.remove()
+
+CHAT_BOX = (310, 600, 330, 150)
+
+
+def nbytes(obj):
+    """输出缓冲区的字节数；PIL 的 RGB 图像内部按每像素 4 字节存储"""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes if obj.base is None or obj.flags["OWNDATA"] else 0
+    if isinstance(obj, Image.Image):
+        return obj.width * obj.height * (1 if obj.mode == "L" else 4)
+    return 0
+
+
+class Counter:
+    def __init__(self):
+        self.steps = []
+
+    def __call__(self, name, obj):
+        self.steps.append((name, nbytes(obj)))
+        return obj
+
+
+def legacy(bits, width, height, count):
+    """旧版：PIL frombuffer/crop、np.array + RGB2BGR、convert("L")、np.array -> BGR -> GRAY -> CLAHE -> 阈值 -> RGB"""
+    x, y, w, h = CHAT_BOX
+    full = count("capture frombuffer", Image.frombuffer("RGB", (width, height), bits, "raw", "BGRX", 0, 1))
+    chat = count("crop chat box", full.crop((x, y, x + w, y + h)))
+    chat_cv = count("chat np.array", np.array(chat))
+    chat_cv = count("chat RGB2BGR", cv2.cvtColor(chat_cv, cv2.COLOR_RGB2BGR))
+    count("detect absdiff", cv2.absdiff(chat_cv, chat_cv))
+
+    details = count("details frombuffer", Image.frombuffer("RGB", (width, height), bits, "raw", "BGRX", 0, 1))
+    count("details convert L", details.convert("L"))
+    img_cv = count("ocr np.array", np.array(details))
+    img_cv = count("ocr RGB2BGR", cv2.cvtColor(img_cv, cv2.COLOR_RGB2BGR))
+    gray = count("ocr BGR2GRAY", cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY))
+    enhanced = count("ocr CLAHE", cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray))
+    thresh = count("ocr threshold", cv2.threshold(enhanced, 180, 255, cv2.THRESH_BINARY)[1])
+    count("ocr GRAY2RGB", cv2.cvtColor(thresh, cv2.COLOR_GRAY2RGB))
+
+
+def framed(bits, width, height, count):
+    """Frame：包装位图字节，ROI 为视图，灰度/阈值结果缓存在帧上"""
+    x, y, w, h = CHAT_BOX
+    full = Frame.from_bitmap_bits(bits, width, height)
+    chat = full.roi(x, y, w, h)
+    gray = count("chat gray", chat.gray)
+    count("detect absdiff", cv2.absdiff(gray, gray))
+
+    details = Frame.from_bitmap_bits(bits, width, height)
+    details = details.convert("L")
+    count("details gray", details.buffer)
+    thresh = count("ocr CLAHE+threshold", details.threshold(180, clahe=(2.0, (8, 8))))
+    count("ocr GRAY2RGB", details.cached("ocr_rgb", lambda f: cv2.cvtColor(thresh, cv2.COLOR_GRAY2RGB)))
+
+
+def measure(name, func, bits, width, height, repeat):
+    counter = Counter()
+    func(bits, width, height, counter)
+    tracemalloc.start()
+    func(bits, width, height, Counter())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(bits, width, height, Counter())
+    elapsed = (time.perf_counter() - start) / repeat
+    total = sum(size for _, size in counter.steps)
+    print(f"{name}: {total / 1024:.0f} KiB allocated per frame, tracemalloc peak {peak / 1024:.0f} KiB, "
+          f"{elapsed * 1000:.2f} ms/frame")
+    for step, size in counter.steps:
+        print(f"    {step:<22} {size / 1024:8.0f} KiB")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-frame copy benchmark")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=900)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    bits = rng.integers(0, 255, args.width * args.height * 4, dtype=np.uint8).tobytes()
+    before = measure("legacy", legacy, bits, args.width, args.height, args.repeat)
+    after = measure("frame ", framed, bits, args.width, args.height, args.repeat)
+    print(f"bytes allocated per frame reduced by {(1 - after / before) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# 基准测试 - 截图持久化的调用方耗时、吞吐量与磁盘占用
+#
+# 生成一组详情窗口灰度截图（含一定比例的重复画面），其中一部分作为“判断为是”的结果再保存到
+# judgments 目录，比较旧的同步 file_utils.save_image 与 ImageStore 各格式的：调用方阻塞时间、
+# 全部落盘的总耗时、写入文件数与实际占用字节数（硬链接只计一次）。
+# 用法: python benchmarks/bench_images.py [--images 200] [--duplicates 0.3] [--judged 0.2]
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.frame import Frame, GRAY
+from core.image_store import ImageStore
+from core.pipeline import percentile
+from utils.file_utils import save_image
+from utils.logger import LOGGER
+
+LOGGER.remove()
+
+
+def details_frame(seed: int, width: int = 600, height: int = 420) -> Frame:
+    """浅色背景上若干行深色“文字”块，近似详情窗口截图"""
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width), 235, dtype=np.uint8)
+    for y in range(10, height - 20, 24):
+        x = 10
+        while x < width - 40:
+            w = int(rng.integers(6, 30))
+            image[y:y + 14, x:x + w] = rng.integers(20, 60)
+            x += w + int(rng.integers(3, 8))
+            if rng.random() < 0.05:
+                break
+    return Frame(image, GRAY)
+
+
+def disk_usage(root: str):
+    """返回 (目录项数, 按 inode 去重后的字节数)"""
+    entries, inodes = 0, {}
+    for folder, _, files in os.walk(root):
+        for name in files:
+            st = os.stat(os.path.join(folder, name))
+            entries += 1
+            inodes[(st.st_dev, st.st_ino)] = st.st_size
+    return entries, sum(inodes.values())
+
+
+def run(name, frames, judged, root, make_saver):
+    screenshots, judgments = os.path.join(root, "screenshots"), os.path.join(root, "judgments")
+    save, finish = make_saver()
+    blocked = []
+    start = time.perf_counter()
+    for i, frame in enumerate(frames):
+        t = time.perf_counter()
+        save(frame, screenshots)
+        if i in judged:
+            save(frame, judgments)
+        blocked.append(time.perf_counter() - t)
+    finish()
+    elapsed = time.perf_counter() - start
+    entries, size = disk_usage(root)
+    blocked.sort()
+    print(f"{name:<14}{percentile(blocked, 50) * 1000:>9.2f}{percentile(blocked, 99) * 1000:>9.2f}"
+          f"{len(frames) / elapsed:>10.0f}{entries:>8}{size / 1e6:>10.2f}")
+
+
+def legacy_saver():
+    return (lambda frame, folder: save_image(frame, folder)), (lambda: None)
+
+
+def store_saver(**options):
+    def make():
+        store = ImageStore(**options)
+        return store.save, store.close
+    return make
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screenshot persistence benchmark")
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--duplicates", type=float, default=0.3, help="fraction of frames repeating an earlier one")
+    parser.add_argument("--judged", type=float, default=0.2, help="fraction of frames also saved to judgments")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    seeds = []
+    for i in range(args.images):
+        seeds.append(rng.choice(seeds) if seeds and rng.random() < args.duplicates else i)
+    frames = [details_frame(seed) for seed in seeds]
+    judged = {i for i in range(args.images) if rng.random() < args.judged}
+    print(f"{args.images} frames ({len(set(seeds))} distinct, 600x420 gray), {len(judged)} also saved as judgments")
+    print(f"{'writer':<14}{'p50 ms':>9}{'p99 ms':>9}{'images/s':>10}{'files':>8}{'disk MB':>10}")
+    for name, make_saver in (
+        ("sync png", legacy_saver),
+        ("store png-1", store_saver(format="png", png_level=1)),
+        ("store png-3", store_saver(format="png", png_level=3)),
+        ("store png-9", store_saver(format="png", png_level=9)),
+        ("store webp", store_saver(format="webp")),
+        ("store raw", store_saver(format="raw")),
+    ):
+        with tempfile.TemporaryDirectory() as root:
+            run(name, frames, judged, root, make_saver)
+    print("p50/p99: time the caller is blocked per frame; images/s: until everything is on disk")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# 基准测试 - 增量OCR
+#
+# 按文件名顺序回放一组详情窗口截图，对比完整识别与增量识别每条消息送入识别模型的文本行数和耗时。
+# 用法: python benchmarks/bench_incremental_ocr.py <截图目录> [--limit 200]
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from paddleocr import PaddleOCR
+from core.incremental_ocr import IncrementalOCR, crop_box
+from utils.logger import LOGGER
+
+LOGGER.remove()
+
+
+def preprocess(path):
+    """与 OCRProcessor.preprocess_image 相同的预处理，返回 RGB 数组"""
+    gray = cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2GRAY)
+    enhanced = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+    _, thresh = cv2.threshold(enhanced, 180, 255, cv2.THRESH_BINARY)
+    return cv2.cvtColor(thresh, cv2.COLOR_GRAY2RGB)
+
+
+def run_full(engine, images):
+    """完整模式：每张图的每个检测框都送入识别模型"""
+    calls = 0
+    start = time.perf_counter()
+    for image in images:
+        boxes, _ = engine.text_detector(image)
+        crops = [crop_box(image, box) for box in boxes] if boxes is not None else []
+        if crops:
+            engine.text_recognizer(crops)
+        calls += len(crops)
+    return calls, time.perf_counter() - start
+
+
+def run_incremental(engine, images):
+    ocr = IncrementalOCR(engine)
+    start = time.perf_counter()
+    added = 0
+    for image in images:
+        added += len(ocr.process(image).added)
+    return ocr.recognized_total, ocr.reused_total, added, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental OCR recognizer-call benchmark")
+    parser.add_argument("folder", help="folder of details-window screenshots (e.g. paths.screenshots)")
+    parser.add_argument("--limit", type=int, default=200)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.folder, "*.png")))[:args.limit]
+    if not paths:
+        print(f"No screenshots found in {args.folder}")
+        return
+    images = [preprocess(path) for path in paths]
+    engine = PaddleOCR(use_angle_cls=False, lang="ch", ocr_version="PP-OCRv4", show_log=False)
+
+    full_calls, full_time = run_full(engine, images)
+    inc_calls, reused, added, inc_time = run_incremental(engine, images)
+    count = len(images)
+    print(f"messages: {count}")
+    print(f"full:        {full_calls / count:6.2f} recognizer crops/message, {full_time / count * 1000:7.1f} ms/message")
+    print(f"incremental: {inc_calls / count:6.2f} recognizer crops/message, {inc_time / count * 1000:7.1f} ms/message "
+          f"({reused / count:.2f} reused, {added / count:.2f} new lines/message)")
+
+
+if __name__ == "__main__":
+    main()
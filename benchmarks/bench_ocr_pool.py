@@ -0,0 +1,66 @@
+# 基准测试 - OCR引擎池吞吐量
+#
+# 以不同进程数运行 OCRPool，报告每秒处理的图像数，验证吞吐随核数增长。
+# 用法: python benchmarks/bench_ocr_pool.py <截图目录> [--workers 1 2 4] [--batch-size 4] [--images 64]
+
+import argparse
+import asyncio
+import glob
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.ocr_pool import OCRPool
+from utils.logger import LOGGER
+
+LOGGER.remove()
+
+
+def load_images(folder, count):
+    """读取截图并按 OCRProcessor 的方式预处理，不足 count 张时循环复用"""
+    paths = sorted(glob.glob(os.path.join(folder, "*.png")))
+    if not paths:
+        raise SystemExit(f"No screenshots found in {folder}")
+    images = []
+    for path in paths[:count]:
+        gray = cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2GRAY)
+        enhanced = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+        _, thresh = cv2.threshold(enhanced, 180, 255, cv2.THRESH_BINARY)
+        images.append(cv2.cvtColor(thresh, cv2.COLOR_GRAY2RGB))
+    return [images[i % len(images)] for i in range(count)]
+
+
+async def run(pool, images):
+    start = time.perf_counter()
+    await asyncio.gather(*(pool.submit(image) for image in images))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR pool throughput benchmark")
+    parser.add_argument("folder", help="folder of details-window screenshots")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--max-wait", type=float, default=0.05)
+    parser.add_argument("--images", type=int, default=64)
+    args = parser.parse_args()
+
+    images = load_images(args.folder, args.images)
+    print(f"{len(images)} images, {os.cpu_count()} CPUs")
+    baseline = None
+    for workers in args.workers:
+        pool = OCRPool(workers=workers, batch_size=args.batch_size, max_wait=args.max_wait)
+        pool.warm_up()
+        elapsed = asyncio.run(run(pool, images))
+        pool.close()
+        throughput = len(images) / elapsed
+        baseline = baseline or throughput
+        print(f"workers={workers}: {throughput:6.2f} images/s ({throughput / baseline:.2f}x), {pool.stats()}")
+
+
+if __name__ == "__main__":
+    main()
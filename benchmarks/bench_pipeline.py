@@ -0,0 +1,258 @@
+# 基准测试 - 端到端流水线吞吐量
+#
+# 从录制的截图轨迹回放，驱动完整的 截图 -> 变化检测 -> 详情截图 -> OCR -> AI判断 流水线，
+# 报告各阶段耗时分位数、消息延迟和每秒处理的消息数。AI 使用本地桩实现，无需网络。
+# 用法: python benchmarks/bench_pipeline.py <轨迹目录> [--speed 0] [--ocr fake|paddle] [--ai-latency 0.3] [--metrics]
+#       python benchmarks/bench_pipeline.py <轨迹目录> --synthesize 300   # 先生成合成轨迹再回放
+# 需在项目根目录运行（读取 config.yaml）。
+
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from config.config import CONFIG
+from core.ai_analyzer import AsyncAIAnalyzer
+from core.frame import Frame, BGRX
+from core.image_processor import ImageProcessor
+from core.image_store import create_image_store
+from core.incremental_ocr import crop_box, crop_hash
+from core.ocr_processor import OCRProcessor
+from core.pipeline import percentile
+from core.replay import RecordingWindowManager, ReplayWindowManager
+from core.result_store import create_result_store
+from core.window_manager import WindowManager
+from main import TargetFrame, build_pipeline, create_target_contexts
+from services.alert_service import AlertService, NullSink
+from services.analysis_service import AnalysisService
+from utils.logger import LOGGER
+from utils.metrics import METRICS
+
+LOGGER.remove()
+
+MAIN_HWND = 1
+DETAILS_HWND = 2
+WINDOW_SIZE = (900, 900)
+DETAILS_SIZE = (600, 420)
+
+
+class SyntheticWindowManager(WindowManager):
+    """生成合成画面的窗口管理器：聊天框每来一条消息滚动一行，详情窗口为若干文本行"""
+
+    def __init__(self, seed: int = 0):
+        self.rng = np.random.default_rng(seed)
+        self.messages = 0
+        self.details_open = False
+
+    def find_window(self, title: str):
+        if title == CONFIG.get("app.window_title"):
+            return {"hwnd": MAIN_HWND, "x": 0, "y": 0, "width": WINDOW_SIZE[0], "height": WINDOW_SIZE[1]}
+        if title == CONFIG.get("app.details_window_title") and self.details_open:
+            return {"hwnd": DETAILS_HWND, "x": 100, "y": 100, "width": DETAILS_SIZE[0], "height": DETAILS_SIZE[1]}
+        return None
+
+    def _text_lines(self, width: int, height: int, count: int, seed: int) -> np.ndarray:
+        rng = np.random.default_rng(seed)
+        image = np.full((height, width, 4), 235, dtype=np.uint8)
+        for row in range(count):
+            y = 10 + row * 24
+            if y + 14 > height:
+                break
+            x = 10
+            while x < width - 40:
+                w = int(rng.integers(6, 30))
+                image[y:y + 14, x:x + w, :3] = 30
+                x += w + int(rng.integers(3, 8))
+                if rng.random() < 0.08:
+                    break
+        return image
+
+    def capture_screenshot(self, hwnd, region=None):
+        if hwnd == MAIN_HWND:
+            _, _, w, h = region
+            return Frame(self._text_lines(w, h, 5, self.messages), BGRX)
+        if hwnd == DETAILS_HWND and self.details_open:
+            w, h = DETAILS_SIZE
+            return Frame(self._text_lines(w, h, 3 + self.messages % 12, 1000 + self.messages), BGRX)
+        return None
+
+    def simulate_click(self, hwnd, x, y):
+        # 点击主窗口打开详情，点击详情窗口关闭
+        self.details_open = hwnd == MAIN_HWND and not self.details_open
+
+
+def synthesize_trace(trace_dir: str, frames: int, messages: int, interval: float) -> None:
+    """按 ScreenshotService 的调用顺序录制合成轨迹"""
+    inner = SyntheticWindowManager()
+    now = [0.0]
+    recorder = RecordingWindowManager(inner, trace_dir, clock=lambda: now[0])
+    chat_box = CONFIG.get("chat_box")
+    main = recorder.find_window(CONFIG.get("app.window_title"))
+    region = (chat_box["x"], main["height"] + chat_box["y_offset"], chat_box["width"], chat_box["height"])
+    message_frames = set(np.linspace(1, frames - 1, messages, dtype=int).tolist())
+    for i in range(frames):
+        now[0] = i * interval
+        if i in message_frames:
+            inner.messages += 1
+        recorder.capture_screenshot(MAIN_HWND, region)
+        if i in message_frames:
+            now[0] += 0.1
+            recorder.simulate_click(MAIN_HWND, 0, 0)
+            details = recorder.find_window(CONFIG.get("app.details_window_title"))
+            recorder.capture_screenshot(details["hwnd"])
+            recorder.simulate_click(details["hwnd"], details["width"] - 20, 20)
+            recorder.find_window(CONFIG.get("app.details_window_title"))
+    recorder.close()
+
+
+class FakeOCREngine:
+    """按暗色行带切分文本行的假OCR引擎，识别结果为裁剪图哈希，每行固定耗时"""
+
+    def __init__(self, latency: float = 0.01):
+        self.latency = latency
+
+    def text_detector(self, image):
+        gray = image if image.ndim == 2 else image[:, :, 0]
+        rows = (gray < 128).any(axis=1)
+        boxes, start = [], None
+        for y, dark in enumerate(np.append(rows, False)):
+            if dark and start is None:
+                start = y
+            elif not dark and start is not None:
+                cols = np.flatnonzero((gray[start:y] < 128).any(axis=0))
+                x0, x1 = float(cols[0]), float(cols[-1] + 1)
+                boxes.append(np.array([[x0, start], [x1, start], [x1, y], [x0, y]], dtype=np.float32))
+                start = None
+        return boxes, 0.0
+
+    def text_recognizer(self, crops):
+        time.sleep(self.latency * len(crops))
+        return [(f"line-{crop_hash(crop)[:8]}", 0.99) for crop in crops], 0.0
+
+    def ocr(self, image, cls=False):
+        boxes, _ = self.text_detector(image)
+        results, _ = self.text_recognizer([crop_box(image, box) for box in boxes])
+        return [list(zip(boxes, results))]
+
+
+class StubAnalyzer(AsyncAIAnalyzer):
+    """固定延迟的本地分析器，按文本哈希确定性地返回 yes/no"""
+
+    def __init__(self, latency: float = 0.3, yes_ratio: float = 0.2):
+        self.latency = latency
+        self.yes_ratio = yes_ratio
+        self.calls = 0
+
+    def _verdict(self, text: str) -> str:
+        self.calls += 1
+        digest = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+        return "yes" if digest / 0xFFFFFFFF < self.yes_ratio else "no"
+
+    async def analyze_text(self, text: str, prompt: str) -> str:
+        await asyncio.sleep(self.latency)
+        return self._verdict(text)
+
+    async def analyze_image(self, image_data: str, prompt: str) -> str:
+        await asyncio.sleep(self.latency)
+        return self._verdict(image_data)
+
+
+async def run(args, workdir):
+    replay = ReplayWindowManager(args.trace, speed=args.speed)
+    image_store = create_image_store(**(CONFIG.get("images") or {}))
+    image_processor = ImageProcessor(image_store)
+    contexts = create_target_contexts(replay, image_processor, list(CONFIG.snapshot.targets), clock=replay.clock)
+    engine = FakeOCREngine(args.ocr_latency) if args.ocr == "fake" else None
+    store = create_result_store(workdir, **(CONFIG.get("storage") or {}))
+    ocr_processor = OCRProcessor(workdir, store=store, incremental=CONFIG.get("ocr.incremental", False),
+                                 engine=engine)
+    analyzer = StubAnalyzer(args.ai_latency, args.yes_ratio)
+    analysis_service = AnalysisService(analyzer, image_processor)
+    alert_service = AlertService([NullSink()], min_interval=0)
+
+    latencies = []
+    pipeline = build_pipeline(
+        contexts, ocr_processor, analysis_service, alert_service,
+        on_complete=lambda message: latencies.append(time.monotonic() - message.created),
+    )
+    pipeline.start()
+    loop = asyncio.get_running_loop()
+    frames = 0
+    start = time.perf_counter()
+    try:
+        while not replay.exhausted:
+            for name, context in contexts.items():
+                frame = await loop.run_in_executor(None, context.screenshot_service.capture_chat_region)
+                if frame is not None:
+                    frames += 1
+                    await pipeline.submit(TargetFrame(name, frame))
+        await pipeline.stage("detect").queue.join()
+        # 轨迹结束时仍在静默期内的突发直接派发
+        for context in contexts.values():
+            leftover = context.scheduler.close()
+            if leftover is not None:
+                await pipeline.stage("details").put(leftover)
+        await pipeline.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        await pipeline.stop()
+        for context in contexts.values():
+            context.screenshot_service.close()
+        alert_service.close()
+        store.close()
+        image_store.close()
+
+    messages = len(latencies)
+    print(f"trace: {replay.duration:.1f}s recorded, {frames} frames replayed in {elapsed:.2f}s "
+          f"(speed={args.speed or 'max'}, ocr={args.ocr}, ai_latency={args.ai_latency}s)")
+    print(f"messages: {messages} ({messages / elapsed:.2f} messages/s, {frames / elapsed:.1f} frames/s), "
+          f"AI calls: {analyzer.calls}")
+    for name, context in contexts.items():
+        print(f"scheduler[{name}]: {context.scheduler.format_stats()}")
+    print(f"{'stage':<10}{'processed':>10}{'dropped':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for stage in pipeline.stages:
+        p = stage.percentiles((50, 90, 99))
+        print(f"{stage.name:<10}{stage.processed:>10}{stage.dropped:>9}"
+              f"{p[50] * 1000:>10.1f}{p[90] * 1000:>10.1f}{p[99] * 1000:>10.1f}")
+    latencies.sort()
+    print(f"message latency (details capture -> alert): p50 {percentile(latencies, 50) * 1000:.0f} ms, "
+          f"p90 {percentile(latencies, 90) * 1000:.0f} ms, p99 {percentile(latencies, 99) * 1000:.0f} ms")
+    if METRICS.enabled:
+        print(f"metrics: {METRICS.format_summary()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark from a capture trace")
+    parser.add_argument("trace", help="trace directory recorded with capture.record_dir")
+    parser.add_argument("--speed", type=float, default=0, help="replay speed, 0 = as fast as possible")
+    parser.add_argument("--ocr", choices=["fake", "paddle"], default="fake")
+    parser.add_argument("--ocr-latency", type=float, default=0.01, help="fake OCR seconds per text line")
+    parser.add_argument("--ai-latency", type=float, default=0.3)
+    parser.add_argument("--yes-ratio", type=float, default=0.2)
+    parser.add_argument("--synthesize", type=int, default=0, metavar="FRAMES",
+                        help="first record a synthetic trace with this many chat frames")
+    parser.add_argument("--messages", type=int, default=20, help="messages in the synthetic trace")
+    parser.add_argument("--interval", type=float, default=1.0, help="polling interval of the synthetic trace")
+    parser.add_argument("--metrics", action="store_true", help="enable instrumentation and print its summary")
+    args = parser.parse_args()
+    METRICS.configure(enabled=args.metrics)
+
+    if args.synthesize:
+        synthesize_trace(args.trace, args.synthesize, args.messages, args.interval)
+    with tempfile.TemporaryDirectory() as workdir:
+        # 截图、判断结果与OCR结果写入临时目录，不影响正式输出
+        CONFIG.apply({**CONFIG.config, "paths": {**CONFIG.config["paths"],
+                                                 "screenshots": os.path.join(workdir, "screenshots"),
+                                                 "judgments": os.path.join(workdir, "judgments")}})
+        asyncio.run(run(args, workdir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# 基准测试 - 本地预分类节省的大模型调用与判断延迟
+#
+# 按模板生成带标签的聊天记录（大多数为寒暄、表情、日常事务，少数为需要写程序解决的问题），
+# 用前一部分训练本地模型，在其余部分上比较 “全部调用大模型” 与 “规则 + 模型预分类” 的：
+# 大模型调用比例、本地判定与标签的一致率、每条消息的平均判断延迟。大模型用固定延迟的桩代替。
+# 用法: python benchmarks/bench_prefilter.py [--records 3000] [--positive 0.1] [--llm-latency 0.8] [--no-model]
+# 需在项目根目录运行（读取 config.yaml 中的 prefilter 规则）。
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from config.config import CONFIG
+from core.ai_analyzer import AsyncAIAnalyzer
+from core.prefilter import KeywordRules, PrefilterAnalyzer, PrefilterModel
+from core.verdict import YES, parse_verdict
+from utils.logger import LOGGER
+from utils.metrics import METRICS
+
+LOGGER.remove()
+
+NAMES = ["张伟", "王芳", "李娜", "刘洋", "陈静", "杨磊", "赵敏", "黄强"]
+SMALL_TALK = ["好的", "收到", "谢谢", "哈哈哈", "[表情]", "嗯嗯", "ok", "[图片]", "明天见", "辛苦了"]
+CHORES = [
+    "下午三点在{room}开会，请大家准时参加", "{name}，报销单已经提交了，麻烦审批一下",
+    "这周的周报记得周五前发给我", "快递放在前台了，有空去拿一下", "{room}的投影仪坏了，换到隔壁吧",
+    "客户那边说合同下周再签", "午饭一起去食堂吗", "新同事{name}今天入职，大家多关照",
+    "发票抬头写公司全称", "打印机没纸了，谁去领一下",
+]
+TASKS = [
+    "每天要把{count}个Excel表格合并成一个，有没有办法自动处理", "能不能写个脚本定时把网站上的价格抓下来",
+    "这{count}份合同的PDF要提取金额汇总，手工太慢了", "需要批量把文件夹里的图片改名并压缩",
+    "把系统导出的CSV按部门统计一下平均值，做成图表", "每周要从邮箱下载附件再整理成报表，能自动化吗",
+    "想把聊天记录里的订单号都提取出来对账", "帮忙用pandas把这两张表按工号匹配一下",
+]
+ROOMS = ["302会议室", "大会议室", "A栋5楼"]
+
+
+def make_record(rng: random.Random, positive: bool) -> str:
+    """一条转发的聊天记录：若干行 “姓名 时间 内容”"""
+    lines = []
+    for _ in range(rng.randint(1, 6)):
+        pool = rng.choice([SMALL_TALK, CHORES, CHORES])
+        lines.append(rng.choice(pool))
+    if positive:
+        lines.insert(rng.randrange(len(lines) + 1), rng.choice(TASKS))
+    elif rng.random() < 0.3:
+        lines = [rng.choice(SMALL_TALK)]
+    text = [f"{rng.choice(NAMES)} {rng.randint(8, 20)}:{rng.randint(0, 59):02d}\n"
+            + line.format(name=rng.choice(NAMES), room=rng.choice(ROOMS), count=rng.randint(2, 300))
+            for line in lines]
+    return "\n".join(text)
+
+
+class OracleAnalyzer(AsyncAIAnalyzer):
+    """固定延迟、按标签作答的大模型桩"""
+
+    def __init__(self, labels: dict, latency: float):
+        self.labels = labels
+        self.latency = latency
+        self.calls = 0
+
+    async def analyze_text(self, text: str, prompt: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return "yes" if self.labels[text] else "no"
+
+    async def analyze_image(self, image_data: str, prompt: str) -> str:
+        raise NotImplementedError
+
+
+async def evaluate(analyzer, oracle, records):
+    correct, latencies = 0, []
+    for text, label in records:
+        start = time.perf_counter()
+        verdict = await analyzer.analyze_text(text, "prompt")
+        latencies.append(time.perf_counter() - start)
+        correct += (parse_verdict(verdict).label == YES) == label
+    return correct / len(records), sum(latencies) / len(latencies), oracle.calls / len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local prefilter benchmark")
+    parser.add_argument("--records", type=int, default=3000)
+    parser.add_argument("--positive", type=float, default=0.1, help="fraction of records that need Python")
+    parser.add_argument("--train", type=float, default=0.5, help="fraction used to train the local model")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="simulated LLM seconds per call")
+    parser.add_argument("--eval", type=int, default=300, help="records to replay through the analyzers")
+    parser.add_argument("--no-model", action="store_true", help="rules only")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    METRICS.configure(enabled=True)
+
+    rng = random.Random(args.seed)
+    records = [(make_record(rng, positive), positive)
+               for positive in (rng.random() < args.positive for _ in range(args.records))]
+    split = int(len(records) * args.train)
+    train, test = records[:split], records[split:][:args.eval]
+    labels = dict(records)
+    options = CONFIG.get("prefilter") or {}
+
+    model = None
+    if not args.no_model:
+        model = PrefilterModel()
+        start = time.perf_counter()
+        model.train([text for text, _ in train], [label for _, label in train])
+        print(f"trained on {len(train)} records in {time.perf_counter() - start:.2f}s")
+
+    baseline = OracleAnalyzer(labels, args.llm_latency)
+    accuracy, latency, rate = asyncio.run(evaluate(baseline, baseline, test))
+    print(f"{len(test)} records, {sum(label for _, label in test)} positive, LLM latency {args.llm_latency}s")
+    print(f"{'analyzer':<18}{'LLM calls':>10}{'agreement':>11}{'mean latency':>14}")
+    print(f"{'LLM only':<18}{rate:>10.1%}{accuracy:>11.1%}{latency * 1000:>12.0f}ms")
+
+    oracle = OracleAnalyzer(labels, args.llm_latency)
+    prefilter = PrefilterAnalyzer(
+        oracle, KeywordRules(options.get("positive_keywords") or [], options.get("negative_patterns") or []),
+        model, min_chars=options.get("min_chars", 4), positive_threshold=options.get("positive_threshold", 2),
+        low=options.get("low", 0.05), high=options.get("high", 0.95),
+    )
+    accuracy, latency, rate = asyncio.run(evaluate(prefilter, oracle, test))
+    name = "rules" if model is None else "rules + model"
+    print(f"{name:<18}{rate:>10.1%}{accuracy:>11.1%}{latency * 1000:>12.0f}ms")
+    print(f"prefilter: {prefilter.stats()}")
+    print(f"metrics: {METRICS.format_summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# 基准测试 - OCR预处理流水线的耗时与准确率
+#
+# 对一组样例截图比较：
+#   legacy        原先的整图 CLAHE + 阈值 180，并运行文本方向分类；
+#   legacy no-cls 同样的预处理，不运行方向分类；
+#   configured    config.yaml 中 ocr.preprocess 的步骤（ROI裁剪、按文本高度缩放等）与 ocr.use_angle_cls。
+# 报告每张图的预处理与OCR耗时（ms）、预处理后的平均像素数，以及相对参考文本的字符错误率（CER，编辑距离/参考长度，
+# 忽略空白）。参考文本取自与图像同名的 .txt 文件，否则取自 --truth 目录结果存储中同名文件的最新记录
+# （如先用 src/reprocess.py --no-classify 识别并人工校对）。未安装 PaddleOCR 时只报告预处理耗时与像素数。
+# 用法: python benchmarks/bench_preprocess.py [截图目录] [--truth DIR] [--limit 100] [--synthesize 30 [--dpi-scale 2]]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from config.config import CONFIG
+from core.frame import Frame
+from core.preprocess import Preprocessor
+from core.result_store import create_result_store
+from services.reprocess_service import iter_images
+from utils.logger import LOGGER
+
+LOGGER.remove()
+
+WORDS = ("order", "shipped", "invoice", "meeting", "tomorrow", "price", "refund", "contract", "please",
+         "confirm", "delivery", "address", "payment", "received", "urgent", "report", "update", "thanks")
+
+
+def synthesize(folder: str, count: int, dpi_scale: float = 1.0, seed: int = 0) -> None:
+    """带标题栏的“详情窗口”截图：发送人与消息文本行，参考文本写入同名 .txt（不含标题栏文字）"""
+    rng = np.random.default_rng(seed)
+    os.makedirs(folder, exist_ok=True)
+    s = dpi_scale
+    for i in range(count):
+        image = np.full((int(640 * s), int(520 * s)), 245, dtype=np.uint8)
+        image[:int(40 * s)] = 225
+        cv2.putText(image, "Forwarded messages", (int(12 * s), int(27 * s)), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.6 * s, 40, max(1, round(s)), cv2.LINE_AA)
+        lines, y = [], 70
+        while y < 600:
+            sender = f"user{rng.integers(1, 99)}"
+            text = " ".join(rng.choice(WORDS, size=int(rng.integers(2, 6))))
+            for content, size, color in ((sender, 0.5, 110), (text, 0.6, 20)):
+                cv2.putText(image, content, (int(24 * s), int(y * s)), cv2.FONT_HERSHEY_SIMPLEX, size * s, color,
+                            max(1, round(s)), cv2.LINE_AA)
+                lines.append(content)
+                y += 26
+            y += 14
+        name = f"{i:05d}"
+        cv2.imwrite(os.path.join(folder, name + ".png"), image)
+        with open(os.path.join(folder, name + ".txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+
+def load_truth(folder: str, paths: List[str], truth_dir: Optional[str]) -> Dict[str, str]:
+    """参考文本：同名 .txt 优先，其次是 truth_dir 结果存储中 file 字段为相对路径的记录"""
+    names = {path: os.path.relpath(path, folder).replace(os.sep, "/") for path in paths}
+    stored = {}
+    if truth_dir and os.path.isdir(truth_dir):
+        store = create_result_store(truth_dir, **(CONFIG.get("storage") or {}))
+        try:
+            wanted = set(names.values())
+            for record in store.query():
+                if record.get("file") in wanted and record.get("text"):
+                    stored[record["file"]] = record["text"]
+        finally:
+            store.close()
+    truth = {}
+    for path, name in names.items():
+        sidecar = os.path.splitext(path)[0] + ".txt"
+        if os.path.exists(sidecar):
+            with open(sidecar, "r", encoding="utf-8") as f:
+                truth[path] = f.read()
+        elif name in stored:
+            truth[path] = stored[name]
+    return truth
+
+
+def edit_distance(reference: str, hypothesis: str) -> int:
+    previous = list(range(len(hypothesis) + 1))
+    for i, r in enumerate(reference, 1):
+        current = [i]
+        for j, h in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1]
+
+
+def char_error_rate(reference: str, hypothesis: str) -> float:
+    reference, hypothesis = "".join(reference.split()), "".join(hypothesis.split())
+    return edit_distance(reference, hypothesis) / max(1, len(reference))
+
+
+def load_engine(use_angle_cls: bool):
+    try:
+        from paddleocr import PaddleOCR
+    except ImportError:
+        return None
+    return PaddleOCR(use_angle_cls=use_angle_cls, lang="ch", ocr_version="PP-OCRv4", show_log=False)
+
+
+def run(paths: List[str], preprocessor: Preprocessor, engine, cls: bool, truth: Dict[str, str]) -> dict:
+    prep = ocr = 0.0
+    pixels = errors = 0
+    scored = 0
+    timings: Dict[str, float] = {}
+    for path in paths:
+        frame = Frame.load(path)
+        start = time.perf_counter()
+        preprocessor.apply(frame, timings)
+        image = preprocessor.prepare(frame)
+        prep += time.perf_counter() - start
+        pixels += image.shape[0] * image.shape[1]
+        if engine is None:
+            continue
+        start = time.perf_counter()
+        result = engine.ocr(image, cls=cls)
+        ocr += time.perf_counter() - start
+        text = "\n".join(line[1][0] for line in result[0]) if result and result[0] else ""
+        if path in truth:
+            errors += char_error_rate(truth[path], text)
+            scored += 1
+    count = max(1, len(paths))
+    return {
+        "prep_ms": prep / count * 1000,
+        "ocr_ms": ocr / count * 1000 if engine is not None else None,
+        "pixels": pixels / count,
+        "cer": errors / scored if scored else None,
+        "stages": {stage: seconds / count * 1000 for stage, seconds in timings.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR preprocessing speed/accuracy harness")
+    parser.add_argument("folder", nargs="?", help="sample screenshot folder")
+    parser.add_argument("--truth", default=(CONFIG.get("reprocess") or {}).get("output_dir"),
+                        help="result store directory with reference text (default: reprocess.output_dir)")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--synthesize", type=int, default=0, help="generate N synthetic screenshots instead")
+    parser.add_argument("--dpi-scale", type=float, default=1.0, help="text scale of synthetic screenshots")
+    args = parser.parse_args()
+    if not args.folder and not args.synthesize:
+        parser.error("give a screenshot folder or --synthesize N")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        folder = args.folder
+        if args.synthesize:
+            folder = os.path.join(workdir, "screenshots")
+            synthesize(folder, args.synthesize, args.dpi_scale)
+        paths = [path for _, path in zip(range(args.limit), iter_images(folder))]
+        truth = load_truth(folder, paths, args.truth)
+        configured = Preprocessor.from_config(CONFIG.get("ocr.preprocess"))
+        use_angle_cls = CONFIG.get("ocr.use_angle_cls", False)
+        # 加载含方向分类模型的引擎，按 cls 参数决定是否运行分类
+        engine = load_engine(use_angle_cls=True)
+        print(f"{len(paths)} images, {len(truth)} with reference text")
+        print(f"configured stages: {configured}")
+        if engine is None:
+            print("paddleocr is not installed: reporting preprocessing cost and output size only")
+        runs = [
+            ("legacy", Preprocessor(), True),
+            ("legacy no-cls", Preprocessor(), False),
+            ("configured", configured, use_angle_cls),
+        ]
+        breakdown = []
+        print(f"{'config':<16}{'prep ms':>9}{'ocr ms':>9}{'total ms':>10}{'Mpixels':>9}{'CER':>8}")
+        for name, preprocessor, cls in runs:
+            stats = run(paths, preprocessor, engine, cls, truth)
+            ocr_ms = "-" if stats["ocr_ms"] is None else f"{stats['ocr_ms']:.1f}"
+            total = stats["prep_ms"] + (stats["ocr_ms"] or 0.0)
+            cer = "-" if stats["cer"] is None else f"{stats['cer']:.3f}"
+            print(f"{name:<16}{stats['prep_ms']:>9.2f}{ocr_ms:>9}{total:>10.1f}{stats['pixels'] / 1e6:>9.3f}{cer:>8}")
+            breakdown.append(f"{name}: " + ", ".join(f"{stage} {ms:.2f}" for stage, ms in stats["stages"].items()))
+        print("preprocessing ms/image by stage")
+        for line in breakdown:
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# 基准测试 - 离线批量重处理的吞吐量
+#
+# 生成一批合成的详情截图，用固定CPU耗时的假OCR引擎（--ocr-cost 毫秒忙等，模拟 PaddleOCR 的计算）比较：
+#   serial   与 tests/test_ocr.py 相同的逐个读取-预处理-识别，结果最后一次性写成 JSON；
+#   batch    BatchReprocessor 在主进程内识别（workers 0），结果逐条写入结果存储；
+#   pool N   BatchReprocessor + OCRPool，读取、预处理与识别都在 N 个工作进程中进行。
+# 另外中断一次 pool 运行后续跑，检查续跑只处理剩余的图像。不调用大模型。
+# 用法: python benchmarks/bench_reprocess.py [--images 200] [--ocr-cost 20] [--workers 4]
+
+import argparse
+import asyncio
+import functools
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.frame import Frame
+from core.ocr_pool import OCRPool
+from core.ocr_processor import OCRProcessor, prepare_image
+from core.result_store import JsonlResultStore
+from services.reprocess_service import BatchReprocessor, Checkpoint, iter_images
+from utils.logger import LOGGER
+
+LOGGER.remove()
+
+
+class BusyEngine:
+    """每张图忙等 cost 秒的假OCR引擎，返回图像的平均灰度"""
+
+    def __init__(self, cost: float):
+        self.cost = cost
+
+    def ocr(self, image, cls=False):
+        end = time.perf_counter() + self.cost
+        while time.perf_counter() < end:
+            pass
+        return [[(None, (f"mean {image.mean():.1f}", 0.9))]]
+
+
+def synthesize(folder: str, count: int, seed: int = 0) -> None:
+    """白底上若干深色“文本行”的灰度截图"""
+    rng = np.random.default_rng(seed)
+    os.makedirs(folder, exist_ok=True)
+    for i in range(count):
+        image = np.full((600, 500), 245, dtype=np.uint8)
+        for row in range(rng.integers(5, 20)):
+            y, width = 20 + row * 28, int(rng.integers(80, 460))
+            image[y:y + 14, 20:20 + width] = rng.integers(0, 80, size=(14, width), dtype=np.uint8)
+        cv2.imwrite(os.path.join(folder, f"{i:05d}.png"), image)
+
+
+def run_serial(folder: str, output: str, cost: float) -> int:
+    engine = BusyEngine(cost)
+    results = []
+    for path in iter_images(folder):
+        image = prepare_image(Frame.load(path))
+        result = engine.ocr(image, cls=True)
+        results.append({"file": os.path.basename(path), "text": result[0][0][1][0]})
+    with open(os.path.join(output, "ocr_results.json"), "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False)
+    return len(results)
+
+
+def run_batch(folder: str, output: str, cost: float, workers: int, limit: int = 0) -> int:
+    store = JsonlResultStore(output)
+    checkpoint = Checkpoint(os.path.join(output, "checkpoint.txt"))
+    pool = OCRPool(workers=workers, engine_factory=functools.partial(BusyEngine, cost)) if workers else None
+    if pool is not None:
+        pool.warm_up()
+    processor = OCRProcessor(output, store=store, pool=pool, engine=None if pool else BusyEngine(cost))
+    reprocessor = BatchReprocessor(processor, checkpoint, folder, progress_interval=3600)
+    paths = itertools.islice(iter_images(folder), limit) if limit else iter_images(folder)
+    try:
+        total = limit or sum(1 for path in iter_images(folder) if reprocessor.name(path) not in checkpoint)
+        stats = asyncio.run(reprocessor.run(paths, total))
+    finally:
+        if pool is not None:
+            pool.close()
+        checkpoint.close()
+        store.close()
+    return stats["processed"]
+
+
+def timed(func, *args) -> tuple:
+    start = time.perf_counter()
+    count = func(*args)
+    return count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch reprocessing throughput benchmark")
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--ocr-cost", type=float, default=20.0, help="simulated OCR CPU time per image in ms")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    args = parser.parse_args()
+    cost = args.ocr_cost / 1000
+
+    with tempfile.TemporaryDirectory() as workdir:
+        folder = os.path.join(workdir, "screenshots")
+        synthesize(folder, args.images)
+        print(f"{args.images} images, simulated OCR {args.ocr_cost:g}ms/image, {os.cpu_count()} CPUs")
+        print(f"{'mode':<12}{'images':>8}{'seconds':>10}{'images/s':>10}")
+        runs = [
+            ("serial", run_serial, ()),
+            ("batch", run_batch, (0,)),
+            (f"pool {args.workers}", run_batch, (args.workers,)),
+        ]
+        for i, (name, func, extra) in enumerate(runs):
+            output = os.path.join(workdir, f"out{i}")
+            os.makedirs(output)
+            count, seconds = timed(func, folder, output, cost, *extra)
+            print(f"{name:<12}{count:>8}{seconds:>10.2f}{count / seconds:>10.1f}")
+
+        # 中断后续跑：第一次只处理一半，第二次应只处理剩余的一半
+        output = os.path.join(workdir, "resume")
+        os.makedirs(output)
+        first = run_batch(folder, output, cost, args.workers, limit=args.images // 2)
+        second = run_batch(folder, output, cost, args.workers)
+        store = JsonlResultStore(output)
+        stored = len(store)
+        store.close()
+        print(f"resume: first run {first}, second run {second}, stored {stored} records")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# 基准测试 - OCR结果存储
+#
+# 对比旧版 ocr_results.json 读-改-写 与 JSONL/SQLite 追加写的单次写入耗时。
+# 用法: python benchmarks/bench_result_store.py [--records 100000] [--legacy-records 3000]
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.result_store import create_result_store
+
+SAMPLE_TEXT = "***极@微信5/15 21:52:19\n我现在的项目差些东西，需要在DataGrip里加入hive，然后导入IDEA里"
+
+
+def legacy_append(json_path, record):
+    """旧版 OCRProcessor._append_to_json 的写入方式"""
+    results = []
+    if os.path.exists(json_path):
+        with open(json_path, "r", encoding="utf-8") as f:
+            results = json.load(f)
+    results.append(record)
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def run(name, append, total, buckets=10):
+    """写入 total 条记录，按区间输出平均单次写入耗时（微秒）"""
+    step = max(total // buckets, 1)
+    per_bucket = []
+    start = time.perf_counter()
+    for i in range(total):
+        if i % step == 0:
+            bucket_start = time.perf_counter()
+        append({"file": f"screenshot_{i}.png", "text": SAMPLE_TEXT})
+        if i % step == step - 1:
+            per_bucket.append((time.perf_counter() - bucket_start) / step * 1e6)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>8}: {total} records in {elapsed:.2f}s, "
+          f"first bucket {per_bucket[0]:.1f}us/append, last bucket {per_bucket[-1]:.1f}us/append")
+    print(" " * 10 + " ".join(f"{us:.0f}" for us in per_bucket))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR result store append benchmark")
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--legacy-records", type=int, default=3_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "ocr_results.json")
+        run("legacy", lambda r: legacy_append(legacy_path, r), args.legacy_records)
+
+        for backend in ("jsonl", "sqlite"):
+            store = create_result_store(os.path.join(tmp, backend), backend)
+            run(backend, store.append, args.records)
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# 基准测试 - 启动耗时：主模块导入时间与首帧前的“盲区”
+#
+# 1. 在新进程中多次导入 main，比较延迟导入后的耗时与同时导入原先在导入时加载的 openai/httpx/yaml 的耗时；
+#    paddleocr 已安装时再加上导入 paddleocr 的耗时。
+# 2. 用固定耗时的假模型加载模拟 PaddleOCR 初始化，比较同步加载与后台预热（warm start）下：
+#    可以开始截图/变化检测的时间、第一条消息完成OCR的时间（第一条消息在导入后 --first-message 秒到达）。
+# 用法: python benchmarks/bench_startup.py [--runs 5] [--model-load 4.0] [--first-message 1.0]
+
+import argparse
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+from core.frame import Frame, GRAY
+from core.ocr_processor import LazyEngine, OCRProcessor
+from utils.logger import LOGGER
+
+LOGGER.remove()
+
+IMPORT_SCRIPT = """
+import sys, time
+sys.path.insert(0, sys.argv[1])
+start = time.perf_counter()
+import main
+for name in sys.argv[2:]:
+    __import__(name)
+print(time.perf_counter() - start)
+"""
+
+
+class SlowEngine:
+    """初始化耗时固定的假OCR引擎"""
+
+    def __init__(self, load_seconds: float):
+        time.sleep(load_seconds)
+
+    def ocr(self, image, cls=True):
+        return [[(None, ("hello", 0.99))]]
+
+
+def import_seconds(runs: int, extra_modules) -> float:
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT, SRC, *extra_modules], check=True,
+                                capture_output=True, text=True, cwd=os.path.join(SRC, "..")).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def first_message(warm_start: bool, model_load: float, arrival: float) -> tuple:
+    """返回 (可以开始截图的时间, 第一条消息OCR完成的时间)，均从创建OCRProcessor起计"""
+    frame = Frame(np.full((200, 300), 235, dtype=np.uint8), GRAY)
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        if warm_start:
+            engine = LazyEngine(lambda: SlowEngine(model_load), background=True)
+        else:
+            engine = SlowEngine(model_load)
+        processor = OCRProcessor(workdir, engine=engine)
+        ready = time.perf_counter() - start
+        # 第一条消息在可以截图之后 arrival 秒出现
+        time.sleep(arrival)
+        processor.extract(frame)
+        done = time.perf_counter() - start
+        processor.store.close()
+    return ready, done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per import measurement")
+    parser.add_argument("--model-load", type=float, default=4.0, help="simulated OCR model load seconds")
+    parser.add_argument("--first-message", type=float, default=1.0,
+                        help="seconds after capture starts until the first message arrives")
+    args = parser.parse_args()
+
+    eager = ["openai", "httpx", "yaml"]
+    if importlib.util.find_spec("paddleocr") is not None:
+        eager.append("paddleocr")
+    lazy_time = import_seconds(args.runs, [])
+    eager_time = import_seconds(args.runs, eager)
+    print(f"import main (median of {args.runs}): lazy {lazy_time * 1000:.0f}ms, "
+          f"with {'/'.join(eager)} {eager_time * 1000:.0f}ms")
+
+    print(f"simulated model load {args.model_load}s, first message {args.first_message}s after capture starts")
+    print(f"{'mode':<12}{'capture starts':>16}{'first OCR done':>16}")
+    for name, warm in (("sync", False), ("warm start", True)):
+        ready, done = first_message(warm, args.model_load, args.first_message)
+        print(f"{name:<12}{ready:>15.2f}s{done:>15.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# 基准测试 - 轮询策略的检测延迟与唤醒次数
+#
+# 用虚拟时钟模拟若干小时的聊天（会话突发 + 会话内的泊松消息），比较固定间隔轮询、
+# 没有窗口事件时的自适应轮询（最长间隔为 fallback_max_interval）、自适应轮询 + 窗口事件唤醒
+# 的检测延迟分位数与每小时截图次数（空闲 CPU 的主要来源）；最后一行在界面事件风暴下
+# 检查每分钟事件唤醒上限。
+# 用法: python benchmarks/bench_triggers.py [--hours 8] [--fixed 5] [--min 3 --max 30 --fallback-max 6.5]
+
+import argparse
+import bisect
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.pipeline import percentile
+from core.triggers import AdaptivePoller
+
+
+def simulate_messages(hours, session_gap, message_gap, session_messages, seed):
+    """会话按 session_gap 的平均间隔到达，每个会话内约 session_messages 条消息"""
+    rng = random.Random(seed)
+    end = hours * 3600
+    times, t = [], 0.0
+    while True:
+        t += rng.expovariate(1 / session_gap)
+        if t >= end:
+            return sorted(times)
+        m = t
+        for _ in range(max(1, int(rng.expovariate(1 / session_messages)))):
+            times.append(m)
+            m += rng.expovariate(1 / message_gap)
+
+
+def simulate_events(messages, hours, hook_delay, noise_gap, seed):
+    """每条消息在 hook_delay 后产生一个窗口事件，另有与消息无关的噪声事件"""
+    rng = random.Random(seed + 1)
+    events = [m + hook_delay for m in messages]
+    t = 0.0
+    while noise_gap:
+        t += rng.expovariate(1 / noise_gap)
+        if t >= hours * 3600:
+            break
+        events.append(t)
+    return sorted(events)
+
+
+def run_policy(messages, end, next_wake):
+    """next_wake(now, changed) 返回下一次截图时刻；返回 (检测延迟列表, 截图次数)"""
+    latencies, captures, now, index = [], 0, 0.0, 0
+    while now < end:
+        captures += 1
+        changed = False
+        while index < len(messages) and messages[index] <= now:
+            latencies.append(now - messages[index])
+            index += 1
+            changed = True
+        now = next_wake(now, changed)
+    return latencies, captures
+
+
+def fixed(interval):
+    return lambda now, changed: now + interval
+
+
+def adaptive(args, events=None):
+    clock = [0.0]
+    max_interval = args.max if events else min(args.max, args.fallback_max)
+    poller = AdaptivePoller(args.min, max_interval, args.backoff, args.idle_after, clock=lambda: clock[0])
+    last_wake = [float("-inf")]
+    event_wakes = []
+
+    def next_wake(now, changed):
+        clock[0] = now
+        if changed:
+            poller.activity()
+        wake = now + poller.next_interval()
+        if events:
+            # 下一个事件早于定时唤醒时提前截图（受 debounce 与每分钟事件唤醒上限限制）
+            i = bisect.bisect_right(events, now)
+            if i < len(events) and events[i] < wake:
+                early = max(events[i], last_wake[0] + args.debounce)
+                if args.max_event_wakeups and len(event_wakes) >= args.max_event_wakeups:
+                    early = max(early, event_wakes[-args.max_event_wakeups] + 60.0)
+                if early < wake:
+                    wake = early
+                    event_wakes.append(wake)
+        last_wake[0] = wake
+        return wake
+    return next_wake
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Polling policy latency / wakeup simulation")
+    parser.add_argument("--hours", type=float, default=8)
+    parser.add_argument("--fixed", type=float, default=5.0, help="legacy app.polling_interval")
+    parser.add_argument("--min", type=float, default=3.0)
+    parser.add_argument("--max", type=float, default=30.0)
+    parser.add_argument("--fallback-max", type=float, default=6.5, help="max interval without window events")
+    parser.add_argument("--backoff", type=float, default=1.1)
+    parser.add_argument("--idle-after", type=float, default=20.0)
+    parser.add_argument("--debounce", type=float, default=0.2)
+    parser.add_argument("--max-event-wakeups", type=int, default=30, help="per minute, 0 = unlimited")
+    parser.add_argument("--session-gap", type=float, default=600, help="mean seconds between chat sessions")
+    parser.add_argument("--message-gap", type=float, default=15, help="mean seconds between messages in a session")
+    parser.add_argument("--session-messages", type=float, default=8)
+    parser.add_argument("--hook-delay", type=float, default=0.05)
+    parser.add_argument("--noise-gap", type=float, default=60, help="mean seconds between unrelated UI events")
+    parser.add_argument("--storm-gap", type=float, default=0.5, help="noise gap for the event storm run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    messages = simulate_messages(args.hours, args.session_gap, args.message_gap, args.session_messages, args.seed)
+    events = simulate_events(messages, args.hours, args.hook_delay, args.noise_gap, args.seed)
+    storm = simulate_events(messages, args.hours, args.hook_delay, args.storm_gap, args.seed)
+    end = args.hours * 3600
+    print(f"{len(messages)} messages over {args.hours:g}h")
+    print(f"{'policy':<26}{'p50 s':>8}{'p95 s':>8}{'max s':>8}{'captures/h':>12}")
+    for name, policy in (
+        (f"fixed {args.fixed:g}s", fixed(args.fixed)),
+        (f"adaptive {args.min:g}-{min(args.max, args.fallback_max):g}s, no events", adaptive(args)),
+        (f"adaptive {args.min:g}-{args.max:g}s + events", adaptive(args, events)),
+        (f"  event storm ({args.storm_gap:g}s)", adaptive(args, storm)),
+    ):
+        latencies, captures = run_policy(messages, end, policy)
+        latencies.sort()
+        print(f"{name:<26}{percentile(latencies, 50):>8.2f}{percentile(latencies, 95):>8.2f}"
+              f"{latencies[-1] if latencies else 0:>8.2f}{captures / args.hours:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# 基准测试 - 结构化短回复与自由文本回复的判断延迟
+#
+# 本地模拟接口按 “固定往返延迟 + 每个输出 token 的生成耗时” 作答：未要求 JSON 时返回带解释的长回复，
+# 要求 JSON 时返回 {"label", "confidence"}。比较两种模式的延迟分位数、输出 token 数、
+# 标签分布与解析失败次数（--noise 让一部分回复变成无法解析的内容）。
+# 用法: python benchmarks/bench_verdicts.py [--messages 60] [--latency 0.15] [--token-latency 0.01] [--max-tokens 24]
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests"))
+
+from core.ai_analyzer import AsyncDashscopeAnalyzer
+from core.pipeline import percentile
+from core.verdict import LABELS, VERDICT_INSTRUCTIONS, parse_verdict
+from stub_chat_server import StubChatServer
+from utils.logger import LOGGER
+
+LOGGER.remove()
+
+PROMPT = ("The above is part of the chat record. Based on this, please guess whether Python should be used "
+          "to solve the content description in the text? Please answer 'yes', 'no' or 'not sure'.")
+EXPLANATION = ("Based on the chat record, the colleagues are discussing a repetitive data processing task "
+               "that involves merging spreadsheets and extracting values, which is the kind of work that "
+               "can be automated with a short script using pandas or openpyxl, so I would say the answer is")
+
+
+def label_for(text: str) -> str:
+    return LABELS[hashlib.md5(text.encode("utf-8")).digest()[0] % 3]
+
+
+def make_reply(noise: float, seed: int):
+    rng = random.Random(seed)
+
+    def reply(messages):
+        text = messages[-1]["content"]
+        label = label_for(text)
+        if rng.random() < noise:
+            return "I think maybe eyes"
+        if VERDICT_INSTRUCTIONS in messages[0]["content"]:
+            return json.dumps({"label": label, "confidence": 0.85})
+        return f"{label.capitalize()}. {EXPLANATION} {label}."
+    return reply
+
+
+async def run(analyzer, texts, prompt):
+    latencies, verdicts = [], []
+
+    async def one(text):
+        start = time.perf_counter()
+        content = await analyzer.analyze_text(text, prompt)
+        verdicts.append((text, content, parse_verdict(content)))
+        latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(text) for text in texts))
+    await analyzer.aclose()
+    return sorted(latencies), verdicts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Structured vs free-text verdict latency")
+    parser.add_argument("--messages", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.15, help="stub seconds per request")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="stub seconds per output token")
+    parser.add_argument("--max-tokens", type=int, default=24)
+    parser.add_argument("--noise", type=float, default=0.05, help="fraction of unparsable replies")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    texts = [f"消息 {i}：每天要把表格合并成一个，能不能自动处理？" for i in range(args.messages)]
+    print(f"{args.messages} messages, stub {args.latency}s + {args.token_latency}s/token, noise {args.noise}")
+    print(f"{'mode':<12}{'p50 ms':>9}{'p95 ms':>9}{'tokens/reply':>14}{'correct':>9}{'failures':>10}  labels")
+    for mode in ("free text", "structured"):
+        structured = mode == "structured"
+        with StubChatServer(reply=make_reply(args.noise, args.seed), latency=args.latency,
+                            token_latency=args.token_latency) as server:
+            analyzer = AsyncDashscopeAnalyzer(
+                api_key="bench", base_url=server.base_url, max_concurrency=8, max_connections=8,
+                structured=structured, max_tokens=args.max_tokens if structured else None,
+            )
+            prompt = f"{PROMPT} {VERDICT_INSTRUCTIONS}" if structured else PROMPT
+            latencies, verdicts = asyncio.run(run(analyzer, texts, prompt))
+        failures = sum(not v.parsed for _, _, v in verdicts)
+        correct = sum(v.label == label_for(t) for t, _, v in verdicts if v.parsed)
+        labels = {label: sum(v.label == label for _, _, v in verdicts) for label in LABELS}
+        tokens = sum(len(content.split(" ")) for _, content, _ in verdicts) / len(verdicts)
+        print(f"{mode:<12}{percentile(latencies, 50) * 1000:>9.0f}{percentile(latencies, 95) * 1000:>9.0f}"
+              f"{tokens:>14.1f}{correct:>9}{failures:>10}  {labels}")
+
+
+if __name__ == "__main__":
+    main()
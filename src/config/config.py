@@ -1,28 +1,127 @@
 # 配置管理
 
-import yaml
 import os
+import threading
+from typing import Callable, FrozenSet, List, Mapping, Optional
+from config.settings import ConfigError, Settings
 from utils.logger import LOGGER
 
+# 订阅者回调：(旧快照, 新快照, 变化的顶层配置项)
+Subscriber = Callable[[Optional[Settings], Settings, FrozenSet[str]], None]
+
+
 class Config:
-    """管理配置文件加载和访问"""
+    """管理配置文件加载和访问；首次访问时才读取配置文件，导入本模块不做文件 I/O。
+
+    配置以不可变的 Settings 快照保存，热加载时校验新内容并整体替换快照，再通知订阅者；
+    新内容不合法时保留原快照。
+    """
     def __init__(self, config_path="config.yaml"):
+        self.config_path = config_path
+        self._snapshot: Optional[Settings] = None
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+        self._file_state = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+
+    def _read(self) -> Mapping:
+        import yaml
+        self._file_state = self._stat()
+        with open(self.config_path, "r", encoding="utf-8") as f:
+            return yaml.safe_load(f)
+
+    def _stat(self):
         try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                self.config = yaml.safe_load(f)
-            LOGGER.info(f"Loaded configuration from {config_path}")
-        except Exception as e:
-            LOGGER.error(f"Failed to load config: {e}")
-            raise
+            stat = os.stat(self.config_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @property
+    def snapshot(self) -> Settings:
+        """当前配置快照；读取后可在整个处理过程中使用，不受热加载影响"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    try:
+                        self._snapshot = Settings.from_dict(self._read())
+                        LOGGER.info(f"Loaded configuration from {self.config_path}")
+                    except Exception as e:
+                        LOGGER.error(f"Failed to load config: {e}")
+                        raise
+                snapshot = self._snapshot
+        return snapshot
+
+    @property
+    def config(self) -> Mapping:
+        """当前配置的只读原始内容"""
+        return self.snapshot.raw
 
     def get(self, key, default=None):
-        """获取配置值，支持嵌套键（如 'ai.model'）"""
-        keys = key.split(".")
-        value = self.config
-        for k in keys:
-            value = value.get(k, default)
-            if value == default:
-                break
-        return value
-
-CONFIG = Config()
\ No newline at end of file
+        """获取配置值，支持嵌套键（如 'ai.model'）；任一级不存在时返回 default"""
+        return self.snapshot.get(key, default)
+
+    def subscribe(self, callback: Subscriber) -> None:
+        """快照替换后调用 callback(old, new, changed)；回调在执行替换的线程中调用"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Subscriber) -> None:
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def apply(self, data: Mapping) -> Settings:
+        """校验 data 并替换当前快照，通知订阅者；不合法时抛出 ConfigError 且不做替换"""
+        settings = Settings.from_dict(data)
+        with self._lock:
+            old, self._snapshot = self._snapshot, settings
+            subscribers = list(self._subscribers)
+        changed = settings.changed_sections(old)
+        if changed:
+            LOGGER.info(f"Configuration updated: {', '.join(sorted(changed))}")
+        for callback in subscribers:
+            try:
+                callback(old, settings, changed)
+            except Exception as e:
+                LOGGER.error(f"Config subscriber failed: {e}")
+        return settings
+
+    def reload(self) -> bool:
+        """重新读取配置文件；读取或校验失败时记录日志并保留原快照"""
+        try:
+            data = self._read()
+            self.apply(data)
+        except ConfigError as e:
+            LOGGER.error(f"Invalid configuration in {self.config_path}, keeping previous settings: {e}")
+            return False
+        except Exception as e:
+            LOGGER.error(f"Failed to reload config, keeping previous settings: {e}")
+            return False
+        return True
+
+    def watch(self, interval: float = 1.0) -> None:
+        """在后台线程中每 interval 秒检查配置文件的修改时间与大小，变化时重新加载"""
+        if self._watcher is not None:
+            return
+        self.snapshot  # 确保已加载，记录文件状态
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="config-watcher", daemon=True)
+        self._watcher.start()
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop_watching.wait(interval):
+            state = self._stat()
+            if state is not None and state != self._file_state:
+                self.reload()
+
+    def stop_watching(self) -> None:
+        if self._watcher is not None:
+            self._stop_watching.set()
+            self._watcher.join()
+            self._watcher = None
+
+
+CONFIG = Config()
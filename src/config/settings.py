@@ -0,0 +1,234 @@
+# 配置快照：校验后的不可变配置，常用字段预先解析为带类型的属性
+
+import inspect
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, FrozenSet, Mapping, Optional, Tuple
+from core.change_detector import ChangeDetector
+from core.targets import MonitorTarget, load_targets
+from core.verdict import VERDICT_INSTRUCTIONS
+
+_MISSING = object()
+_ABSENT = object()
+# 检测器参数的下限，未列出的参数 (容差) 下限为 0
+_DETECTOR_MINIMUM = {"downscale": 1, "tile_rows": 1, "block_size": 1}
+
+
+class ConfigError(ValueError):
+    """配置内容不合法"""
+
+
+def freeze(value: Any) -> Any:
+    """把 yaml 读出的 dict/list 递归转换为只读的 mappingproxy/tuple"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def _number(section: Mapping, key: str, default, minimum: float = 0.0, kind=float, path: str = ""):
+    value = section.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ConfigError(f"{path}{key} must be a number, got {value!r}")
+    if value < minimum:
+        raise ConfigError(f"{path}{key} must be >= {minimum}, got {value!r}")
+    return kind(value)
+
+
+def _section(data: Mapping, key: str) -> Mapping:
+    value = data.get(key)
+    if value is None:
+        return {}
+    if not isinstance(value, Mapping):
+        raise ConfigError(f"{key} must be a mapping, got {type(value).__name__}")
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class PathSettings:
+    screenshots: str = "./screenshots"
+    judgments: str = "./judgments"
+    logs: str = "./logs"
+    ocr_results: str = "./logs"
+
+
+@dataclass(frozen=True, slots=True)
+class DetailsWindowSettings:
+    open_timeout: float = 2.0
+    close_timeout: float = 1.0
+    poll_interval: float = 0.05
+    retries: int = 1
+    deadline: float = 5.0
+
+
+@dataclass(frozen=True, slots=True)
+class DetectorSettings:
+    """change_threshold 为原始分辨率下的像素数；options 为 ChangeDetector 的其余参数"""
+    change_threshold: int = 5000
+    options: Mapping = field(default_factory=lambda: MappingProxyType({}))
+
+
+@dataclass(frozen=True, slots=True)
+class SchedulerSettings:
+    quiet_period: float = 2.0
+    max_delay: float = 10.0
+
+
+@dataclass(frozen=True, slots=True)
+class TriggerSettings:
+    min_interval: float = 3.0
+    max_interval: float = 5.0
+    backoff: float = 1.1
+    idle_after: float = 20.0
+    events: str = "auto"
+    debounce: float = 0.2
+    max_event_wakeups: int = 30
+    fallback_max_interval: float = 6.5
+
+
+@dataclass(frozen=True, slots=True)
+class AISettings:
+    """可在运行中替换的判断参数；模型、地址与连接池等在启动时读取。prompt 已按 structured 追加返回格式要求"""
+    prompt: str = ""
+    structured: bool = False
+    alert_threshold: float = 0.5
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """某一时刻的完整配置。
+
+    常用字段在加载时解析、校验并转换为带类型的属性，热路径直接读取属性；
+    其余配置通过 get('a.b') 访问只读的原始内容。热加载时整体替换为新的快照，不修改旧快照。
+    """
+    paths: PathSettings
+    details_window: DetailsWindowSettings
+    detector: DetectorSettings
+    scheduler: SchedulerSettings
+    trigger: TriggerSettings
+    ai: AISettings
+    targets: Tuple[MonitorTarget, ...]
+    raw: Mapping
+    _cache: dict = field(default_factory=dict, repr=False, compare=False)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Mapping]) -> "Settings":
+        """校验并构建快照；配置不合法时抛出 ConfigError"""
+        if data is None:
+            data = {}
+        if not isinstance(data, Mapping):
+            raise ConfigError(f"Configuration must be a mapping, got {type(data).__name__}")
+        raw = freeze(data)
+
+        paths = _section(raw, "paths")
+        for key, value in paths.items():
+            if value is not None and not isinstance(value, str):
+                raise ConfigError(f"paths.{key} must be a string, got {value!r}")
+
+        details = _section(raw, "details_window")
+        details_window = DetailsWindowSettings(
+            open_timeout=_number(details, "open_timeout", 2.0, path="details_window."),
+            close_timeout=_number(details, "close_timeout", 1.0, path="details_window."),
+            poll_interval=_number(details, "poll_interval", 0.05, path="details_window."),
+            retries=_number(details, "retries", 1, kind=int, path="details_window."),
+            deadline=_number(details, "deadline", 5.0, path="details_window."),
+        )
+
+        detector_options = _section(raw, "detector")
+        detector_parameters = inspect.signature(ChangeDetector.__init__).parameters
+        for key, value in detector_options.items():
+            parameter = detector_parameters.get(key)
+            if parameter is None or key in ("self", "change_threshold"):
+                raise ConfigError(f"Unknown detector option detector.{key}")
+            if isinstance(value, float) and parameter.annotation is int:
+                raise ConfigError(f"detector.{key} must be an integer, got {value!r}")
+            _number(detector_options, key, None, minimum=_DETECTOR_MINIMUM.get(key, 0),
+                    kind=parameter.annotation, path="detector.")
+        detector = DetectorSettings(
+            change_threshold=_number(_section(raw, "thresholds"), "change_detection", 5000, kind=int,
+                                     path="thresholds."),
+            options=detector_options,
+        )
+
+        scheduler_options = _section(raw, "scheduler")
+        scheduler = SchedulerSettings(
+            quiet_period=_number(scheduler_options, "quiet_period", 2.0, path="scheduler."),
+            max_delay=_number(scheduler_options, "max_delay", 10.0, path="scheduler."),
+        )
+
+        app = _section(raw, "app")
+        trigger_options = _section(raw, "trigger")
+        polling_interval = _number(app, "polling_interval", 5.0, path="app.")
+        trigger = TriggerSettings(
+            min_interval=_number(trigger_options, "min_interval", 3.0, path="trigger."),
+            max_interval=_number(trigger_options, "max_interval", polling_interval, path="trigger."),
+            backoff=_number(trigger_options, "backoff", 1.1, minimum=1.0, path="trigger."),
+            idle_after=_number(trigger_options, "idle_after", 20.0, path="trigger."),
+            events=str(trigger_options.get("events", "auto")),
+            debounce=_number(trigger_options, "debounce", 0.2, path="trigger."),
+            max_event_wakeups=_number(trigger_options, "max_event_wakeups", 30, kind=int, path="trigger."),
+            fallback_max_interval=_number(trigger_options, "fallback_max_interval", 6.5, path="trigger."),
+        )
+
+        ai_options = _section(raw, "ai")
+        prompt = ai_options.get("prompt") or ""
+        if not isinstance(prompt, str):
+            raise ConfigError(f"ai.prompt must be a string, got {prompt!r}")
+        structured = bool(ai_options.get("structured", False))
+        ai = AISettings(
+            prompt=f"{prompt} {VERDICT_INSTRUCTIONS}" if structured else prompt,
+            structured=structured,
+            alert_threshold=_number(ai_options, "alert_threshold", 0.5, path="ai."),
+        )
+        if ai.alert_threshold > 1:
+            raise ConfigError(f"ai.alert_threshold must be <= 1, got {ai.alert_threshold!r}")
+
+        settings = cls(
+            paths=PathSettings(**{k: v for k, v in paths.items()
+                                  if v is not None and k in PathSettings.__dataclass_fields__}),
+            details_window=details_window,
+            detector=detector,
+            scheduler=scheduler,
+            trigger=trigger,
+            ai=ai,
+            targets=(),
+            raw=raw,
+        )
+        try:
+            targets = tuple(load_targets(settings))
+        except (ValueError, TypeError, AttributeError) as e:
+            raise ConfigError(f"Invalid monitor targets: {e}") from e
+        for target in targets:
+            box = target.chat_box
+            for key in ("x", "y_offset", "width", "height"):
+                if isinstance(box.get(key), bool) or not isinstance(box.get(key), int):
+                    raise ConfigError(f"chat_box.{key} of target {target.name} must be an integer")
+            if box["width"] <= 0 or box["height"] <= 0:
+                raise ConfigError(f"chat_box of target {target.name} must have a positive size")
+        object.__setattr__(settings, "targets", targets)
+        return settings
+
+    def get(self, key: str, default=None):
+        """获取原始配置值，支持嵌套键（如 'ai.model'）；任一级不存在时返回 default"""
+        value = self._cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = self.raw
+            for k in key.split("."):
+                if not isinstance(value, Mapping) or k not in value:
+                    value = _ABSENT
+                    break
+                value = value[k]
+            self._cache[key] = value
+        return default if value is _ABSENT else value
+
+    def target(self, name: str) -> Optional[MonitorTarget]:
+        return next((t for t in self.targets if t.name == name), None)
+
+    def changed_sections(self, other: Optional["Settings"]) -> FrozenSet[str]:
+        """与另一个快照相比内容不同的顶层配置项"""
+        if other is None:
+            return frozenset(self.raw)
+        keys = set(self.raw) | set(other.raw)
+        return frozenset(k for k in keys if self.raw.get(k, _MISSING) != other.raw.get(k, _MISSING))
+
@@ -1,9 +1,16 @@
 # AI分析接口
 
 from abc import ABC, abstractmethod
-from openai import OpenAI
+from typing import Optional
 from utils.logger import LOGGER
+from utils.metrics import METRICS
+import asyncio
+import importlib
 import os
+import random
+import time
+
+# openai/httpx 导入耗时较长（约 0.5 秒以上），在首次创建客户端时才导入
 
 class AIAnalyzer(ABC):
     @abstractmethod
@@ -16,10 +23,26 @@ class AIAnalyzer(ABC):
         """分析文本，返回结果"""
         pass
 
+class AsyncAIAnalyzer(ABC):
+    @abstractmethod
+    async def analyze_image(self, image_data: str, prompt: str) -> str:
+        """异步分析图像，返回结果"""
+        pass
+
+    @abstractmethod
+    async def analyze_text(self, text: str, prompt: str) -> str:
+        """异步分析文本，返回结果"""
+        pass
+
+    async def aclose(self) -> None:
+        """释放连接等资源"""
+        pass
+
 class DashscopeAnalyzer(AIAnalyzer):
     def __init__(self, api_key: str = None, base_url: str = None):
         self.api_key = api_key or os.getenv("DASHSCOPE_API_KEY")
         self.base_url = base_url
+        from openai import OpenAI
         self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
         LOGGER.info("Initialized DashscopeAnalyzer")
 
@@ -45,7 +68,7 @@ class DashscopeAnalyzer(AIAnalyzer):
             LOGGER.error(f"Failed to analyze image: {e}")
             return None
 
-    def analyze_text(self, prompt: str, chat_text: str) -> str:
+    def analyze_text(self, chat_text: str, prompt: str) -> str:
         """调用Dashscope API分析文本"""
         try:
             completion = self.client.chat.completions.create(
@@ -60,4 +83,143 @@ class DashscopeAnalyzer(AIAnalyzer):
             return result
         except Exception as e:
             LOGGER.error(f"Failed to analyze text: {e}")
-            return None
\ No newline at end of file
+            return None
+
+class AsyncDashscopeAnalyzer(AsyncAIAnalyzer):
+    """基于 AsyncOpenAI 的异步分析器：共享连接池、并发上限、超时与带抖动的退避重试"""
+
+    def __init__(self, api_key: str = None, base_url: str = None,
+                 text_model: str = "qwen-turbo-latest", image_model: str = "qwen-vl-max-latest",
+                 max_concurrency: int = 4, timeout: float = 15.0, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0, max_connections: int = 10,
+                 max_tokens: Optional[int] = None, structured: bool = False):
+        self.api_key = api_key or os.getenv("DASHSCOPE_API_KEY")
+        self.base_url = base_url
+        self.text_model = text_model
+        self.image_model = image_model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # structured 时文本判断要求 JSON 输出；max_tokens 限制回复长度（输出越短延迟越低）
+        self.max_tokens = max_tokens
+        self.structured = structured
+        self.max_connections = max_connections
+        self.http_client = None
+        self._client = None
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        LOGGER.info(f"Initialized AsyncDashscopeAnalyzer (max_concurrency={max_concurrency})")
+
+    @property
+    def client(self):
+        """首次使用时导入 SDK 并创建共享连接池的客户端"""
+        if self._client is None:
+            import httpx
+            from openai import AsyncOpenAI
+            self.http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                timeout=self.timeout,
+            )
+            # 重试由本类处理，关闭 SDK 自带的重试
+            self._client = AsyncOpenAI(
+                api_key=self.api_key, base_url=self.base_url, http_client=self.http_client,
+                max_retries=0, timeout=self.timeout,
+            )
+        return self._client
+
+    async def warm_up(self) -> None:
+        """在线程中导入 SDK，并预先建立到 base_url 的连接（DNS、TLS 握手），首个判断请求不再承担这部分延迟"""
+        start = time.perf_counter()
+        await asyncio.to_thread(importlib.import_module, "openai")
+        client = self.client
+        try:
+            await self.http_client.head(str(client.base_url), timeout=self.timeout)
+        except Exception as e:
+            LOGGER.warning(f"Failed to pre-connect to {client.base_url}: {e}")
+        LOGGER.info(f"AI client warmed up in {time.perf_counter() - start:.2f}s")
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """指数退避 + 全抖动，服务端给出 Retry-After 时取两者较大值"""
+        from openai import APIStatusError
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if isinstance(error, APIStatusError):
+            try:
+                delay = max(delay, float(error.response.headers.get("retry-after", 0)))
+            except ValueError:
+                pass
+        return delay
+
+    async def _create(self, **kwargs):
+        client = self.client
+        from openai import APIConnectionError, APIStatusError
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    return await client.chat.completions.create(timeout=self.timeout, **kwargs)
+            except APIStatusError as e:
+                if e.status_code != 429 and e.status_code < 500:
+                    raise
+                error = e
+            except APIConnectionError as e:  # 包括超时
+                error = e
+            if attempt == self.max_retries:
+                raise error
+            delay = self._retry_delay(attempt, error)
+            METRICS.inc("ai_retries")
+            LOGGER.warning(f"AI request failed ({error}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def analyze_image(self, image_data: str, prompt: str) -> Optional[str]:
+        """异步调用Dashscope API分析图像"""
+        try:
+            completion = await self._create(
+                model=self.image_model,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_data}"}},
+                            {"type": "text", "text": prompt}
+                        ]
+                    }
+                ]
+            )
+            result = completion.choices[0].message.content
+            LOGGER.info(f"AI image analysis result: {result}")
+            return result
+        except Exception as e:
+            LOGGER.error(f"Failed to analyze image: {e}")
+            METRICS.inc("errors", operation="ai")
+            return None
+
+    async def analyze_text(self, text: str, prompt: str) -> Optional[str]:
+        """异步调用Dashscope API分析文本"""
+        return await self.complete(prompt, text, json_response=self.structured, max_tokens=self.max_tokens)
+
+    async def complete(self, system: str, user: str, json_response: bool = False,
+                       max_tokens: Optional[int] = None) -> Optional[str]:
+        """发送一组 system/user 消息；json_response 为 True 时要求模型返回 JSON 对象"""
+        options = {"response_format": {"type": "json_object"}} if json_response else {}
+        if max_tokens:
+            options["max_tokens"] = max_tokens
+        try:
+            completion = await self._create(
+                model=self.text_model,
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": user}
+                ],
+                **options
+            )
+            result = completion.choices[0].message.content
+            LOGGER.info(f"AI text analysis result: {result}")
+            return result
+        except Exception as e:
+            LOGGER.error(f"Failed to analyze text: {e}")
+            METRICS.inc("errors", operation="ai")
+            return None
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.close()
@@ -0,0 +1,161 @@
+# AI判断的微批处理：短时间内到达的多条消息合并为一次请求
+
+import asyncio
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+from core.ai_analyzer import AsyncAIAnalyzer
+from utils.logger import LOGGER
+from utils.metrics import METRICS
+
+BATCH_INSTRUCTIONS = (
+    "Below are {count} numbered chat records. Judge each record independently using the instructions above. "
+    'Reply with a JSON object only, in the form {{"results": [{{"id": 1, "label": "yes", "confidence": 0.9}}, ...]}}, '
+    "with exactly one entry per record id, label being 'yes', 'no' or 'not sure' and confidence from 0 to 1."
+)
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def format_batch(texts: List[str]) -> str:
+    """把多条记录编号拼接为一条用户消息"""
+    parts = [BATCH_INSTRUCTIONS.format(count=len(texts))]
+    for i, text in enumerate(texts, 1):
+        parts.append(f"### Record {i}\n{text}")
+    return "\n\n".join(parts)
+
+
+def parse_batch(content: Optional[str], count: int) -> Dict[int, str]:
+    """解析批量结果，返回 {编号(从1开始): 单条回复}；无法解析时返回空字典。
+
+    单条回复为 {"label", "confidence"} 的 JSON 文本（由 parse_verdict 解析），兼容只有 answer 字符串的条目。
+    """
+    if not content:
+        return {}
+    try:
+        data = json.loads(_FENCE.sub("", content.strip()))
+    except ValueError:
+        return {}
+    results = data.get("results") if isinstance(data, dict) else data
+    if not isinstance(results, list):
+        return {}
+    answers = {}
+    for entry in results:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            index = int(entry.get("id"))
+        except (TypeError, ValueError):
+            continue
+        if not 1 <= index <= count:
+            continue
+        if isinstance(entry.get("label"), str):
+            answers[index] = json.dumps({k: v for k, v in entry.items() if k != "id"}, ensure_ascii=False)
+        elif isinstance(entry.get("answer"), str):
+            answers[index] = entry["answer"]
+    return answers
+
+
+class BatchingAnalyzer(AsyncAIAnalyzer):
+    """把 max_wait 秒内到达、提示词相同的文本判断合并为一次编号的 JSON 请求，结果按编号分发。
+
+    批量请求通过下游的 complete(system, user, json_response) 发送；结果无法解析或缺少某些编号时，
+    对应的消息退回单独调用 analyze_text。请求本身失败（complete 返回 None，下游已重试过）时整批
+    返回 None，不再逐条重发。只有一条消息或下游不支持 complete 时直接单独调用。
+    """
+
+    def __init__(self, analyzer: AsyncAIAnalyzer, max_batch: int = 8, max_wait: float = 0.1):
+        self.analyzer = analyzer
+        # 与下游相同的模型名，使外层判断结果缓存的键不因是否批处理而变化
+        self.text_model = getattr(analyzer, "text_model", type(analyzer).__name__)
+        self.image_model = getattr(analyzer, "image_model", self.text_model)
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max_wait
+        self._pending: Dict[str, List[Tuple[str, asyncio.Future]]] = {}
+        self._flush_handles: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks = set()
+        self.items = 0
+        self.batches = 0
+        self.fallbacks = 0
+        self.failures = 0
+        LOGGER.info(f"Initialized BatchingAnalyzer (max_batch={self.max_batch}, max_wait={self.max_wait}s)")
+
+    async def analyze_text(self, text: str, prompt: str) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(prompt, [])
+        pending.append((text, future))
+        if len(pending) >= self.max_batch:
+            self._flush(prompt)
+        elif prompt not in self._flush_handles:
+            self._flush_handles[prompt] = loop.call_later(self.max_wait, self._flush, prompt)
+        return await future
+
+    def _flush(self, prompt: str) -> None:
+        handle = self._flush_handles.pop(prompt, None)
+        if handle is not None:
+            handle.cancel()
+        batch = self._pending.pop(prompt, [])
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._send(prompt, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, prompt: str, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        self.items += len(batch)
+        self.batches += 1
+        METRICS.inc("ai_batches")
+        METRICS.inc("ai_batched_items", len(batch))
+        answers = {}
+        if len(batch) > 1 and hasattr(self.analyzer, "complete"):
+            # 每条结果约占单条判断的输出长度
+            max_tokens = getattr(self.analyzer, "max_tokens", None)
+            content = await self.analyzer.complete(prompt, format_batch([text for text, _ in batch]),
+                                                   json_response=True,
+                                                   max_tokens=max_tokens and (max_tokens + 8) * len(batch))
+            if content is None:
+                self.failures += len(batch)
+                METRICS.inc("ai_batch_failures", len(batch))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+                return
+            answers = parse_batch(content, len(batch))
+            if len(answers) < len(batch):
+                self.fallbacks += len(batch) - len(answers)
+                METRICS.inc("ai_batch_fallbacks", len(batch) - len(answers))
+                LOGGER.warning(f"Batch response covered {len(answers)}/{len(batch)} records, "
+                               f"falling back to single requests")
+        await asyncio.gather(*(
+            self._resolve(future, answers.get(i), text, prompt) for i, (text, future) in enumerate(batch, 1)
+        ))
+
+    async def _resolve(self, future: asyncio.Future, answer: Optional[str], text: str, prompt: str) -> None:
+        if future.done():
+            return
+        try:
+            if answer is None:
+                answer = await self.analyzer.analyze_text(text, prompt)
+            if not future.done():
+                future.set_result(answer)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+
+    async def analyze_image(self, image_data: str, prompt: str) -> Optional[str]:
+        return await self.analyzer.analyze_image(image_data, prompt)
+
+    def stats(self) -> dict:
+        return {
+            "items": self.items,
+            "batches": self.batches,
+            "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "fallbacks": self.fallbacks,
+            "failures": self.failures,
+        }
+
+    async def aclose(self) -> None:
+        for prompt in list(self._pending):
+            self._flush(prompt)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.analyzer.aclose()
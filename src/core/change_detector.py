@@ -0,0 +1,132 @@
+# 区域感知的变化检测
+
+import cv2
+import numpy as np
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple, Union
+from PIL import Image
+from core.frame import Frame
+from utils.logger import LOGGER
+
+
+@dataclass
+class ChangeResult:
+    """一次检测的结果，tiles 为发生变化的行带（原图坐标 (y0, y1)）"""
+    changed: bool
+    diff_pixels: int = 0
+    tiles: List[Tuple[int, int]] = field(default_factory=list)
+    hash_hit: bool = False
+
+
+class ChangeDetector:
+    """单通道、可降采样的变化检测器。
+
+    先比较分块均值哈希，哈希未变化时直接返回；哈希变化后再按水平行带
+    (聊天气泡的行) 计算差异像素数，只报告发生变化的行带。
+    """
+
+    def __init__(self, change_threshold: int, downscale: int = 2, tile_rows: int = 6,
+                 block_size: int = 8, pixel_tolerance: int = 0, hash_tolerance: int = 0):
+        self.downscale = max(1, int(downscale))
+        self.tile_rows = max(1, int(tile_rows))
+        self.block_size = max(1, int(block_size))
+        self.pixel_tolerance = pixel_tolerance
+        self.hash_tolerance = hash_tolerance
+        # 阈值按原始分辨率的像素数配置，降采样后等比例缩小
+        self.change_threshold = change_threshold / (self.downscale * self.downscale)
+        self.previous: Optional[np.ndarray] = None
+        self.previous_hash: Optional[np.ndarray] = None
+        # 上一帧未达阈值时缓存其哈希与差异，画面静止时无需重复逐像素比较
+        self._last_hash: Optional[np.ndarray] = None
+        self._last_diff = 0
+
+    def to_gray(self, image: Union[Frame, Image.Image, np.ndarray]) -> np.ndarray:
+        """转换为（降采样后的）单通道缓冲区"""
+        if isinstance(image, Frame):
+            gray = image.gray
+        elif isinstance(image, np.ndarray):
+            gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        elif image.mode == "L":
+            gray = np.asarray(image)
+        elif image.mode in ("RGB", "RGBA", "RGBX"):
+            # 取绿色通道近似亮度，比 convert("L") 的加权转换便宜得多
+            gray = np.asarray(image.getchannel("G"))
+        else:
+            # P、1、LA、I 等模式没有绿色通道
+            gray = np.asarray(image.convert("L"))
+        if self.downscale > 1:
+            # 隔行隔列取样，得到的是视图而非拷贝
+            gray = gray[::self.downscale, ::self.downscale]
+        return gray
+
+    def block_hash(self, gray: np.ndarray) -> np.ndarray:
+        """分块均值哈希：每个 block_size×block_size 块的平均灰度"""
+        h, w = gray.shape[0] // self.block_size, gray.shape[1] // self.block_size
+        if h == 0 or w == 0:
+            return gray
+        return cv2.resize(gray, (w, h), interpolation=cv2.INTER_AREA)
+
+    def set_threshold(self, change_threshold: int) -> None:
+        """更新阈值（原始分辨率的像素数），保留比较基准"""
+        self.change_threshold = change_threshold / (self.downscale * self.downscale)
+        # 缓存的“未达阈值”结论按旧阈值得出
+        self._last_hash = None
+
+    def reset(self) -> None:
+        self.previous = None
+        self.previous_hash = None
+        self._last_hash = None
+
+    def update(self, gray: np.ndarray, frame_hash: Optional[np.ndarray] = None) -> None:
+        """将当前帧设为比较基准"""
+        self.previous = gray
+        self.previous_hash = self.block_hash(gray) if frame_hash is None else frame_hash
+        self._last_hash = None
+
+    def detect(self, image: Union[Frame, Image.Image, np.ndarray], update: bool = True) -> ChangeResult:
+        """检测与基准帧的差异。update 为 True 时，检测到变化后更新基准帧"""
+        gray = self.to_gray(image)
+        frame_hash = self.block_hash(gray)
+
+        if self.previous is None or self.previous.shape != gray.shape:
+            self.update(gray, frame_hash)
+            LOGGER.debug("Stored initial frame for change detection")
+            return ChangeResult(changed=False)
+
+        if self._hash_equal(frame_hash, self.previous_hash):
+            return ChangeResult(changed=False, hash_hit=True)
+        if self._last_hash is not None and self._hash_equal(frame_hash, self._last_hash):
+            return ChangeResult(changed=False, diff_pixels=self._last_diff, hash_hit=True)
+
+        diff = cv2.absdiff(gray, self.previous)
+        mask = diff > self.pixel_tolerance if self.pixel_tolerance else diff
+        tiles, counts = self._tile_counts(mask)
+        diff_pixels = int(counts.sum())
+        LOGGER.debug(f"Pixel difference: {diff_pixels} (scaled by 1/{self.downscale ** 2})")
+
+        changed = diff_pixels > self.change_threshold
+        result = ChangeResult(changed=changed, diff_pixels=diff_pixels)
+        if changed:
+            result.tiles = [tiles[i] for i in np.flatnonzero(counts)]
+            if update:
+                self.update(gray, frame_hash)
+        else:
+            self._last_hash, self._last_diff = frame_hash, diff_pixels
+        return result
+
+    def _hash_equal(self, a: np.ndarray, b: np.ndarray) -> bool:
+        if a.shape != b.shape:
+            return False
+        if self.hash_tolerance:
+            return int(cv2.absdiff(a, b).max()) <= self.hash_tolerance
+        return np.array_equal(a, b)
+
+    def _tile_counts(self, mask: np.ndarray) -> Tuple[List[Tuple[int, int]], np.ndarray]:
+        """按行带统计差异像素数，返回原图坐标下的行带与计数"""
+        height = mask.shape[0]
+        edges = np.linspace(0, height, min(self.tile_rows, height) + 1, dtype=int)
+        row_counts = np.count_nonzero(mask, axis=1)
+        counts = np.add.reduceat(row_counts, edges[:-1])
+        tiles = [(int(y0) * self.downscale, int(y1) * self.downscale)
+                 for y0, y1 in zip(edges[:-1], edges[1:])]
+        return tiles, counts
@@ -1,45 +1,51 @@
-import cv2
-import numpy as np
-from typing import Optional
+from typing import List, Optional, Tuple, Union
 from PIL import Image
+from core.frame import Frame
+from core.change_detector import ChangeDetector, ChangeResult
 from utils.logger import LOGGER
+from utils.metrics import METRICS, timed
 import time
 
 class ChatMonitor:
-    def __init__(self, change_threshold: int):
-        self.previous_screenshot = None
+    def __init__(self, change_threshold: int, **detector_options):
         self.change_threshold = change_threshold
+        self.detector_options = detector_options
+        self.detector = ChangeDetector(change_threshold, **detector_options)
+        self.last_result = ChangeResult(changed=False)
         self.last_update_time = 0
-        self.debounce_interval = 10  # 秒，忽略10秒内的重复更新
 
-    def check_updates(self, current_screenshot: Optional[Image.Image]) -> bool:
-        """检查聊天内容是否更新，带防抖机制"""
-        if not current_screenshot:
-            LOGGER.warning("No screenshot provided")
-            return False
+    def apply_settings(self, change_threshold: int, **detector_options) -> None:
+        """热加载：只改阈值时保留基准帧；检测参数变化时重建检测器，下一帧重新作为基准"""
+        if detector_options != self.detector_options:
+            self.detector = ChangeDetector(change_threshold, **detector_options)
+            self.detector_options = detector_options
+        else:
+            self.detector.set_threshold(change_threshold)
+        self.change_threshold = change_threshold
 
-        # 防抖：忽略短时间内的重复更新
-        if time.time() - self.last_update_time < self.debounce_interval:
-            LOGGER.debug("Debouncing: too soon since last update")
-            return False
+    def reset(self) -> None:
+        """丢弃基准帧（如聊天框位置变化后），下一帧只作为基准、不报告变化"""
+        self.detector.reset()
+        self.last_result = ChangeResult(changed=False)
 
-        screenshot_cv = cv2.cvtColor(np.array(current_screenshot), cv2.COLOR_RGB2BGR)
-        
-        if self.previous_screenshot is None:
-            self.previous_screenshot = screenshot_cv
-            LOGGER.debug("Stored initial screenshot")
+    @timed("check_updates")
+    def check_updates(self, current_screenshot: Optional[Union[Frame, Image.Image]]) -> bool:
+        """检查聊天内容是否更新，每帧都会比较并在变化时更新基准帧（突发合并由调度器负责）"""
+        if current_screenshot is None:
+            LOGGER.warning("No screenshot provided")
             return False
 
-        diff = cv2.absdiff(screenshot_cv, self.previous_screenshot)
-        gray_diff = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
-        non_zero_count = np.count_nonzero(gray_diff)
-        LOGGER.debug(f"Pixel difference: {non_zero_count}")
-
-        if non_zero_count > self.change_threshold:
-            # LOGGER.info(f"Detected chat update (diff: {non_zero_count})")
-            self.previous_screenshot = screenshot_cv
+        self.last_result = self.detector.detect(current_screenshot)
+        if self.last_result.changed:
+            # LOGGER.info(f"Detected chat update (diff: {self.last_result.diff_pixels})")
             self.last_update_time = time.time()
+            METRICS.inc("changes_detected")
             return True
 
         LOGGER.debug("No chat update detected")
-        return False
\ No newline at end of file
+        return False
+
+    @property
+    def changed_tiles(self) -> List[Tuple[int, int]]:
+        """最近一次检测中发生变化的行带 (y0, y1)"""
+        return self.last_result.tiles
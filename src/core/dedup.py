@@ -0,0 +1,160 @@
+# 消息去重：按规范化文本的 MinHash 识别重复打开的聊天记录
+
+import itertools
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from core.verdict_cache import normalize_text
+from utils.logger import LOGGER
+from utils.metrics import METRICS
+
+
+def shingles(text: str, size: int = 3) -> Set[str]:
+    """规范化文本（去空白、时间，全角转半角）的字符 shingle 集合"""
+    normalized = normalize_text(text)
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+class MinHasher:
+    """num_perm 个 multiply-shift 哈希 ((a*x + b) mod 2^64) >> 32，签名中相等位置的比例估计 shingle 集合的
+    Jaccard 相似度"""
+
+    def __init__(self, num_perm: int = 64, shingle: int = 3, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(0, 1 << 64, size=num_perm, dtype=np.uint64, endpoint=False) | np.uint64(1)
+        self.b = rng.integers(0, 1 << 64, size=num_perm, dtype=np.uint64, endpoint=False)
+        self.num_perm = num_perm
+        self.shingle = shingle
+
+    def signature(self, text: str) -> np.ndarray:
+        grams = shingles(text, self.shingle)
+        if not grams:
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        hashed = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+        # uint64 乘加按 2^64 回绕
+        return ((np.outer(self.a, hashed) + self.b[:, None]) >> np.uint64(32)).astype(np.uint32).min(axis=1)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """两个签名估计的 Jaccard 相似度"""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+class DedupIndex:
+    """最近处理过的消息的 MinHash 索引，持久化到 SQLite，按条数上限与 TTL 淘汰最旧的记录。
+
+    签名按 bands 段做 LSH：至少一段完全相同的记录才作为候选，再按估计的相似度与 threshold 比较。
+    """
+
+    def __init__(self, threshold: float = 0.6, num_perm: int = 64, bands: int = 16, shingle: int = 3,
+                 max_entries: int = 5000, ttl: float = 7 * 86400.0, db_path: Optional[str] = None):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle)
+        self.bands = bands
+        self._rows = num_perm // bands
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._buckets: List[Dict[bytes, Set[int]]] = [{} for _ in range(bands)]
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS signatures (id INTEGER PRIMARY KEY, "
+                               "signature BLOB NOT NULL, created REAL NOT NULL)")
+            self._conn.execute("DELETE FROM signatures WHERE created < ?", (time.time() - ttl,))
+            self._conn.commit()
+            rows = self._conn.execute("SELECT id, signature, created FROM signatures ORDER BY id DESC LIMIT ?",
+                                      (self.max_entries,)).fetchall()
+            for entry_id, blob, created in reversed(rows):
+                signature = np.frombuffer(blob, dtype=np.uint32)
+                # 哈希参数变化（num_perm）后旧签名不可比较，直接丢弃
+                if len(signature) == num_perm:
+                    self._add(entry_id, signature, created)
+            self._ids = itertools.count(rows[0][0] + 1 if rows else 0)
+        LOGGER.info(f"Initialized DedupIndex ({len(self._entries)} records, threshold={threshold}, db={db_path})")
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self._rows:(i + 1) * self._rows].tobytes() for i in range(self.bands)]
+
+    def _add(self, entry_id: int, signature: np.ndarray, created: float) -> None:
+        self._entries[entry_id] = (signature, created)
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(key, set()).add(entry_id)
+
+    def _remove(self, entry_id: int) -> None:
+        signature, _ = self._entries.pop(entry_id)
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            members = bucket.get(key)
+            if members is not None:
+                members.discard(entry_id)
+                if not members:
+                    del bucket[key]
+
+    def _find(self, signature: np.ndarray) -> Optional[int]:
+        candidates = set()
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(key, ()))
+        now = time.time()
+        for entry_id in candidates:
+            other, created = self._entries[entry_id]
+            if now - created <= self.ttl and similarity(signature, other) >= self.threshold:
+                return entry_id
+        return None
+
+    def seen(self, text: str) -> bool:
+        """文本与最近记录过的某条消息近似相同时返回 True；只查询，不记录"""
+        signature = self.hasher.signature(text)
+        with self._lock:
+            if self._find(signature) is None:
+                return False
+            self.hits += 1
+            METRICS.inc("duplicates_skipped")
+            return True
+
+    def record(self, text: str) -> None:
+        """记录一条已处理完（已有判断结果）的消息；已有近似相同的记录时不重复记录"""
+        signature = self.hasher.signature(text)
+        now = time.time()
+        with self._lock:
+            if self._find(signature) is not None:
+                return
+            self.misses += 1
+            entry_id = next(self._ids)
+            self._add(entry_id, signature, now)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                evicted.append(oldest)
+            if self._conn is not None:
+                self._conn.execute("INSERT INTO signatures (id, signature, created) VALUES (?, ?, ?)",
+                                   (entry_id, signature.tobytes(), now))
+                self._conn.executemany("DELETE FROM signatures WHERE id = ?", [(e,) for e in evicted])
+                self._conn.commit()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "duplicates": self.hits, "new": self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,137 @@
+# 单缓冲区帧
+
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+BGRX = "BGRX"
+GRAY = "GRAY"
+
+
+class Frame:
+    """包装单个 NumPy 缓冲区（BGRX 或灰度）的帧，派生视图按需计算并缓存。
+
+    roi() 返回共享同一缓冲区的切片视图，不拷贝像素；gray 及其他派生结果只计算一次。
+    提供与 PIL 相同的 convert("L") / save() / size，便于现有的保存逻辑直接使用。
+    """
+
+    __slots__ = ("buffer", "format", "_cache")
+
+    def __init__(self, buffer: np.ndarray, format: str = BGRX):
+        if format == BGRX and (buffer.ndim != 3 or buffer.shape[2] != 4):
+            raise ValueError(f"BGRX frame needs an HxWx4 buffer, got {buffer.shape}")
+        if format == GRAY and buffer.ndim != 2:
+            raise ValueError(f"GRAY frame needs an HxW buffer, got {buffer.shape}")
+        self.buffer = buffer
+        self.format = format
+        self._cache: Dict[Hashable, np.ndarray] = {}
+
+    @classmethod
+    def from_bitmap_bits(cls, bits: bytes, width: int, height: int) -> "Frame":
+        """直接以 GetBitmapBits 返回的字节构造 BGRX 帧（只读视图，不拷贝）"""
+        return cls(np.frombuffer(bits, dtype=np.uint8).reshape(height, width, 4), BGRX)
+
+    @classmethod
+    def from_pil(cls, image: Image.Image) -> "Frame":
+        """从 PIL 图像构造帧（兼容旧接口，会发生一次拷贝）"""
+        if image.mode == "L":
+            return cls(np.asarray(image), GRAY)
+        return cls(cv2.cvtColor(np.asarray(image.convert("RGB")), cv2.COLOR_RGB2BGRA), BGRX)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Frame"]:
+        """读取图像文件（png/webp/pgm 等，灰度图保持单通道）；无法解码时返回 None"""
+        # 经 np.fromfile 读取，Windows 上的中文路径也能打开
+        return as_frame(cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_UNCHANGED))
+
+    @property
+    def width(self) -> int:
+        return self.buffer.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.buffer.shape[0]
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    @property
+    def mode(self) -> str:
+        return "L" if self.format == GRAY else "RGB"
+
+    def roi(self, x: int, y: int, w: int, h: int) -> "Frame":
+        """返回区域视图，与原帧共享缓冲区；已算好的灰度图也按同一区域切片复用"""
+        x, y = max(0, x), max(0, y)
+        view = Frame(self.buffer[y:y + h, x:x + w], self.format)
+        if "gray" in self._cache:
+            view._cache["gray"] = self._cache["gray"][y:y + h, x:x + w]
+        return view
+
+    def cached(self, key: Hashable, compute: Callable[["Frame"], np.ndarray]) -> np.ndarray:
+        """按 key 缓存派生结果，同一帧的多个阶段只计算一次"""
+        if key not in self._cache:
+            self._cache[key] = compute(self)
+        return self._cache[key]
+
+    @property
+    def gray(self) -> np.ndarray:
+        if self.format == GRAY:
+            return self.buffer
+        return self.cached("gray", lambda f: cv2.cvtColor(f.buffer, cv2.COLOR_BGRA2GRAY))
+
+    @property
+    def bgr(self) -> np.ndarray:
+        if self.format == GRAY:
+            return self.cached("bgr", lambda f: cv2.cvtColor(f.buffer, cv2.COLOR_GRAY2BGR))
+        return self.cached("bgr", lambda f: cv2.cvtColor(f.buffer, cv2.COLOR_BGRA2BGR))
+
+    def threshold(self, value: int, clahe: Optional[Tuple[float, Tuple[int, int]]] = None) -> np.ndarray:
+        """灰度图（可选CLAHE增强）二值化，按参数缓存"""
+        def compute(f: "Frame") -> np.ndarray:
+            gray = f.gray
+            if clahe is not None:
+                gray = cv2.createCLAHE(clipLimit=clahe[0], tileGridSize=clahe[1]).apply(gray)
+            return cv2.threshold(gray, value, 255, cv2.THRESH_BINARY)[1]
+        return self.cached(("threshold", value, clahe), compute)
+
+    def convert(self, mode: str) -> "Frame":
+        """与 PIL.Image.convert 对应，目前支持 "L"（共享缓存的灰度图）"""
+        if mode != "L":
+            raise ValueError(f"Unsupported frame conversion: {mode}")
+        return self if self.format == GRAY else Frame(self.gray, GRAY)
+
+    def to_pil(self) -> Image.Image:
+        if self.format == GRAY:
+            return Image.fromarray(self.buffer, "L")
+        return Image.fromarray(cv2.cvtColor(self.buffer, cv2.COLOR_BGRA2RGB), "RGB")
+
+    def encode(self, ext: str = ".png", params: Optional[list] = None) -> bytes:
+        image = self.buffer if self.format == GRAY else self.bgr
+        ok, data = cv2.imencode(ext, image, params or [])
+        if not ok:
+            raise ValueError(f"Failed to encode frame as {ext}")
+        return data.tobytes()
+
+    def save(self, path: str) -> None:
+        """与 PIL.Image.save 对应，按扩展名编码写入"""
+        ext = "." + path.rsplit(".", 1)[-1] if "." in path else ".png"
+        with open(path, "wb") as f:
+            f.write(self.encode(ext))
+
+
+def as_frame(image) -> Optional["Frame"]:
+    """将 Frame / PIL 图像 / NumPy 数组统一为 Frame"""
+    if image is None or isinstance(image, Frame):
+        return image
+    if isinstance(image, Image.Image):
+        return Frame.from_pil(image)
+    if isinstance(image, np.ndarray):
+        if image.ndim == 2:
+            return Frame(image, GRAY)
+        if image.shape[2] == 3:
+            return Frame(cv2.cvtColor(image, cv2.COLOR_BGR2BGRA), BGRX)
+        return Frame(image, BGRX)
+    raise TypeError(f"Unsupported image type: {type(image)}")
@@ -1,25 +1,37 @@
 # 图像编码与处理
 
 import base64
-from typing import Optional
+from typing import Optional, Union
 from PIL import Image
+from core.frame import Frame
+from core.image_store import ImageStore
 from utils.logger import LOGGER
 
 class ImageProcessor:
-    def encode_image(self, image: Image.Image) -> Optional[str]:
+    def __init__(self, image_store: Optional[ImageStore] = None):
+        """image_store 为空时同步保存到带时间戳的文件"""
+        self.image_store = image_store
+
+    def encode_image(self, image: Union[Frame, Image.Image]) -> Optional[str]:
         """将图像编码为base64"""
         try:
-            from io import BytesIO
-            buffered = BytesIO()
-            image.save(buffered, format="PNG")
-            encoded = base64.b64encode(buffered.getvalue()).decode("utf-8")
+            if isinstance(image, Frame):
+                data = image.encode(".png")
+            else:
+                from io import BytesIO
+                buffered = BytesIO()
+                image.save(buffered, format="PNG")
+                data = buffered.getvalue()
+            encoded = base64.b64encode(data).decode("utf-8")
             LOGGER.debug("Encoded image to base64")
             return encoded
         except Exception as e:
             LOGGER.error(f"Failed to encode image: {e}")
             return None
 
-    def save_image(self, image: Image.Image, folder: str, grayscale: bool = False) -> Optional[str]:
-        """保存图像（复用file_utils）"""
+    def save_image(self, image: Union[Frame, Image.Image], folder: str, grayscale: bool = False) -> Optional[str]:
+        """保存图像：配置了 ImageStore 时后台写盘并按内容去重，否则复用file_utils"""
+        if self.image_store is not None:
+            return self.image_store.save(image, folder, grayscale)
         from utils.file_utils import save_image
         return save_image(image, folder, grayscale)
\ No newline at end of file
@@ -0,0 +1,159 @@
+# 截图持久化：后台线程编码写盘，按内容哈希命名去重
+
+import hashlib
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Union
+import cv2
+import numpy as np
+from PIL import Image
+from core.frame import Frame, GRAY, as_frame
+from utils.logger import LOGGER
+from utils.metrics import METRICS
+
+FORMATS = ("png", "webp", "raw")
+
+
+class ImageStore:
+    """异步图片存储。
+
+    save() 只在调用线程中计算内容哈希并入队，编码与写盘在后台线程中完成；
+    文件名为像素内容的哈希，同一画面在同一目录只保存一次，已保存到其它目录的画面
+    （如判断结果目录）以硬链接引用，不再编码第二份。队列满时 save() 阻塞等待。
+
+    format: png（png_level 0-9）、webp（无损）或 raw（PGM/PPM 原始像素，几乎不耗 CPU，体积最大）。
+    """
+
+    def __init__(self, format: str = "png", png_level: int = 3, queue_size: int = 64,
+                 link: bool = True, known_entries: int = 4096):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown image format: {format} (expected one of {FORMATS})")
+        self.format = format
+        self.png_level = png_level
+        self.link = link
+        self.known_entries = known_entries
+        # 内容哈希 -> 第一次保存的路径（用于跨目录的硬链接）；已入队或写入的路径
+        self._sources: "OrderedDict[str, str]" = OrderedDict()
+        self._saved: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+        self._folders = set()
+        self.written = 0
+        self.linked = 0
+        self.deduplicated = 0
+        self.bytes_written = 0
+        self._thread = threading.Thread(target=self._run, name="image-writer", daemon=True)
+        self._thread.start()
+
+    def _extension(self, frame: Frame) -> str:
+        if self.format == "raw":
+            return "pgm" if frame.format == GRAY else "ppm"
+        return self.format
+
+    def _encode(self, frame: Frame) -> bytes:
+        if self.format == "png":
+            return frame.encode(".png", [cv2.IMWRITE_PNG_COMPRESSION, self.png_level])
+        if self.format == "webp":
+            # OpenCV 中质量大于 100 表示无损
+            return frame.encode(".webp", [cv2.IMWRITE_WEBP_QUALITY, 101])
+        return frame.encode("." + self._extension(frame))
+
+    @staticmethod
+    def content_hash(frame: Frame) -> str:
+        pixels = np.ascontiguousarray(frame.buffer if frame.format == GRAY else frame.bgr)
+        digest = hashlib.sha1(f"{frame.format}:{pixels.shape}".encode("ascii"))
+        digest.update(pixels.data)
+        return digest.hexdigest()[:20]
+
+    def save(self, image: Union[Frame, Image.Image], folder: str, grayscale: bool = False) -> Optional[str]:
+        """排队保存图像，立即返回最终路径（文件在后台写入后出现）"""
+        frame = as_frame(image)
+        if grayscale:
+            frame = frame.convert("L")
+        digest = self.content_hash(frame)
+        path = os.path.join(folder, f"{digest}.{self._extension(frame)}")
+        with self._lock:
+            if folder not in self._folders:
+                os.makedirs(folder, exist_ok=True)
+                self._folders.add(folder)
+            if path in self._saved or os.path.exists(path):
+                self.deduplicated += 1
+                METRICS.inc("images_deduplicated")
+                return path
+            source = self._sources.get(digest)
+            if source is None:
+                self._sources[digest] = path
+            self._remember(path)
+        # 同一个写线程按入队顺序处理，硬链接一定在源文件写完之后
+        if source is not None and self.link:
+            self._queue.put(("link", source, path))
+        else:
+            self._queue.put(("write", frame, path))
+        return path
+
+    def _remember(self, path: str) -> None:
+        self._saved[path] = None
+        for entries in (self._saved, self._sources):
+            while len(entries) > self.known_entries:
+                entries.popitem(last=False)
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                if job[0] == "link":
+                    self._link(job[1], job[2])
+                else:
+                    self._write(job[1], job[2])
+            except Exception as e:
+                LOGGER.error(f"Failed to save image {job[2]}: {e}")
+                METRICS.inc("errors", operation="save_image")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, frame: Frame, path: str) -> None:
+        start = time.perf_counter()
+        data = self._encode(frame)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        METRICS.observe("save_image", time.perf_counter() - start)
+        self.written += 1
+        self.bytes_written += len(data)
+        LOGGER.info(f"Saved image to {path}")
+
+    def _link(self, source: str, path: str) -> None:
+        if os.path.exists(path):
+            return
+        try:
+            os.link(source, path)
+        except OSError:
+            # 跨卷或文件系统不支持硬链接时退回复制
+            shutil.copyfile(source, path)
+        self.linked += 1
+        METRICS.inc("images_linked")
+        LOGGER.info(f"Linked image {source} -> {path}")
+
+    def flush(self) -> None:
+        """等待已入队的图片全部写完"""
+        self._queue.join()
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        LOGGER.info(f"Image store closed: {self.written} written ({self.bytes_written / 1e6:.1f} MB), "
+                    f"{self.linked} linked, {self.deduplicated} deduplicated")
+
+
+def create_image_store(format: str = "png", png_level: int = 3, queue_size: int = 64,
+                       link_judgments: bool = True) -> ImageStore:
+    """按 images 配置创建图片存储"""
+    return ImageStore(format=format, png_level=png_level, queue_size=queue_size, link=link_judgments)
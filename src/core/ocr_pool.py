@@ -0,0 +1,185 @@
+# 多进程OCR引擎池
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from core.preprocess import Preprocessor
+from utils.logger import LOGGER
+
+# 工作进程内常驻的 PaddleOCR 实例，由 _init_engine 在进程启动时加载
+_ENGINE = None
+_USE_ANGLE_CLS = False
+# 工作进程读取图像文件（kind "file"）时使用的预处理步骤，None 为默认步骤
+_PREPROCESSOR = None
+
+
+def _init_engine(options: dict, factory: Optional[Callable] = None,
+                 preprocessor: Optional[Preprocessor] = None) -> None:
+    global _ENGINE, _USE_ANGLE_CLS, _PREPROCESSOR
+    _USE_ANGLE_CLS = options.get("use_angle_cls", False)
+    _PREPROCESSOR = preprocessor
+    if factory is not None:
+        _ENGINE = factory()
+        return
+    from paddleocr import PaddleOCR
+    _ENGINE = PaddleOCR(show_log=False, **options)
+
+
+def _lines(engine, image: np.ndarray, cls: bool) -> List[str]:
+    result = engine.ocr(image, cls=cls)
+    return [line[1][0] for line in result[0]] if result and result[0] else []
+
+
+def recognize_files(engine, paths: List[str], cls: bool = False,
+                    preprocessor: Optional[Preprocessor] = None) -> List[Optional[List[str]]]:
+    """读取、预处理并识别图像文件，返回每个文件的文本行列表；无法解码的文件为 None"""
+    from core.frame import Frame
+    from core.ocr_processor import prepare_image
+    results = []
+    for path in paths:
+        frame = Frame.load(path)
+        image = prepare_image(frame, preprocessor) if frame is not None else None
+        results.append(None if image is None else _lines(engine, image, cls))
+    return results
+
+
+def _warmup() -> int:
+    """确保工作进程已启动并完成模型加载"""
+    return os.getpid()
+
+
+def _run_batch(kind: str, items: list) -> list:
+    """在工作进程内执行一批任务。
+
+    kind 为 ``ocr`` 时 items 是图像列表，返回每张图的文本行列表；``file`` 时 items 是图像文件路径，
+    读取与预处理也在工作进程内完成；``det`` 返回每张图的检测框；``rec`` 时 items 是文本行裁剪图，
+    返回 (text, score) 列表。
+    """
+    if kind == "ocr":
+        return [_lines(_ENGINE, image, _USE_ANGLE_CLS) for image in items]
+    if kind == "file":
+        return recognize_files(_ENGINE, items, _USE_ANGLE_CLS, _PREPROCESSOR)
+    if kind == "det":
+        return [_ENGINE.text_detector(image)[0] for image in items]
+    if kind == "rec":
+        return [(text, float(score)) for text, score in _ENGINE.text_recognizer(items)[0]]
+    raise ValueError(f"Unknown OCR task kind: {kind}")
+
+
+class OCRPool:
+    """N 个各持有常驻模型的工作进程，按批次处理整图或文本行裁剪图。
+
+    submit() 在事件循环中收集请求，凑满 batch_size 或等待 max_wait 秒后整批发送给
+    空闲进程，返回每张图各自的 asyncio.Future。engine_factory 为可 pickle 的顶层函数时，
+    各工作进程用它创建引擎而不是加载 PaddleOCR（如基准测试中的假引擎）。
+    preprocessor 为 submit_files 在工作进程内读取文件后使用的预处理步骤。
+    """
+
+    def __init__(self, workers: int = 2, batch_size: int = 4, max_wait: float = 0.05,
+                 lang: str = "ch", use_angle_cls: bool = False, ocr_version: str = "PP-OCRv4",
+                 engine_factory: Optional[Callable] = None, preprocessor: Optional[Preprocessor] = None):
+        self.workers = max(1, int(workers))
+        self.batch_size = max(1, int(batch_size))
+        self.max_wait = max_wait
+        options = {"lang": lang, "use_angle_cls": use_angle_cls, "ocr_version": ocr_version}
+        # 使用 spawn，与 Windows 行为一致，且避免 fork 继承已加载的模型
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_engine,
+            initargs=(options, engine_factory, preprocessor),
+        )
+        self._pending: List[Tuple[np.ndarray, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.images = 0
+        self.batches = 0
+        LOGGER.info(f"Initialized OCRPool (workers={self.workers}, batch_size={self.batch_size}, "
+                    f"max_wait={self.max_wait}s)")
+
+    def warm_up(self, timeout: Optional[float] = None) -> None:
+        """启动全部工作进程并等待模型加载完成"""
+        start = time.perf_counter()
+        wait([self.executor.submit(_warmup) for _ in range(self.workers)], timeout=timeout)
+        LOGGER.info(f"OCR pool warmed up in {time.perf_counter() - start:.1f}s")
+
+    def submit(self, image: np.ndarray) -> asyncio.Future:
+        """提交一张预处理后的 RGB 图像，返回结果为文本行列表的 Future"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((image, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        return future
+
+    def submit_crops(self, crops: List[np.ndarray]) -> asyncio.Future:
+        """提交一批文本行裁剪图，返回结果为 (text, score) 列表的 Future"""
+        return asyncio.wrap_future(self.executor.submit(_run_batch, "rec", crops))
+
+    def submit_files(self, paths: List[str]) -> asyncio.Future:
+        """提交一批图像文件，由工作进程读取、预处理并识别；结果为每个文件的文本行列表（无法解码时为 None）"""
+        return asyncio.wrap_future(self.executor.submit(_run_batch, "file", list(paths)))
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        self.images += len(batch)
+        self.batches += 1
+        images = [image for image, _ in batch]
+        futures = [future for _, future in batch]
+        job = asyncio.wrap_future(self.executor.submit(_run_batch, "ocr", images))
+        job.add_done_callback(lambda done: self._resolve(done, futures))
+
+    @staticmethod
+    def _resolve(job: asyncio.Future, futures: List[asyncio.Future]) -> None:
+        error = job.exception()
+        results = None if error else job.result()
+        for i, future in enumerate(futures):
+            if future.done():
+                continue
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(results[i])
+
+    def engine(self) -> "PoolEngine":
+        """返回同步调用的引擎外观，供 IncrementalOCR 等按检测/识别分步调用的代码使用"""
+        return PoolEngine(self)
+
+    def stats(self) -> dict:
+        return {
+            "images": self.images,
+            "batches": self.batches,
+            "avg_batch": round(self.images / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class PoolEngine:
+    """以 PaddleOCR 的 text_detector/text_recognizer/ocr 接口同步调用进程池"""
+
+    def __init__(self, pool: OCRPool):
+        self.pool = pool
+
+    def text_detector(self, image: np.ndarray):
+        return self.pool.executor.submit(_run_batch, "det", [image]).result()[0], 0.0
+
+    def text_recognizer(self, crops: List[np.ndarray]):
+        return self.pool.executor.submit(_run_batch, "rec", crops).result(), 0.0
+
+    def ocr(self, image: np.ndarray, cls: bool = False):
+        lines = self.pool.executor.submit(_run_batch, "ocr", [image]).result()[0]
+        # 与 PaddleOCR.ocr 的返回结构保持一致（不含检测框与置信度）
+        return [[(None, (text, 1.0)) for text in lines]]
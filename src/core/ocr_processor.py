@@ -1,115 +1,355 @@
-import cv2
+import asyncio
+import threading
+import time
 import numpy as np
-from typing import Optional
+from concurrent.futures import Future
+from typing import Any, Callable, Optional, Tuple, Union
 from PIL import Image
-from paddleocr import PaddleOCR
+from core.frame import Frame
+from core.incremental_ocr import IncrementalOCR, OCRDiff
+from core.ocr_pool import OCRPool
+from core.preprocess import Preprocessor
+from core.result_store import ResultStore, JsonlResultStore, migrate_legacy_json
+from core.verdict import Verdict
 from utils.logger import LOGGER
-import json
+from utils.metrics import METRICS, timed
 import os
 from datetime import datetime
 
+DEFAULT_PREPROCESSOR = Preprocessor()
+
+
+def preprocess(image: Union[Frame, Image.Image], preprocessor: Optional[Preprocessor] = None) -> np.ndarray:
+    """Run the preprocessing stages (by default CLAHE and a fixed threshold) on an image; cached on the frame."""
+    return (preprocessor or DEFAULT_PREPROCESSOR).apply(image)
+
+
+def prepare_image(image: Union[Frame, Image.Image],
+                  preprocessor: Optional[Preprocessor] = None) -> Optional[np.ndarray]:
+    """Preprocess an image into the RGB array PaddleOCR expects.
+
+    Args:
+        image (Frame | Image): Frame (or PIL Image) to prepare.
+        preprocessor (Preprocessor, optional): Preprocessing stages. Defaults to CLAHE and a fixed threshold.
+
+    Returns:
+        np.ndarray: Preprocessed RGB array, or None if preprocessing failed.
+    """
+    try:
+        return (preprocessor or DEFAULT_PREPROCESSOR).prepare(image)
+    except Exception as e:
+        LOGGER.error(f"Image preprocessing failed: {e}")
+        return None
+
+
+class LazyEngine:
+    """Proxy that loads an OCR engine on first use, or ahead of time in a background thread.
+
+    Attribute access (ocr, text_detector, text_recognizer) blocks until the engine is loaded,
+    so callers such as IncrementalOCR can hold the proxy before the models exist.
+    """
+
+    def __init__(self, loader: Callable[[], Any], background: bool = False):
+        """Initialize the proxy.
+
+        Args:
+            loader (callable): Returns the loaded engine; called exactly once.
+            background (bool): Start loading immediately in a daemon thread.
+        """
+        self._loader = loader
+        self._future: Future = Future()
+        self._lock = threading.Lock()
+        self._started = False
+        if background:
+            self.start()
+
+    def start(self) -> None:
+        """Start loading in a background thread if it has not started yet."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._load, name="ocr-warm-up", daemon=True).start()
+
+    def _load(self) -> None:
+        start = time.perf_counter()
+        try:
+            engine = self._loader()
+        except BaseException as e:
+            LOGGER.error(f"Failed to load OCR engine: {e}")
+            self._future.set_exception(e)
+            return
+        elapsed = time.perf_counter() - start
+        METRICS.observe("ocr_engine_load", elapsed)
+        LOGGER.info(f"OCR engine loaded in {elapsed:.1f}s")
+        self._future.set_result(engine)
+
+    @property
+    def ready(self) -> bool:
+        return self._future.done()
+
+    def get(self, timeout: Optional[float] = None):
+        """Return the engine, loading it in the calling thread if nothing started it yet."""
+        with self._lock:
+            inline = not self._started
+            self._started = True
+        if inline:
+            self._load()
+        return self._future.result(timeout)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+
 class OCRProcessor:
-    def __init__(self, output_dir: str, lang: str = "ch"):
-        """Initialize OCRProcessor with output directory for JSON results.
+    def __init__(self, output_dir: str, lang: str = "ch", store: Optional[ResultStore] = None,
+                 incremental: bool = False, pool: Optional[OCRPool] = None, engine=None,
+                 warm_start: bool = False, use_angle_cls: bool = False,
+                 preprocessor: Optional[Preprocessor] = None):
+        """Initialize OCRProcessor with output directory for OCR results.
 
         Args:
-            output_dir (str): Directory to save ocr_results.json.
+            output_dir (str): Directory holding the result store (and any legacy ocr_results.json).
             lang (str): Language for OCR (default: 'ch' for Chinese).
+            store (ResultStore, optional): Result store backend. Defaults to a JSONL store in output_dir.
+            incremental (bool): Only recognize text lines that changed since the previous image.
+            pool (OCRPool, optional): Shared multi-process engine pool. When given, no model is loaded in this process.
+            engine (optional): Object with PaddleOCR's ocr/text_detector/text_recognizer interface to use
+                instead of loading a model (e.g. a fake engine for replay benchmarks).
+            warm_start (bool): Load the PaddleOCR models in a background thread instead of blocking here;
+                the first OCR call waits for them.
+            use_angle_cls (bool): Load and run the text angle classifier. Screen text is never rotated,
+                so it is off by default.
+            preprocessor (Preprocessor, optional): Preprocessing stages (ROI crop, scaling, CLAHE, threshold).
+                Defaults to CLAHE and a fixed threshold on the full image.
         """
         self.output_dir = output_dir
-        self.ocr = PaddleOCR(
-            use_angle_cls=True,  # Enable angle classification
+        self.pool = pool
+        self.use_angle_cls = use_angle_cls
+        self.preprocessor = preprocessor or DEFAULT_PREPROCESSOR
+        if engine is not None:
+            self.ocr = engine
+        elif pool is not None:
+            self.ocr = pool.engine()
+        elif warm_start:
+            self.ocr = LazyEngine(lambda: self._load_engine(lang, use_angle_cls), background=True)
+        else:
+            self.ocr = self._load_engine(lang, use_angle_cls)
+        os.makedirs(output_dir, exist_ok=True)
+        # An empty store has len() == 0, so test for None rather than truthiness
+        self.store = store if store is not None else JsonlResultStore(output_dir)
+        self.last_record_id: Optional[int] = None
+        self.incremental = IncrementalOCR(self.ocr) if incremental else None
+        self.last_diff: Optional[OCRDiff] = None
+        # One-shot migration of the legacy read-modify-write JSON array
+        migrate_legacy_json(os.path.join(output_dir, "ocr_results.json"), self.store)
+        LOGGER.info(f"Initialized OCRProcessor with output_dir: {output_dir}")
+
+    @staticmethod
+    def _load_engine(lang: str, use_angle_cls: bool = False):
+        """Import PaddleOCR and load the detection and recognition (and optionally angle classification) models."""
+        from paddleocr import PaddleOCR
+        return PaddleOCR(
+            use_angle_cls=use_angle_cls,  # The classifier model is only loaded when enabled
             lang=lang,  # Language for OCR
             ocr_version='PP-OCRv4',  # Latest model
             rec_char_dict_path=None  # Use default dictionary
         )
-        self.json_path = os.path.join(output_dir, "ocr_results.json")
-        os.makedirs(output_dir, exist_ok=True)
-        LOGGER.info(f"Initialized OCRProcessor with output_dir: {output_dir}")
 
-    def preprocess_image(self, img: Image.Image) -> Optional[np.ndarray]:
+    @property
+    def engine_ready(self) -> bool:
+        """Whether OCR can run without waiting for models to load."""
+        return not isinstance(self.ocr, LazyEngine) or self.ocr.ready
+
+    def preprocess_image(self, img: Union[Frame, Image.Image]) -> Optional[np.ndarray]:
         """Preprocess image for better OCR accuracy.
 
         Args:
-            img (Image): PIL Image to preprocess.
+            img (Frame | Image): Frame (or PIL Image) to preprocess.
 
         Returns:
             np.ndarray: Preprocessed image array, or None if failed.
         """
         try:
-            # Convert PIL Image to OpenCV format
-            img_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-            # Convert to grayscale
-            gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-            # Apply contrast enhancement
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-            enhanced = clahe.apply(gray)
-            # Binarize image
-            _, thresh = cv2.threshold(enhanced, 180, 255, cv2.THRESH_BINARY)
-            return thresh
+            return self.preprocessor.apply(img)
         except Exception as e:
             LOGGER.error(f"Image preprocessing failed: {e}")
             return None
 
-    def extract_text(self, image: Image.Image, filename: Optional[str] = None) -> Optional[str]:
-        """Extract text from a single image using PaddleOCR and append to JSON.
+    @timed("extract_text")
+    def extract_text(self, image: Union[Frame, Image.Image], filename: Optional[str] = None) -> Optional[str]:
+        """Extract text from a single image using PaddleOCR and append to the result store.
 
         Args:
-            image (Image): PIL Image to process.
-            filename (str, optional): Name for the image in JSON output. If None, generates a timestamp-based name.
+            image (Frame | Image): Frame (or PIL Image) to process.
+            filename (str, optional): Name for the image in the stored record. If None, generates a timestamp-based name.
 
         Returns:
             str: Extracted text, or None if failed.
         """
+        text, self.last_record_id = self.extract(image, filename)
+        return text
+
+    def extract(self, image: Union[Frame, Image.Image], filename: Optional[str] = None,
+                stream: str = "") -> Tuple[Optional[str], Optional[int]]:
+        """Extract text and return it together with the stored record id.
+
+        Unlike extract_text, this keeps no per-call state on the processor, so it is
+        safe to call from several pipeline workers at once.
+
+        Args:
+            image (Frame | Image): Frame (or PIL Image) to process.
+            filename (str, optional): Name for the image in the stored record. If None, generates a timestamp-based name.
+            stream (str): Source of the image (monitor target name); incremental mode diffs per stream.
+
+        Returns:
+            tuple: (extracted text or None, result store record id or None).
+        """
         try:
-            # Generate filename if not provided
-            if filename is None:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"screenshot_{timestamp}.png"
-
-            # Preprocess image
-            processed_img = self.preprocess_image(image)
-            if processed_img is None:
-                return None
-
-            # Convert to RGB for PaddleOCR
-            processed_rgb = cv2.cvtColor(processed_img, cv2.COLOR_GRAY2RGB)
+            filename = filename or self._default_filename()
+            processed_rgb = prepare_image(image, self.preprocessor)
+            if processed_rgb is None:
+                return None, None
             # Perform OCR
-            result = self.ocr.ocr(processed_rgb, cls=True)
-            # Extract text
-            text = ""
-            if result and result[0]:
-                text = "\n".join([line[1][0] for line in result[0]])
-            LOGGER.info(f"Extracted text from {filename}: {text}")
-
-            # Append result to JSON
-            self._append_to_json(filename, text)
-            return text.strip() if text else None
+            text = self.recognize(processed_rgb, stream)
+            return self.store_result(filename, text)
+        except Exception as e:
+            LOGGER.error(f"OCR failed for {filename}: {e}")
+            METRICS.inc("errors", operation="ocr")
+            return None, None
+
+    @timed("extract_text")
+    async def extract_async(self, image: Union[Frame, Image.Image], filename: Optional[str] = None,
+                            stream: str = "") -> Tuple[Optional[str], Optional[int]]:
+        """Async variant of extract that batches images through the OCR pool.
+
+        Falls back to running extract in a thread when there is no pool or when
+        incremental mode needs the sequential detect/recognize path.
+
+        Args:
+            image (Frame | Image): Frame (or PIL Image) to process.
+            filename (str, optional): Name for the image in the stored record.
+            stream (str): Source of the image (monitor target name); incremental mode diffs per stream.
+
+        Returns:
+            tuple: (extracted text or None, result store record id or None).
+        """
+        if self.pool is None or self.incremental is not None:
+            return await asyncio.to_thread(self.extract, image, filename, stream)
+        try:
+            filename = filename or self._default_filename()
+            processed_rgb = await asyncio.to_thread(prepare_image, image, self.preprocessor)
+            if processed_rgb is None:
+                return None, None
+            lines = await self.pool.submit(processed_rgb)
+            return await asyncio.to_thread(self.store_result, filename, "\n".join(lines))
         except Exception as e:
             LOGGER.error(f"OCR failed for {filename}: {e}")
+            METRICS.inc("errors", operation="ocr")
+            return None, None
+
+    def _default_filename(self) -> str:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"screenshot_{timestamp}.png"
+
+    def store_result(self, filename: str, text: Optional[str],
+                     timestamp: Optional[float] = None) -> Tuple[Optional[str], Optional[int]]:
+        """Log and store recognized text.
+
+        Args:
+            filename (str): Name of the image in the stored record.
+            text (str, optional): Recognized text.
+            timestamp (float, optional): Record time (e.g. the capture time of a re-processed file). Defaults to now.
+
+        Returns:
+            tuple: (stripped text or None, result store record id or None).
+        """
+        LOGGER.info(f"Extracted text from {filename}: {text}")
+        record_id = self._append_result(filename, text, timestamp)
+        return (text.strip() if text else None), record_id
+
+    def recognize_file(self, path: str) -> Optional[str]:
+        """Load an image file and run OCR on it without storing the result.
+
+        Args:
+            path (str): Image file (png, webp, pgm, ...).
+
+        Returns:
+            str: Recognized text, or None if the file could not be decoded or preprocessed.
+        """
+        frame = Frame.load(path)
+        image = prepare_image(frame, self.preprocessor) if frame is not None else None
+        if image is None:
             return None
+        return self.recognize(image)
+
+    def recognize(self, image: np.ndarray, stream: str = "") -> str:
+        """Run detection and recognition on a preprocessed RGB array.
+
+        In incremental mode only new or changed line crops reach the recognizer,
+        and the structured diff is kept in last_diff.
+
+        Args:
+            image (np.ndarray): Preprocessed RGB image.
+            stream (str): Source of the image; new lines are computed against the previous image of the same stream.
+
+        Returns:
+            str: Recognized lines joined by newlines.
+        """
+        if self.incremental is not None:
+            self.last_diff = self.incremental.process(image, stream)
+            if self.last_diff.added:
+                LOGGER.info(f"OCR found {len(self.last_diff.added)} new lines "
+                            f"({self.last_diff.recognized} recognized, {self.last_diff.reused} reused)")
+            return self.last_diff.text
+        result = self.ocr.ocr(image, cls=self.use_angle_cls)
+        if result and result[0]:
+            return "\n".join([line[1][0] for line in result[0]])
+        return ""
+
+    def record_judgment(self, verdict: Optional[Verdict], record_id: Optional[int] = None) -> None:
+        """Attach the AI verdict to a stored OCR result.
 
-    def _append_to_json(self, filename: str, text: str):
-        """Append OCR result to ocr_results.json.
+        The stored judgment is the verdict label (yes / no), not the alert decision,
+        so the prefilter learns from what the model said. A missing verdict (timeout,
+        failed request) or a "not sure" / unparseable reply is stored as None.
+
+        Args:
+            verdict (Verdict, optional): Parsed AI verdict for the extracted text.
+            record_id (int, optional): Record to update. Defaults to the last extract_text result.
+        """
+        record_id = self.last_record_id if record_id is None else record_id
+        if record_id is None:
+            return
+        try:
+            if verdict is None:
+                self.store.set_judgment(record_id, None)
+            else:
+                self.store.set_judgment(record_id, verdict.judgment, verdict.source, verdict.confidence)
+        except Exception as e:
+            LOGGER.error(f"Failed to record judgment: {e}")
+
+    def _append_result(self, filename: str, text: str, timestamp: Optional[float] = None) -> Optional[int]:
+        """Append OCR result to the result store.
 
         Args:
             filename (str): Name of the image file.
             text (str): Extracted text.
+            timestamp (float, optional): Record time. Defaults to now.
+
+        Returns:
+            int: Record id, or None if the append failed.
         """
         try:
-            # Load existing results
-            results = []
-            if os.path.exists(self.json_path):
-                with open(self.json_path, "r", encoding="utf-8") as f:
-                    results = json.load(f)
-            # Append new result
-            results.append({
+            record_id = self.store.append({
                 "file": filename,
-                "text": text if text else None
+                "text": text if text else None,
+                "timestamp": timestamp,
             })
-            # Write back to JSON
-            with open(self.json_path, "w", encoding="utf-8") as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
-            LOGGER.info(f"Appended OCR result to {self.json_path}")
+            LOGGER.debug(f"Appended OCR result #{record_id}")
+            return record_id
         except Exception as e:
-            LOGGER.error(f"Failed to append to JSON: {e}")
\ No newline at end of file
+            LOGGER.error(f"Failed to append OCR result: {e}")
+            return None
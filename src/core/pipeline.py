@@ -0,0 +1,228 @@
+# 分阶段异步流水线
+
+import asyncio
+import functools
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Hashable, Iterable, List, Optional
+from utils.logger import LOGGER
+from utils.metrics import METRICS
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+
+
+class _RoundRobin:
+    """按 key 分组的队列存储，出队时在各组之间轮转"""
+
+    def __init__(self, key: Callable[[Any], Hashable]):
+        self.key = key
+        self.groups: "OrderedDict[Hashable, deque]" = OrderedDict()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, item: Any) -> None:
+        key = self.key(item)
+        if key not in self.groups:
+            self.groups[key] = deque()
+        self.groups[key].append(item)
+        self.size += 1
+
+    def _take(self, key: Hashable) -> Any:
+        group = self.groups[key]
+        item = group.popleft()
+        self.size -= 1
+        if not group:
+            del self.groups[key]
+        return item
+
+    def popleft(self) -> Any:
+        key = next(iter(self.groups))
+        item = self._take(key)
+        if key in self.groups:
+            self.groups.move_to_end(key)
+        return item
+
+    def drop_oldest(self) -> Any:
+        """从积压最多的组中丢弃最旧的一项"""
+        return self._take(max(self.groups, key=lambda k: len(self.groups[k])))
+
+
+class FairQueue(asyncio.Queue):
+    """按 key（如监控目标）轮转出队的有界队列，单个来源的积压不会让其它来源饿死"""
+
+    def __init__(self, maxsize: int = 0, key: Callable[[Any], Hashable] = lambda item: None):
+        self._key = key
+        super().__init__(maxsize)
+
+    def _init(self, maxsize: int) -> None:
+        self._queue = _RoundRobin(self._key)
+
+    def _put(self, item: Any) -> None:
+        self._queue.append(item)
+
+    def _get(self) -> Any:
+        return self._queue.popleft()
+
+    def drop_oldest(self) -> Any:
+        return self._queue.drop_oldest()
+
+
+def target_key(item: Any) -> Hashable:
+    """流水线中的项通过 target 属性标明所属的监控目标"""
+    return getattr(item, "target", None)
+
+
+class Stage:
+    """流水线中的一个阶段：有界输入队列 + 若干并发 worker。
+
+    handler 可以是协程函数，也可以是普通（阻塞）函数，后者在线程池中执行。
+    handler 返回 None 时该项不再向下游传递。队列满时按 policy 处理：
+    ``block`` 让上游等待，``drop_oldest`` 丢弃最旧的一项以保证上游节奏。
+    最近 latency_samples 次 handler 耗时保存在 latencies 中，用于计算分位数。
+    fair 为 True 时队列按各项的 target 轮转出队，丢弃时优先丢弃积压最多的目标。
+    """
+
+    def __init__(self, name: str, handler: Callable[[Any], Any], workers: int = 1,
+                 queue_size: int = 8, policy: str = BLOCK, latency_samples: int = 2048,
+                 fair: bool = False):
+        if policy not in (BLOCK, DROP_OLDEST):
+            raise ValueError(f"Unknown backpressure policy for stage {name}: {policy}")
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.policy = policy
+        maxsize = max(1, int(queue_size))
+        self.queue: asyncio.Queue = FairQueue(maxsize, target_key) if fair else asyncio.Queue(maxsize)
+        self.next: Optional["Stage"] = None
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.latencies: deque = deque(maxlen=max(1, int(latency_samples)))
+        self._tasks: List[asyncio.Task] = []
+
+    async def put(self, item: Any) -> None:
+        """按背压策略将一项放入本阶段队列"""
+        if self.policy == DROP_OLDEST:
+            while self.queue.full():
+                if isinstance(self.queue, FairQueue):
+                    self.queue.drop_oldest()
+                else:
+                    self.queue.get_nowait()
+                self.queue.task_done()
+                self.dropped += 1
+                METRICS.inc("dropped_events", stage=self.name)
+                LOGGER.warning(f"Stage {self.name} queue full, dropped oldest item")
+            self.queue.put_nowait(item)
+        else:
+            await self.queue.put(item)
+
+    async def _call(self, item: Any) -> Any:
+        if asyncio.iscoroutinefunction(self.handler):
+            return await self.handler(item)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.handler, item))
+
+    async def _worker(self) -> None:
+        while True:
+            item = await self.queue.get()
+            start = time.perf_counter()
+            try:
+                result = await self._call(item)
+                elapsed = time.perf_counter() - start
+                self.latencies.append(elapsed)
+                METRICS.observe("stage", elapsed, stage=self.name)
+                self.processed += 1
+                if result is not None and self.next is not None:
+                    await self.next.put(result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                METRICS.inc("errors", operation=self.name)
+                LOGGER.error(f"Error in pipeline stage {self.name}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"{self.name}-{i}") for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def percentiles(self, qs: Iterable[float] = (50, 95, 99)) -> dict:
+        """最近样本的 handler 耗时分位数（秒）"""
+        return {q: percentile(sorted(self.latencies), q) for q in qs}
+
+    def stats(self) -> dict:
+        latency = self.percentiles((50, 95))
+        return {
+            "queued": self.queue.qsize(),
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "p50_ms": round(latency[50] * 1000, 1),
+            "p95_ms": round(latency[95] * 1000, 1),
+        }
+
+
+class Pipeline:
+    """将多个 Stage 串联，第一个阶段的输入由外部生产者写入"""
+
+    def __init__(self, stages: List[Stage]):
+        if not stages:
+            raise ValueError("Pipeline requires at least one stage")
+        self.stages = stages
+        for upstream, downstream in zip(stages, stages[1:]):
+            upstream.next = downstream
+
+    async def submit(self, item: Any) -> None:
+        await self.stages[0].put(item)
+
+    def stage(self, name: str) -> Stage:
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        raise KeyError(f"No pipeline stage named {name}")
+
+    def start(self) -> None:
+        for stage in self.stages:
+            stage.start()
+        LOGGER.info(f"Started pipeline: {' -> '.join(s.name for s in self.stages)}")
+
+    async def join(self) -> None:
+        """等待所有阶段的队列排空"""
+        for stage in self.stages:
+            await stage.queue.join()
+
+    async def stop(self) -> None:
+        for stage in self.stages:
+            await stage.stop()
+
+    def format_stats(self) -> str:
+        return "; ".join(
+            f"{s.name}: " + ", ".join(f"{k}={v}" for k, v in s.stats().items()) for s in self.stages
+        )
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """已排序样本的第 q 百分位（最近秩法），无样本时返回 0"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, math.ceil(q / 100 * len(samples)) - 1))
+    return samples[index]
+
+
+def build_stage(name: str, handler: Callable[[Any], Any], options: Optional[dict] = None,
+                **defaults) -> Stage:
+    """根据配置（workers/queue_size/policy）创建阶段，未配置的项使用 defaults"""
+    settings = {**defaults, **(options or {})}
+    return Stage(name, handler, **settings)
@@ -0,0 +1,270 @@
+# 本地预分类：规则与小模型直接判定明显的消息，只把不确定的交给大模型
+
+import asyncio
+import math
+import os
+import re
+import time
+import zlib
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+import numpy as np
+from core.ai_analyzer import AIAnalyzer, AsyncAIAnalyzer
+from core.verdict import LLM, NO, YES, format_verdict
+from core.verdict_cache import normalize_text
+from utils.logger import LOGGER
+from utils.metrics import METRICS
+
+
+class KeywordRules:
+    """关键词与正则规则，各自编译为一个正则，一次扫描完成匹配。
+
+    positive_keywords 在规范化文本中搜索，命中的不同关键词数作为正向分数；
+    negative_patterns 须与规范化后的一整行完全匹配（如 "好的"、"[表情]"）。
+    """
+
+    def __init__(self, positive_keywords: Iterable[str] = (), negative_patterns: Iterable[str] = ()):
+        self.positive_keywords = [normalize_text(k) for k in positive_keywords if normalize_text(k)]
+        negative_patterns = list(negative_patterns)
+        self._positive = re.compile(
+            "|".join(f"(?P<k{i}>{re.escape(k)})" for i, k in enumerate(self.positive_keywords))
+        ) if self.positive_keywords else None
+        self._negative = re.compile(
+            "|".join(f"(?:{p})" for p in negative_patterns)
+        ) if negative_patterns else None
+
+    def positive_hits(self, normalized: str) -> int:
+        if self._positive is None:
+            return 0
+        return len({m.lastgroup for m in self._positive.finditer(normalized)})
+
+    def is_negative(self, normalized_line: str) -> bool:
+        return self._negative is not None and self._negative.fullmatch(normalized_line) is not None
+
+    def is_trivial(self, text: str, min_chars: int) -> bool:
+        """每一行都是寒暄/表情，或短于 min_chars（如发送者姓名、只剩时间的行）"""
+        for line in text.splitlines():
+            normalized = normalize_text(line)
+            if len(normalized) >= min_chars and not self.is_negative(normalized):
+                return False
+        return True
+
+
+def _ngrams(text: str, sizes: Tuple[int, ...]) -> List[str]:
+    return [text[i:i + n] for n in sizes for i in range(len(text) - n + 1)]
+
+
+class PrefilterModel:
+    """字符 n-gram TF-IDF + 逻辑回归，特征经 crc32 哈希到固定维度，只依赖 NumPy。
+
+    用累计的OCR结果与判断结果训练；predict() 返回判为 yes 的概率。
+    """
+
+    def __init__(self, dim: int = 1 << 18, ngrams: Tuple[int, ...] = (1, 2, 3)):
+        self.dim = dim
+        self.ngrams = tuple(ngrams)
+        self.idf = np.zeros(dim, dtype=np.float32)
+        self.weights = np.zeros(dim, dtype=np.float32)
+        self.bias = 0.0
+
+    def _features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """返回 (特征下标, 词频)"""
+        grams = _ngrams(normalize_text(text), self.ngrams)
+        if not grams:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        hashed = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.int64, count=len(grams))
+        indices, counts = np.unique(hashed & (self.dim - 1), return_counts=True)
+        return indices, counts.astype(np.float32)
+
+    def _vector(self, indices: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        values = (1 + np.log(counts)) * self.idf[indices]
+        norm = float(np.sqrt(np.dot(values, values)))
+        return values / norm if norm else values
+
+    def predict(self, text: str) -> float:
+        indices, counts = self._features(text)
+        score = self.bias + float(np.dot(self.weights[indices], self._vector(indices, counts)))
+        return 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, score))))
+
+    def train(self, texts: List[str], labels: List[bool], iterations: int = 300,
+              learning_rate: float = 20.0, l2: float = 1e-4) -> None:
+        """全量梯度下降训练；正负样本按比例加权，避免被多数类主导"""
+        features = [self._features(text) for text in texts]
+        df = np.zeros(self.dim, dtype=np.float32)
+        for indices, _ in features:
+            df[indices] += 1
+        self.idf = np.where(df > 0, np.log((1 + len(texts)) / (1 + df)) + 1, 0).astype(np.float32)
+        # 拼接为 CSR 形式的稀疏矩阵
+        lengths = np.array([len(indices) for indices, _ in features])
+        columns = np.concatenate([indices for indices, _ in features])
+        values = np.concatenate([self._vector(indices, counts) for indices, counts in features])
+        rows = np.repeat(np.arange(len(texts)), lengths)
+        y = np.asarray(labels, dtype=np.float32)
+        positives = max(1.0, float(y.sum()))
+        negatives = max(1.0, len(y) - float(y.sum()))
+        sample_weight = np.where(y > 0, len(y) / (2 * positives), len(y) / (2 * negatives)) / len(y)
+        weights = np.zeros(self.dim, dtype=np.float64)
+        bias = 0.0
+        for _ in range(iterations):
+            scores = bias + np.bincount(rows, weights=values * weights[columns], minlength=len(texts))
+            error = (1 / (1 + np.exp(-np.clip(scores, -30, 30))) - y) * sample_weight
+            gradient = np.bincount(columns, weights=values * error[rows], minlength=self.dim) + l2 * weights
+            weights -= learning_rate * gradient
+            bias -= learning_rate * float(error.sum())
+        self.weights = weights.astype(np.float32)
+        self.bias = bias
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        used = np.flatnonzero(self.idf)
+        np.savez_compressed(path, dim=self.dim, ngrams=np.array(self.ngrams), bias=self.bias,
+                            indices=used, idf=self.idf[used], weights=self.weights[used])
+
+    @classmethod
+    def load(cls, path: str) -> "PrefilterModel":
+        with np.load(path) as data:
+            model = cls(int(data["dim"]), tuple(int(n) for n in data["ngrams"]))
+            model.idf[data["indices"]] = data["idf"]
+            model.weights[data["indices"]] = data["weights"]
+            model.bias = float(data["bias"])
+        return model
+
+
+class PrefilterAnalyzer(AsyncAIAnalyzer):
+    """在分析器前加一层本地预分类。
+
+    依次使用：没有正向关键词且每行都是寒暄/表情或过短 -> no；正向关键词数达到
+    positive_threshold -> yes；模型概率低于 low -> no、高于 high -> yes；其余交给下游分析器。
+    本地判定以带 source 的 JSON 回复返回，图片分析直接交给下游。
+
+    给出 model_loader 时在线程中加载或训练模型（load_model()，或首次分析时自动开始），
+    完成前只用规则判定。
+    """
+
+    def __init__(self, analyzer: Union[AIAnalyzer, AsyncAIAnalyzer], rules: KeywordRules,
+                 model: Optional[PrefilterModel] = None, min_chars: int = 4, positive_threshold: int = 2,
+                 low: float = 0.05, high: float = 0.95, stats_interval: float = 300.0,
+                 model_loader: Optional[Callable[[], Optional[PrefilterModel]]] = None):
+        self.analyzer = analyzer
+        self.rules = rules
+        self.model = model
+        self.model_loader = model_loader
+        self._loading: Optional[asyncio.Future] = None
+        self.min_chars = min_chars
+        self.positive_threshold = positive_threshold
+        self.low = low
+        self.high = high
+        self.stats_interval = stats_interval
+        self.decisions = {"rule_yes": 0, "rule_no": 0, "model_yes": 0, "model_no": 0, "escalated": 0}
+        # 下游调用耗时的滑动平均，用于估计本地判定节省的时间
+        self.llm_latency: Optional[float] = None
+        self.saved_seconds = 0.0
+        self._last_stats = time.monotonic()
+
+    def classify(self, text: str) -> Tuple[Optional[str], str]:
+        """返回 (verdict 或 None, 判定来源)；None 表示需要交给下游"""
+        normalized = normalize_text(text)
+        hits = self.rules.positive_hits(normalized)
+        if not hits and self.rules.is_trivial(text, self.min_chars):
+            return NO, "rule"
+        if self.positive_threshold and hits >= self.positive_threshold:
+            return YES, "rule"
+        if self.model is not None:
+            probability = self.model.predict(text)
+            if probability <= self.low:
+                return NO, "model"
+            if probability >= self.high:
+                return YES, "model"
+        return None, "escalated"
+
+    def load_model(self) -> asyncio.Future:
+        """开始在后台加载或训练模型，返回可等待的任务；重复调用返回同一个任务"""
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(self._load_model())
+        return self._loading
+
+    async def _load_model(self) -> None:
+        try:
+            model = await asyncio.to_thread(self.model_loader)
+        except Exception as e:
+            LOGGER.error(f"Failed to load the prefilter model: {e}")
+            return
+        if model is not None:
+            self.model = model
+
+    async def _call(self, method: str, *args) -> Optional[str]:
+        func = getattr(self.analyzer, method)
+        if isinstance(self.analyzer, AsyncAIAnalyzer):
+            return await func(*args)
+        return await asyncio.to_thread(func, *args)
+
+    async def analyze_text(self, text: str, prompt: str) -> Optional[str]:
+        if self.model_loader is not None and self._loading is None:
+            self.load_model()
+        with METRICS.timer("prefilter"):
+            verdict, source = self.classify(text)
+        if verdict is not None:
+            self.decisions[f"{source}_{verdict}"] += 1
+            METRICS.inc("prefilter_decisions", decision=verdict, source=source)
+            if self.llm_latency is not None:
+                self.saved_seconds += self.llm_latency
+                METRICS.inc("prefilter_saved_seconds", self.llm_latency)
+            LOGGER.debug(f"Prefilter decided {verdict} by {source}")
+            self._maybe_log_stats()
+            return format_verdict(verdict, source)
+        self.decisions["escalated"] += 1
+        METRICS.inc("prefilter_decisions", decision="escalated", source="llm")
+        start = time.perf_counter()
+        result = await self._call("analyze_text", text, prompt)
+        elapsed = time.perf_counter() - start
+        self.llm_latency = elapsed if self.llm_latency is None else 0.9 * self.llm_latency + 0.1 * elapsed
+        self._maybe_log_stats()
+        return result
+
+    async def analyze_image(self, image_data: str, prompt: str) -> Optional[str]:
+        return await self._call("analyze_image", image_data, prompt)
+
+    def stats(self) -> dict:
+        total = sum(self.decisions.values())
+        return {
+            **self.decisions,
+            "llm_rate": round(self.decisions["escalated"] / total, 3) if total else 0.0,
+            "saved_seconds": round(self.saved_seconds, 1),
+        }
+
+    def _maybe_log_stats(self) -> None:
+        if time.monotonic() - self._last_stats >= self.stats_interval:
+            self._last_stats = time.monotonic()
+            LOGGER.info("Prefilter stats: " + ", ".join(f"{k}={v}" for k, v in self.stats().items()))
+
+    async def aclose(self) -> None:
+        if self._loading is not None:
+            self._loading.cancel()
+        if isinstance(self.analyzer, AsyncAIAnalyzer):
+            await self.analyzer.aclose()
+
+
+def load_or_train_model(path: str, records: Iterable[dict], min_samples: int = 200,
+                        max_samples: int = 5000) -> Optional[PrefilterModel]:
+    """读取已训练的模型；不存在时用有判断结果的OCR记录训练并保存，样本不足返回 None。
+
+    只使用大模型给出的判断（source 为 llm），预分类自身的判定不参与训练，避免模型自我强化。
+    """
+    if path and os.path.exists(path):
+        LOGGER.info(f"Loaded prefilter model from {path}")
+        return PrefilterModel.load(path)
+    texts, labels = [], []
+    for record in records:
+        if record.get("text") and record.get("judgment") is not None and record.get("source") == LLM:
+            texts.append(record["text"])
+            labels.append(bool(record["judgment"]))
+    texts, labels = texts[-max_samples:], labels[-max_samples:]
+    if len(texts) < min_samples or len(set(labels)) < 2:
+        LOGGER.info(f"Not enough labeled OCR results to train the prefilter model ({len(texts)}/{min_samples})")
+        return None
+    start = time.perf_counter()
+    model = PrefilterModel()
+    model.train(texts, labels)
+    LOGGER.info(f"Trained prefilter model on {len(texts)} records in {time.perf_counter() - start:.1f}s")
+    if path:
+        model.save(path)
+    return model
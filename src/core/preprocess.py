@@ -0,0 +1,156 @@
+# OCR预处理流水线：按配置顺序执行的裁剪、缩放、增强与二值化步骤
+
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Mapping, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+from core.frame import Frame, as_frame
+
+
+def _background(gray: np.ndarray) -> int:
+    """取隔行隔列采样后出现最多的灰度值作为背景色"""
+    return int(np.bincount(gray[::4, ::4].ravel(), minlength=256).argmax())
+
+
+def _ink(gray: np.ndarray, background: int, tolerance: int) -> np.ndarray:
+    """与背景色相差超过 tolerance 的像素为 1（查表，不产生 int16 中间数组）"""
+    table = (np.abs(np.arange(256) - background) > tolerance).astype(np.uint8)
+    return cv2.LUT(gray, table)
+
+
+def text_height(gray: np.ndarray, contrast: int = 40, column: int = 64) -> Optional[float]:
+    """估计灰度图中文本行的高度（像素）：把图像分成 column 像素宽的竖条，每条按行统计与背景色差异明显的像素，
+    取所有竖条中连续文本行段高度的中位数。头像等与文本并排的高块只影响所在的竖条，不会把相邻的文本行连成一段
+    """
+    ink = _ink(gray, _background(gray), contrast)
+    strips = np.add.reduceat(ink, np.arange(0, ink.shape[1], column), axis=1, dtype=np.int32) >= 2
+    padded = np.pad(strips.T.view(np.int8), ((0, 0), (1, 1)))
+    # 按竖条逐行展开，每个竖条内的起止位置一一对应
+    edges = np.diff(padded, axis=1)
+    heights = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+    heights = heights[heights >= 4]
+    return float(np.median(heights)) if len(heights) else None
+
+
+@dataclass(frozen=True)
+class Crop:
+    """裁掉四边的固定边距（标题栏、工具栏等窗口装饰），trim 时再裁掉纯背景色的边缘，只保留消息列表区域"""
+
+    top: int = 0
+    bottom: int = 0
+    left: int = 0
+    right: int = 0
+    trim: bool = False
+    padding: int = 8
+    tolerance: int = 10
+
+    def __call__(self, gray: np.ndarray) -> np.ndarray:
+        height, width = gray.shape
+        gray = gray[self.top:max(self.top, height - self.bottom), self.left:max(self.left, width - self.right)]
+        if not self.trim or gray.size == 0:
+            return gray
+        x, y, w, h = cv2.boundingRect(_ink(gray, _background(gray), self.tolerance))
+        if not w:
+            return gray
+        pad = self.padding
+        return gray[max(0, y - pad):y + h + pad, max(0, x - pad):x + w + pad]
+
+
+@dataclass(frozen=True)
+class Scale:
+    """文本行高于识别模型的理想高度时按比例缩小整图（只缩小不放大），检测与识别的计算量随之下降"""
+
+    text_height: int = 32
+    min_scale: float = 0.25
+
+    def __call__(self, gray: np.ndarray) -> np.ndarray:
+        measured = text_height(gray)
+        if measured is None or measured <= self.text_height:
+            return gray
+        factor = max(self.min_scale, self.text_height / measured)
+        size = (max(1, round(gray.shape[1] * factor)), max(1, round(gray.shape[0] * factor)))
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+
+@dataclass(frozen=True)
+class Clahe:
+    """CLAHE 局部对比度增强"""
+
+    clip_limit: float = 2.0
+    tile: int = 8
+
+    def __call__(self, gray: np.ndarray) -> np.ndarray:
+        return cv2.createCLAHE(clipLimit=self.clip_limit, tileGridSize=(self.tile, self.tile)).apply(gray)
+
+
+@dataclass(frozen=True)
+class Threshold:
+    """二值化；value 为 0 时使用 Otsu 自动阈值"""
+
+    value: int = 180
+
+    def __call__(self, gray: np.ndarray) -> np.ndarray:
+        if self.value <= 0:
+            return cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
+        return cv2.threshold(gray, self.value, 255, cv2.THRESH_BINARY)[1]
+
+
+STAGES = {"crop": Crop, "scale": Scale, "clahe": Clahe, "threshold": Threshold}
+Stage = Union[Crop, Scale, Clahe, Threshold]
+
+# 未配置 ocr.preprocess 时的步骤，与原先固定的 CLAHE + 阈值 180 一致
+DEFAULT_STAGES: Tuple[Stage, ...] = (Clahe(), Threshold())
+
+
+class Preprocessor:
+    """按顺序对帧的灰度图执行预处理步骤，结果按步骤缓存在帧上。
+
+    步骤是不可变、可 pickle 的数据类，同一个 Preprocessor 可以作为初始化参数传给 OCR 工作进程。
+    """
+
+    def __init__(self, stages: Iterable[Stage] = DEFAULT_STAGES):
+        self.stages: Tuple[Stage, ...] = tuple(stages)
+
+    @classmethod
+    def from_config(cls, specs: Optional[Iterable[Mapping]]) -> "Preprocessor":
+        """由配置构建，如 ``[{type: crop, top: 40}, {type: threshold, value: 180}]``；未配置时使用默认步骤"""
+        if specs is None:
+            return cls()
+        stages = []
+        for spec in specs:
+            options = dict(spec)
+            kind = options.pop("type", None)
+            if kind not in STAGES:
+                raise ValueError(f"Unknown OCR preprocessing stage {kind!r}, expected one of {', '.join(STAGES)}")
+            try:
+                stages.append(STAGES[kind](**options))
+            except TypeError as e:
+                raise ValueError(f"Invalid options for OCR preprocessing stage {kind!r}: {e}") from None
+        return cls(stages)
+
+    def apply(self, image: Union[Frame, Image.Image], timings: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """执行全部步骤，返回预处理后的灰度/二值图；timings 不为 None 时累加每个步骤的耗时（秒）"""
+        frame = as_frame(image)
+        return frame.cached(("preprocess", self.stages), lambda f: self._run(f.gray, timings))
+
+    def _run(self, gray: np.ndarray, timings: Optional[Dict[str, float]]) -> np.ndarray:
+        for stage in self.stages:
+            start = time.perf_counter()
+            gray = stage(gray)
+            if timings is not None:
+                name = type(stage).__name__.lower()
+                timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+        # 裁剪得到的是切片视图，OCR 前转换为连续数组
+        return np.ascontiguousarray(gray)
+
+    def prepare(self, image: Union[Frame, Image.Image]) -> np.ndarray:
+        """预处理并转换为 PaddleOCR 需要的 RGB 数组，按步骤缓存在帧上"""
+        frame = as_frame(image)
+        processed = self.apply(frame)
+        return frame.cached(("ocr_rgb", self.stages), lambda f: cv2.cvtColor(processed, cv2.COLOR_GRAY2RGB))
+
+    def __repr__(self) -> str:
+        return f"Preprocessor({', '.join(map(repr, self.stages))})"
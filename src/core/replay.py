@@ -0,0 +1,183 @@
+# 截图录制与回放
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from core.frame import Frame, BGRX, GRAY, as_frame
+from core.window_manager import WindowManager
+from utils.logger import LOGGER
+
+TRACE_FILE = "trace.jsonl"
+FRAMES_DIR = "frames"
+
+
+class RecordingWindowManager(WindowManager):
+    """包装真实的 WindowManager，把窗口查找、截图和点击按时间顺序写入轨迹目录。
+
+    轨迹为 trace.jsonl（每行一个事件）加 frames/ 下按内容哈希命名的 PNG，
+    相同画面（静止的聊天框）只保存一份。clock 用于事件时间戳，默认为 time.monotonic。
+    """
+
+    def __init__(self, inner: WindowManager, trace_dir: str, clock: Callable[[], float] = time.monotonic):
+        self.inner = inner
+        self.trace_dir = trace_dir
+        os.makedirs(os.path.join(trace_dir, FRAMES_DIR), exist_ok=True)
+        self._file = open(os.path.join(trace_dir, TRACE_FILE), "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self.clock = clock
+        self._start = clock()
+        self._saved = set(os.listdir(os.path.join(trace_dir, FRAMES_DIR)))
+        self.events = 0
+        LOGGER.info(f"Recording capture trace to {trace_dir}")
+
+    def _write(self, event: dict) -> None:
+        event["t"] = round(self.clock() - self._start, 4)
+        with self._lock:
+            self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self.events += 1
+
+    def _save_frame(self, frame: Frame) -> str:
+        buffer = np.ascontiguousarray(frame.buffer)
+        name = hashlib.sha1(buffer.tobytes() + str(buffer.shape).encode()).hexdigest()[:20] + ".png"
+        with self._lock:
+            if name not in self._saved:
+                cv2.imwrite(os.path.join(self.trace_dir, FRAMES_DIR, name), buffer)
+                self._saved.add(name)
+        return f"{FRAMES_DIR}/{name}"
+
+    def find_window(self, title: str) -> Optional[dict]:
+        info = self.inner.find_window(title)
+        self._write({"op": "find", "title": title, "info": info})
+        return info
+
+    def capture_screenshot(self, hwnd, region: Optional[Tuple] = None) -> Optional[Frame]:
+        frame = as_frame(self.inner.capture_screenshot(hwnd, region))
+        self._write({
+            "op": "capture", "hwnd": hwnd, "region": list(region) if region else None,
+            "frame": self._save_frame(frame) if frame is not None else None,
+        })
+        return frame
+
+    def simulate_click(self, hwnd, x: int, y: int) -> None:
+        self.inner.simulate_click(hwnd, x, y)
+        self._write({"op": "click", "hwnd": hwnd, "x": x, "y": y})
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+        LOGGER.info(f"Recorded {self.events} capture events, {len(self._saved)} distinct frames")
+
+
+class ReplayWindowManager(WindowManager):
+    """按录制的轨迹回放窗口信息与截图，无需 Windows 桌面。
+
+    每个窗口标题的查找结果、每个窗口句柄的截图各自按录制顺序依次返回，
+    因此详情窗口的打开/关闭与聊天框轮询互不干扰。speed 为回放倍速，
+    0 表示不等待、尽快回放；clock() 返回当前回放到的轨迹时间，可作为调度器时钟。
+    """
+
+    def __init__(self, trace_dir: str, speed: float = 1.0, loop: bool = False):
+        self.trace_dir = trace_dir
+        self.speed = speed
+        self.loop = loop
+        self._finds: Dict[str, Deque[dict]] = defaultdict(deque)
+        self._captures: Dict[object, Deque[dict]] = defaultdict(deque)
+        self._events: List[dict] = []
+        self._frames: Dict[str, Frame] = {}
+        self._lock = threading.Lock()
+        self._trace_time = 0.0
+        self._offset = 0.0  # 循环回放时累加的轨迹时长，保证 clock() 单调递增
+        self._start: Optional[float] = None
+        self.clicks = 0
+        self.served = 0
+        with open(os.path.join(trace_dir, TRACE_FILE), "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    self._events.append(json.loads(line))
+        captures = [event["hwnd"] for event in self._events if event["op"] == "capture"]
+        self._primary = captures[0] if captures else None
+        self._reset()
+        self.duration = self._events[-1]["t"] if self._events else 0.0
+        LOGGER.info(f"Loaded capture trace {trace_dir}: {len(self._events)} events, "
+                    f"{self.duration:.1f}s, speed={speed or 'max'}")
+
+    def _reset(self) -> None:
+        self._finds.clear()
+        self._captures.clear()
+        for event in self._events:
+            if event["op"] == "find":
+                self._finds[event["title"]].append(event)
+            elif event["op"] == "capture":
+                self._captures[event["hwnd"]].append(event)
+
+    @property
+    def exhausted(self) -> bool:
+        """轮询截图（轨迹中第一个被截图的窗口）已回放完；详情窗口的剩余截图不计"""
+        return not self._captures.get(self._primary)
+
+    def clock(self) -> float:
+        return self._trace_time
+
+    def _advance(self, t: float) -> None:
+        """推进轨迹时间，speed > 0 时按倍速等待到事件的录制时刻"""
+        if self._start is None:
+            self._start = time.monotonic() - t / self.speed if self.speed else time.monotonic()
+        if self.speed:
+            delay = self._start + t / self.speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self._trace_time = max(self._trace_time, self._offset + t)
+
+    def _load_frame(self, path: str) -> Frame:
+        frame = self._frames.get(path)
+        if frame is None:
+            buffer = cv2.imread(os.path.join(self.trace_dir, path), cv2.IMREAD_UNCHANGED)
+            if buffer is None:
+                raise FileNotFoundError(f"Missing trace frame {path}")
+            if buffer.ndim == 2:
+                frame = Frame(buffer, GRAY)
+            elif buffer.shape[2] == 3:
+                frame = Frame(cv2.cvtColor(buffer, cv2.COLOR_BGR2BGRA), BGRX)
+            else:
+                frame = Frame(buffer, BGRX)
+            self._frames[path] = frame
+        return frame
+
+    def find_window(self, title: str) -> Optional[dict]:
+        with self._lock:
+            events = self._finds.get(title)
+            if not events:
+                return None
+            event = events.popleft() if len(events) > 1 else events[0]
+        return dict(event["info"]) if event["info"] else None
+
+    def capture_screenshot(self, hwnd, region: Optional[Tuple] = None) -> Optional[Frame]:
+        with self._lock:
+            events = self._captures.get(hwnd)
+            if not events and self.loop and self.exhausted:
+                self._reset()
+                self._start = None
+                self._offset = self._trace_time
+                events = self._captures.get(hwnd)
+            if not events:
+                return None
+            event = events.popleft()
+        self._advance(event["t"])
+        if event["frame"] is None:
+            return None
+        self.served += 1
+        # 每次返回新的 Frame 外壳，派生视图缓存不在多次回放之间共享
+        frame = self._load_frame(event["frame"])
+        return Frame(frame.buffer, frame.format)
+
+    def simulate_click(self, hwnd, x: int, y: int) -> None:
+        self.clicks += 1
+        LOGGER.debug(f"Replay ignored click at ({x}, {y})")
@@ -0,0 +1,430 @@
+# OCR结果存储
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from utils.logger import LOGGER
+
+
+class ResultStore(ABC):
+    """OCR结果存储接口，记录格式: {id, timestamp, file, text, judgment, source, confidence}，
+    judgment 为判断标签 (yes/no，未判断或不确定时为 None)，source 为判断来源，confidence 为判断置信度
+    """
+
+    @abstractmethod
+    def append(self, record: dict) -> int:
+        """追加一条记录，返回记录ID"""
+        pass
+
+    @abstractmethod
+    def set_judgment(self, record_id: int, judgment: Optional[bool], source: Optional[str] = None,
+                     confidence: Optional[float] = None) -> None:
+        """为已有记录写入AI判断结果、来源（llm / rule / model）与置信度"""
+        pass
+
+    @abstractmethod
+    def query(self, since: Optional[float] = None, until: Optional[float] = None,
+              judgment: Optional[bool] = None) -> Iterator[dict]:
+        """按时间范围和判断结果查询记录"""
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def flush(self) -> None:
+        """将缓冲的写入落盘"""
+        pass
+
+    def close(self) -> None:
+        """关闭存储"""
+        self.flush()
+
+
+class JsonlResultStore(ResultStore):
+    """追加写JSONL存储，按大小/日期滚动分段，并维护时间戳与判断结果索引。
+
+    每个分段文件为 ``<prefix>-YYYYMMDD-NNN.jsonl``，索引为旁路文件
+    ``<prefix>.idx``（每行一条制表符分隔的记录位置或判断补丁），可由分段重建。
+    """
+
+    def __init__(self, output_dir: str, prefix: str = "ocr_results",
+                 max_bytes: int = 64 * 1024 * 1024, rotate_daily: bool = True):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self._lock = threading.Lock()
+        self._ids: List[int] = []
+        self._timestamps: List[float] = []
+        self._locations: Dict[int, Tuple[str, int]] = {}
+        self._judgments: Dict[int, Optional[bool]] = {}
+        self._sources: Dict[int, Optional[str]] = {}
+        self._confidences: Dict[int, Optional[float]] = {}
+        self._next_id = 1
+        os.makedirs(output_dir, exist_ok=True)
+        self.index_path = os.path.join(output_dir, f"{prefix}.idx")
+        if os.path.exists(self.index_path):
+            self._load_index()
+        else:
+            self._rebuild_index()
+        self._index_file = open(self.index_path, "a", encoding="utf-8")
+        self._segment_file = None
+        self._segment_name = None
+        self._segment_day = None
+        self._open_segment()
+        LOGGER.info(f"Initialized JsonlResultStore at {output_dir} ({len(self._ids)} records)")
+
+    def _segments(self) -> List[str]:
+        return sorted(
+            name for name in os.listdir(self.output_dir)
+            if name.startswith(f"{self.prefix}-") and name.endswith(".jsonl")
+        )
+
+    def _segment_path(self, name: str) -> str:
+        return os.path.join(self.output_dir, name)
+
+    def _open_segment(self, force_new: bool = False) -> None:
+        """打开当前分段，必要时（跨日或超出大小）创建新分段"""
+        if self._segment_file:
+            self._segment_file.close()
+        today = datetime.now().strftime("%Y%m%d")
+        segments = [s for s in self._segments() if s.startswith(f"{self.prefix}-{today}-")]
+        name = segments[-1] if segments else None
+        if name and (force_new or os.path.getsize(self._segment_path(name)) >= self.max_bytes):
+            seq = int(name[-len("000.jsonl"):-len(".jsonl")]) + 1
+            name = f"{self.prefix}-{today}-{seq:03d}.jsonl"
+        elif not name:
+            name = f"{self.prefix}-{today}-000.jsonl"
+        self._segment_name = name
+        self._segment_day = today
+        self._segment_file = open(self._segment_path(name), "a", encoding="utf-8")
+
+    def _maybe_rotate(self) -> None:
+        if self.rotate_daily and datetime.now().strftime("%Y%m%d") != self._segment_day:
+            self._open_segment()
+        elif self._segment_file.tell() >= self.max_bytes:
+            self._open_segment(force_new=True)
+
+    def _index_record(self, record_id: int, timestamp: float, segment: str, offset: int,
+                      judgment: Optional[bool]) -> None:
+        pos = bisect_right(self._timestamps, timestamp)
+        self._timestamps.insert(pos, timestamp)
+        self._ids.insert(pos, record_id)
+        self._locations[record_id] = (segment, offset)
+        self._judgments[record_id] = judgment
+        self._next_id = max(self._next_id, record_id + 1)
+
+    def _load_index(self) -> None:
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if parts[0] == "R" and len(parts) == 6:
+                    _, record_id, timestamp, judgment, segment, offset = parts
+                    self._index_record(int(record_id), float(timestamp), segment, int(offset),
+                                       _decode_judgment(judgment))
+                elif parts[0] == "J" and len(parts) in (3, 4, 5):
+                    record_id = int(parts[1])
+                    self._judgments[record_id] = _decode_judgment(parts[2])
+                    self._sources[record_id] = parts[3] if len(parts) >= 4 and parts[3] else None
+                    self._confidences[record_id] = float(parts[4]) if len(parts) == 5 and parts[4] else None
+
+    def _rebuild_index(self) -> None:
+        """根据分段文件重建索引"""
+        with open(self.index_path, "w", encoding="utf-8") as index:
+            for name in self._segments():
+                with open(self._segment_path(name), "r", encoding="utf-8") as f:
+                    offset = f.tell()
+                    line = f.readline()
+                    while line:
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            LOGGER.warning(f"Skipping corrupt line in {name} at offset {offset}")
+                            entry = None
+                        if entry and entry.get("op") == "judgment":
+                            self._judgments[entry["id"]] = entry["judgment"]
+                            self._sources[entry["id"]] = entry.get("source")
+                            self._confidences[entry["id"]] = entry.get("confidence")
+                            index.write(_judgment_line(entry["id"], entry["judgment"], entry.get("source"),
+                                                       entry.get("confidence")))
+                        elif entry:
+                            self._index_record(entry["id"], entry["timestamp"], name, offset,
+                                               entry.get("judgment"))
+                            index.write(_index_line(entry, name, offset))
+                        offset = f.tell()
+                        line = f.readline()
+        if self._ids:
+            LOGGER.info(f"Rebuilt result index with {len(self._ids)} records")
+
+    def append(self, record: dict) -> int:
+        with self._lock:
+            self._maybe_rotate()
+            record_id = self._next_id
+            entry = {
+                "id": record_id,
+                "timestamp": record.get("timestamp") or time.time(),
+                "file": record.get("file"),
+                "text": record.get("text"),
+                "judgment": record.get("judgment"),
+                "source": record.get("source"),
+                "confidence": record.get("confidence"),
+            }
+            offset = self._segment_file.tell()
+            self._segment_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._segment_file.flush()
+            self._index_file.write(_index_line(entry, self._segment_name, offset))
+            self._index_file.flush()
+            self._index_record(record_id, entry["timestamp"], self._segment_name, offset,
+                               entry["judgment"])
+            return record_id
+
+    def set_judgment(self, record_id: int, judgment: Optional[bool], source: Optional[str] = None,
+                     confidence: Optional[float] = None) -> None:
+        with self._lock:
+            if record_id not in self._locations:
+                LOGGER.warning(f"Unknown OCR record id: {record_id}")
+                return
+            patch = {"op": "judgment", "id": record_id, "judgment": judgment, "source": source,
+                     "confidence": confidence}
+            self._segment_file.write(json.dumps(patch) + "\n")
+            self._segment_file.flush()
+            self._index_file.write(_judgment_line(record_id, judgment, source, confidence))
+            self._index_file.flush()
+            self._judgments[record_id] = judgment
+            self._sources[record_id] = source
+            self._confidences[record_id] = confidence
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None,
+              judgment: Optional[bool] = None) -> Iterator[dict]:
+        with self._lock:
+            lo = bisect_left(self._timestamps, since) if since is not None else 0
+            hi = bisect_right(self._timestamps, until) if until is not None else len(self._ids)
+            ids = [i for i in self._ids[lo:hi] if judgment is None or self._judgments.get(i) == judgment]
+            locations = [(i, *self._locations[i]) for i in ids]
+            judgments = {i: self._judgments.get(i) for i in ids}
+            sources = {i: self._sources[i] for i in ids if i in self._sources}
+            confidences = {i: self._confidences[i] for i in ids if i in self._confidences}
+
+        handles = {}
+        try:
+            for record_id, segment, offset in locations:
+                if segment not in handles:
+                    handles[segment] = open(self._segment_path(segment), "r", encoding="utf-8")
+                f = handles[segment]
+                f.seek(offset)
+                entry = json.loads(f.readline())
+                entry["judgment"] = judgments[record_id]
+                entry["source"] = sources.get(record_id, entry.get("source"))
+                entry["confidence"] = confidences.get(record_id, entry.get("confidence"))
+                yield entry
+        finally:
+            for f in handles.values():
+                f.close()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._segment_file:
+                self._segment_file.close()
+                self._segment_file = None
+            if self._index_file:
+                self._index_file.close()
+                self._index_file = None
+
+
+class SqliteResultStore(ResultStore):
+    """SQLite存储，WAL模式，按条数/时间批量提交；空闲时由定时器在 batch_interval 内提交剩余的写入"""
+
+    def __init__(self, output_dir: str, filename: str = "ocr_results.db",
+                 batch_size: int = 50, batch_interval: float = 1.0):
+        os.makedirs(output_dir, exist_ok=True)
+        self.db_path = os.path.join(output_dir, filename)
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+        self._timer: Optional[threading.Timer] = None
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_results ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "timestamp REAL NOT NULL, "
+            "file TEXT, "
+            "text TEXT, "
+            "judgment INTEGER, "
+            "source TEXT, "
+            "confidence REAL)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(ocr_results)")]
+        # 早期版本创建的表没有 source / confidence 列
+        for column, kind in (("source", "TEXT"), ("confidence", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE ocr_results ADD COLUMN {column} {kind}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_results_timestamp ON ocr_results(timestamp)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_results_judgment ON ocr_results(judgment)")
+        self._conn.commit()
+        LOGGER.info(f"Initialized SqliteResultStore at {self.db_path}")
+
+    def _maybe_commit(self) -> None:
+        self._pending += 1
+        if self._pending >= self.batch_size or time.monotonic() - self._last_commit >= self.batch_interval:
+            self._commit()
+        elif self._timer is None:
+            # 写入突发结束后不再有下一次写入触发提交，由定时器兜底
+            self._timer = threading.Timer(self.batch_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _commit(self) -> None:
+        self._conn.commit()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def append(self, record: dict) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO ocr_results (timestamp, file, text, judgment, source, confidence) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (record.get("timestamp") or time.time(), record.get("file"), record.get("text"),
+                 record.get("judgment"), record.get("source"), record.get("confidence")),
+            )
+            self._maybe_commit()
+            return cursor.lastrowid
+
+    def set_judgment(self, record_id: int, judgment: Optional[bool], source: Optional[str] = None,
+                     confidence: Optional[float] = None) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE ocr_results SET judgment = ?, source = ?, confidence = ? WHERE id = ?",
+                               (judgment, source, confidence, record_id))
+            self._maybe_commit()
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None,
+              judgment: Optional[bool] = None) -> Iterator[dict]:
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp <= ?")
+            params.append(until)
+        if judgment is not None:
+            clauses.append("judgment = ?")
+            params.append(int(judgment))
+        sql = "SELECT id, timestamp, file, text, judgment, source, confidence FROM ocr_results"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp"
+        with self._lock:
+            self._commit()
+            rows = self._conn.execute(sql, params).fetchall()
+        for record_id, timestamp, file, text, judgment_value, source, confidence in rows:
+            yield {
+                "id": record_id,
+                "timestamp": timestamp,
+                "file": file,
+                "text": text,
+                "judgment": None if judgment_value is None else bool(judgment_value),
+                "source": source,
+                "confidence": confidence,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ocr_results").fetchone()[0]
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._pending:
+                self._commit()
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._conn.close()
+
+
+def _encode_judgment(judgment: Optional[bool]) -> str:
+    return "-" if judgment is None else str(int(judgment))
+
+
+def _decode_judgment(value: str) -> Optional[bool]:
+    return None if value == "-" else value == "1"
+
+
+def _judgment_line(record_id: int, judgment: Optional[bool], source: Optional[str],
+                   confidence: Optional[float] = None) -> str:
+    confidence = "" if confidence is None else repr(confidence)
+    return f"J\t{record_id}\t{_encode_judgment(judgment)}\t{source or ''}\t{confidence}\n"
+
+
+def _index_line(entry: dict, segment: str, offset: int) -> str:
+    return (f"R\t{entry['id']}\t{entry['timestamp']}\t{_encode_judgment(entry.get('judgment'))}"
+            f"\t{segment}\t{offset}\n")
+
+
+def _legacy_timestamp(filename: Optional[str], fallback: float) -> float:
+    """从 screenshot_%Y%m%d_%H%M%S.png 文件名解析时间戳"""
+    try:
+        stem = os.path.splitext(filename)[0]
+        return datetime.strptime(stem[-len("20250101_000000"):], "%Y%m%d_%H%M%S").timestamp()
+    except (TypeError, ValueError):
+        return fallback
+
+
+def migrate_legacy_json(json_path: str, store: ResultStore) -> int:
+    """将旧版 ocr_results.json 数组一次性迁移到新存储，完成后重命名为 .migrated"""
+    if not os.path.exists(json_path):
+        return 0
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            results = json.load(f)
+        fallback = os.path.getmtime(json_path)
+        for result in results:
+            store.append({
+                "timestamp": _legacy_timestamp(result.get("file"), fallback),
+                "file": result.get("file"),
+                "text": result.get("text"),
+                "judgment": result.get("judgment"),
+            })
+        store.flush()
+        os.replace(json_path, json_path + ".migrated")
+        LOGGER.info(f"Migrated {len(results)} legacy OCR results from {json_path}")
+        return len(results)
+    except Exception as e:
+        LOGGER.error(f"Failed to migrate legacy OCR results: {e}")
+        return 0
+
+
+def create_result_store(output_dir: str, backend: str = "jsonl", **options) -> ResultStore:
+    """根据后端名称创建结果存储（jsonl 或 sqlite）"""
+    if backend == "sqlite":
+        return SqliteResultStore(
+            output_dir,
+            batch_size=options.get("batch_size", 50),
+            batch_interval=options.get("batch_interval", 1.0),
+        )
+    if backend == "jsonl":
+        return JsonlResultStore(
+            output_dir,
+            max_bytes=int(options.get("rotate_mb", 64) * 1024 * 1024),
+            rotate_daily=options.get("rotate_daily", True),
+        )
+    raise ValueError(f"Unknown result store backend: {backend}")
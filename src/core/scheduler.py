@@ -0,0 +1,109 @@
+# 变化事件合并调度
+
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+from utils.logger import LOGGER
+from utils.metrics import METRICS
+
+
+@dataclass
+class DirtyWork:
+    """一次突发内合并后的待处理项"""
+    first_seen: float
+    last_seen: float
+    events: int = 1
+    tiles: List[Tuple[int, int]] = field(default_factory=list)
+    target: str = ""
+
+    def merge(self, now: float, tiles: Optional[List[Tuple[int, int]]] = None) -> None:
+        self.last_seen = now
+        self.events += 1
+        for tile in tiles or []:
+            if tile not in self.tiles:
+                self.tiles.append(tile)
+        self.tiles.sort()
+
+
+class CoalescingScheduler:
+    """合并突发的变化事件，保证每次突发恰好处理一次且延迟有上界。
+
+    在静默期 quiet_period 内到达的事件合并进同一个待处理项；待处理项在
+    静默期结束或距首个事件超过 max_delay 时派发，因此持续的突发不会无限推迟处理。
+    每个监控目标使用独立的调度器，派发的 DirtyWork 带有 target 名称。
+    """
+
+    def __init__(self, quiet_period: float = 2.0, max_delay: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic, target: str = ""):
+        self.target = target
+        self.clock = clock
+        self.configure(quiet_period, max_delay)
+        self.pending: Optional[DirtyWork] = None
+        self.closed = False
+        self.submitted = 0
+        self.coalesced = 0
+        self.dispatched = 0
+        self.dropped = 0
+        self.max_latency = 0.0
+
+    def configure(self, quiet_period: float, max_delay: float) -> None:
+        """更新静默期与最长延迟；已在等待的突发按新的时间派发"""
+        self.quiet_period = quiet_period
+        self.max_delay = max(max_delay, quiet_period)
+
+    def submit(self, tiles: Optional[List[Tuple[int, int]]] = None) -> None:
+        """记录一次变化事件"""
+        if self.closed:
+            self.dropped += 1
+            METRICS.inc("dropped_events", stage="scheduler")
+            LOGGER.warning("Scheduler closed, dropping change event")
+            return
+        now = self.clock()
+        self.submitted += 1
+        if self.pending is None:
+            self.pending = DirtyWork(first_seen=now, last_seen=now, tiles=sorted(tiles or []), target=self.target)
+        else:
+            self.pending.merge(now, tiles)
+            self.coalesced += 1
+            METRICS.inc("coalesced_events")
+
+    def time_until_due(self) -> Optional[float]:
+        """距待处理项可派发的剩余秒数，无待处理项时返回 None"""
+        if self.pending is None:
+            return None
+        now = self.clock()
+        due = min(self.pending.last_seen + self.quiet_period, self.pending.first_seen + self.max_delay)
+        return max(0.0, due - now)
+
+    def poll(self) -> Optional[DirtyWork]:
+        """若待处理项已到期则取出并返回"""
+        remaining = self.time_until_due()
+        if remaining is None or remaining > 0:
+            return None
+        work, self.pending = self.pending, None
+        latency = self.clock() - work.first_seen
+        self.dispatched += 1
+        self.max_latency = max(self.max_latency, latency)
+        LOGGER.info(
+            f"Dispatching coalesced burst: {work.events} events, latency {latency:.2f}s "
+            f"({self.format_stats()})"
+        )
+        return work
+
+    def close(self) -> Optional[DirtyWork]:
+        """停止接收事件，返回尚未派发的待处理项"""
+        self.closed = True
+        work, self.pending = self.pending, None
+        return work
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "dispatched": self.dispatched,
+            "dropped": self.dropped,
+            "max_latency": round(self.max_latency, 3),
+        }
+
+    def format_stats(self) -> str:
+        return ", ".join(f"{k}={v}" for k, v in self.stats().items())
@@ -0,0 +1,40 @@
+# 监控目标配置
+
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import List, Mapping
+
+
+@dataclass(frozen=True)
+class MonitorTarget:
+    """一个被监控的聊天区域：所在窗口、详情窗口标题与聊天框位置（只读映射，不参与哈希）"""
+    name: str
+    window_title: str
+    details_window_title: str
+    chat_box: Mapping[str, int] = field(default_factory=dict, hash=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "chat_box", MappingProxyType(dict(self.chat_box)))
+
+
+def load_targets(config) -> List[MonitorTarget]:
+    """读取 targets 列表；未配置时由 app.window_title / app.details_window_title / chat_box 构成单个目标。
+
+    targets 中未填写的窗口标题与聊天框沿用上述全局配置。
+    """
+    window_title = config.get("app.window_title")
+    details_title = config.get("app.details_window_title")
+    chat_box = config.get("chat_box") or {}
+    entries = config.get("targets") or [{}]
+    targets = []
+    for i, entry in enumerate(entries):
+        targets.append(MonitorTarget(
+            name=entry.get("name") or (f"target{i}" if len(entries) > 1 else "default"),
+            window_title=entry.get("window_title", window_title),
+            details_window_title=entry.get("details_window_title", details_title),
+            chat_box={**chat_box, **(entry.get("chat_box") or {})},
+        ))
+    names = [t.name for t in targets]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate monitor target names: {names}")
+    return targets
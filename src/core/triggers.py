@@ -0,0 +1,269 @@
+# 自适应轮询与外部变化触发
+
+import asyncio
+import ctypes
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Callable, Iterable, List, Optional
+from utils.logger import LOGGER
+from utils.metrics import METRICS
+
+
+class AdaptivePoller:
+    """根据最近的活动调整轮询间隔。
+
+    检测到变化后的 idle_after 秒内按 min_interval 轮询；之后每次轮询把间隔乘以
+    backoff，直到 max_interval。
+    """
+
+    def __init__(self, min_interval: float = 0.5, max_interval: float = 5.0, backoff: float = 1.5,
+                 idle_after: float = 10.0, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.interval = min_interval
+        self.configure(min_interval, max_interval, backoff, idle_after)
+        self.last_activity = clock()
+
+    def configure(self, min_interval: float, max_interval: float, backoff: float, idle_after: float) -> None:
+        """更新轮询参数；当前间隔限制在新的范围内"""
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff = max(1.0, backoff)
+        self.idle_after = idle_after
+        self.interval = min(max(self.interval, self.min_interval), self.max_interval)
+
+    def activity(self) -> None:
+        """记录一次检测到的变化，立即恢复最短间隔"""
+        self.last_activity = self.clock()
+        self.interval = self.min_interval
+
+    def next_interval(self) -> float:
+        if self.clock() - self.last_activity < self.idle_after:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        return self.interval
+
+
+class TriggerSource(ABC):
+    """外部变化事件来源，事件到达时调用 callback（可能在其它线程中）"""
+
+    @abstractmethod
+    def start(self, callback: Callable[[str], None]) -> None:
+        pass
+
+    @abstractmethod
+    def stop(self) -> None:
+        pass
+
+    @property
+    def active(self) -> bool:
+        """start() 之后是否真的在产生事件"""
+        return True
+
+
+class ManualTriggerSource(TriggerSource):
+    """手动触发的事件来源，用于测试、回放或由其它组件转发事件"""
+
+    def __init__(self):
+        self._callback: Optional[Callable[[str], None]] = None
+
+    def start(self, callback: Callable[[str], None]) -> None:
+        self._callback = callback
+
+    def fire(self, reason: str = "manual") -> None:
+        if self._callback is not None:
+            self._callback(reason)
+
+    def stop(self) -> None:
+        self._callback = None
+
+
+class WinEventTrigger(TriggerSource):
+    """通过 SetWinEventHook 监听目标窗口所属进程的界面事件（新消息会引起重绘/名称/值变化）。
+
+    钩子运行在独立线程的消息循环中；光标与插入符事件被忽略。只是唤醒信号，
+    是否真的有新消息仍由变化检测判断。
+    """
+
+    EVENT_OBJECT_CREATE = 0x8000
+    EVENT_OBJECT_VALUECHANGE = 0x800E
+    EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+    OBJID_CARET = -8
+    OBJID_CURSOR = -9
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WINEVENT_SKIPOWNPROCESS = 0x0002
+    WM_QUIT = 0x0012
+
+    def __init__(self, hwnds: Iterable[int]):
+        self.hwnds = [hwnd for hwnd in hwnds if hwnd]
+        self._thread: Optional[threading.Thread] = None
+        self._thread_id: Optional[int] = None
+        self._callback: Optional[Callable[[str], None]] = None
+        self._ready = threading.Event()
+        self._hooks = 0
+
+    def start(self, callback: Callable[[str], None]) -> None:
+        self._callback = callback
+        self._thread = threading.Thread(target=self._run, name="win-event-hook", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=2.0)
+
+    def _run(self) -> None:
+        from ctypes import wintypes
+        user32 = ctypes.windll.user32
+        self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        proc_type = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                       wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+
+        def on_event(hook, event, hwnd, id_object, id_child, thread, time_ms):
+            if event == self.EVENT_OBJECT_LOCATIONCHANGE or id_object in (self.OBJID_CARET, self.OBJID_CURSOR):
+                return
+            self._callback(f"win_event:{event:#x}")
+
+        # 回调对象需保持引用，否则会被回收
+        self._proc = proc_type(on_event)
+        hooks = []
+        for hwnd in self.hwnds:
+            pid = wintypes.DWORD()
+            user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+            hook = user32.SetWinEventHook(
+                self.EVENT_OBJECT_CREATE, self.EVENT_OBJECT_VALUECHANGE, 0, self._proc, pid.value, 0,
+                self.WINEVENT_OUTOFCONTEXT | self.WINEVENT_SKIPOWNPROCESS,
+            )
+            if hook:
+                hooks.append(hook)
+            else:
+                LOGGER.warning(f"SetWinEventHook failed for window {hwnd}")
+        LOGGER.info(f"Installed {len(hooks)} window event hook(s)")
+        self._hooks = len(hooks)
+        self._ready.set()
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        for hook in hooks:
+            user32.UnhookWinEvent(hook)
+
+    def stop(self) -> None:
+        if self._thread is not None and self._thread_id is not None:
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+            self._thread.join(timeout=2.0)
+        self._thread = None
+        self._hooks = 0
+
+    @property
+    def active(self) -> bool:
+        return self._hooks > 0
+
+
+class ChangeTrigger:
+    """合并定时轮询与外部事件：wait() 在间隔到期或事件到达时返回唤醒原因。
+
+    事件到达后至少间隔 debounce 秒才再次唤醒，且每分钟最多 max_event_wakeups 次事件唤醒，
+    避免界面事件风暴导致频繁截图。没有可用的事件来源时最长轮询间隔不超过
+    fallback_max_interval，否则空闲时新消息要等到退避后的下一次轮询才被发现。
+    """
+
+    def __init__(self, poller: AdaptivePoller, sources: Optional[List[TriggerSource]] = None,
+                 debounce: float = 0.2, max_event_wakeups: int = 0, fallback_max_interval: Optional[float] = None):
+        self.poller = poller
+        self.sources = sources or []
+        self.debounce = debounce
+        self.max_event_wakeups = max_event_wakeups
+        self.fallback_max_interval = fallback_max_interval
+        self.max_interval = poller.max_interval
+        self._event: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_wake = 0.0
+        self._event_wakes: deque = deque()
+        self.wakeups = {"timer": 0, "event": 0}
+
+    @property
+    def events_active(self) -> bool:
+        return any(source.active for source in self.sources)
+
+    def configure(self, min_interval: float, max_interval: float, backoff: float, idle_after: float,
+                  debounce: float, max_event_wakeups: int, fallback_max_interval: Optional[float]) -> None:
+        """更新轮询与事件唤醒参数（热加载）"""
+        self.debounce = debounce
+        self.max_event_wakeups = max_event_wakeups
+        self.fallback_max_interval = fallback_max_interval
+        self.max_interval = max_interval
+        self.poller.configure(min_interval, self._poll_max_interval(), backoff, idle_after)
+
+    def _poll_max_interval(self) -> float:
+        if self.fallback_max_interval is None or self.events_active:
+            return self.max_interval
+        return min(self.max_interval, self.fallback_max_interval)
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        for source in self.sources:
+            source.start(self._on_event)
+        if self.max_interval != self._poll_max_interval():
+            LOGGER.info(f"No window event source active; polling at most every {self._poll_max_interval():g}s")
+        self.poller.configure(self.poller.min_interval, self._poll_max_interval(),
+                              self.poller.backoff, self.poller.idle_after)
+
+    def _on_event(self, reason: str) -> None:
+        # 事件可能来自钩子线程
+        self._loop.call_soon_threadsafe(self._event.set)
+
+    def activity(self) -> None:
+        self.poller.activity()
+
+    def wake(self) -> None:
+        """从任意线程提前唤醒 wait()，如配置热加载后"""
+        self._on_event("manual")
+
+    async def wait(self, timeout: Optional[float] = None) -> str:
+        """等待下一次唤醒；timeout 为调用方要求的最晚唤醒时间（如调度器的到期时间）"""
+        interval = self.poller.next_interval()
+        if timeout is not None:
+            interval = min(interval, timeout)
+        deadline = time.monotonic() + interval
+        try:
+            await asyncio.wait_for(self._event.wait(), interval)
+            reason = "event"
+            delay = max(self.debounce - (time.monotonic() - self._last_wake), self._event_cap_delay())
+            # 受上限推迟到定时唤醒之后的事件按定时唤醒处理，不计入事件唤醒次数
+            if time.monotonic() + delay >= deadline:
+                reason = "timer"
+                delay = deadline - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if reason == "event":
+                self._event_wakes.append(time.monotonic())
+        except asyncio.TimeoutError:
+            reason = "timer"
+        self._event.clear()
+        self._last_wake = time.monotonic()
+        self.wakeups[reason] += 1
+        METRICS.inc("wakeups", reason=reason)
+        return reason
+
+    def _event_cap_delay(self) -> float:
+        """达到每分钟事件唤醒上限时，返回最早一次唤醒滑出 60 秒窗口还需等待的秒数"""
+        now = time.monotonic()
+        while self._event_wakes and now - self._event_wakes[0] >= 60.0:
+            self._event_wakes.popleft()
+        if not self.max_event_wakeups or len(self._event_wakes) < self.max_event_wakeups:
+            return 0.0
+        return self._event_wakes[-self.max_event_wakeups] + 60.0 - now
+
+    def stop(self) -> None:
+        for source in self.sources:
+            source.stop()
+
+
+def create_trigger_sources(mode: str, hwnds: Iterable[int]) -> List[TriggerSource]:
+    """events 配置：auto 在 Windows 上使用窗口事件钩子，win32 强制使用，none 只用自适应轮询"""
+    if mode == "none" or (mode == "auto" and sys.platform != "win32"):
+        return []
+    if mode in ("auto", "win32"):
+        return [WinEventTrigger(hwnds)]
+    raise ValueError(f"Unknown trigger events mode: {mode}")
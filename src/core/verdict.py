@@ -0,0 +1,82 @@
+# AI判断结果解析
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+YES = "yes"
+NO = "no"
+UNSURE = "not sure"
+LABELS = (YES, NO, UNSURE)
+# 判断来源：大模型，或本地预分类的规则/模型
+LLM = "llm"
+
+# 追加到提示词后，要求模型只返回一个很短的 JSON 对象
+VERDICT_INSTRUCTIONS = (
+    'Reply with a JSON object only: {"label": "yes" | "no" | "not sure", "confidence": <number from 0 to 1>}.'
+)
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+# 标签之后须是标点或文本结束，"No idea"、"yes/no" 不算作标签
+_LEADING_LABEL = re.compile(r"^\W*(not sure|unsure|yes|no)\s*(?:[.,!?;:。，！？；：]|$)", re.IGNORECASE)
+# 纯文本回复没有给出置信度，低于 JSON 回复的默认值，可用 alert_threshold 要求结构化回复
+FREE_TEXT_CONFIDENCE = 0.6
+
+
+@dataclass(frozen=True)
+class Verdict:
+    """解析后的判断：label 为 yes / no / not sure，parsed 为 False 表示回复无法解析，source 为判断来源"""
+    label: str
+    confidence: float = 1.0
+    parsed: bool = True
+    source: str = LLM
+
+    def is_positive(self, threshold: float = 0.5) -> bool:
+        return self.label == YES and self.confidence >= threshold
+
+    @property
+    def judgment(self) -> Optional[bool]:
+        """写入结果存储的标签：yes / no 为 True / False，not sure 或无法解析时为 None（不参与训练）"""
+        if not self.parsed or self.label == UNSURE:
+            return None
+        return self.label == YES
+
+
+def _label(value) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    value = value.strip().lower()
+    if value == "unsure":
+        return UNSURE
+    return value if value in LABELS else None
+
+
+def format_verdict(label: str, source: str = LLM, confidence: float = 1.0) -> str:
+    """把本地给出的判断编码为与结构化回复相同的 JSON，parse_verdict 能从中取回 source"""
+    return json.dumps({"label": label, "confidence": confidence, "source": source})
+
+
+def parse_verdict(content: Optional[str]) -> Verdict:
+    """解析模型回复：优先按 JSON 对象 {"label", "confidence"} 解析，否则只接受以标签加标点开头或只有标签的
+    纯文本（"Yes."、"no, because ..."、"not sure, yes maybe"），置信度为 FREE_TEXT_CONFIDENCE。
+    其余内容（如 "eyes"、"No idea"、"yes/no"）视为 not sure 且 parsed=False。
+    """
+    text = _FENCE.sub("", (content or "").strip())
+    if text.startswith("{"):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            label = _label(data.get("label", data.get("answer")))
+            if label is not None:
+                try:
+                    confidence = min(1.0, max(0.0, float(data.get("confidence", 1.0))))
+                except (TypeError, ValueError):
+                    confidence = 1.0
+                source = data.get("source")
+                return Verdict(label, confidence, source=source if isinstance(source, str) else LLM)
+    match = _LEADING_LABEL.match(text)
+    if match:
+        return Verdict(_label(match.group(1)), FREE_TEXT_CONFIDENCE)
+    return Verdict(UNSURE, 0.0, parsed=False)
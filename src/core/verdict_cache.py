@@ -0,0 +1,199 @@
+# AI判断结果缓存
+
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Union
+from core.ai_analyzer import AIAnalyzer, AsyncAIAnalyzer
+from utils.logger import LOGGER
+from utils.metrics import METRICS
+
+# 聊天记录中的时间与日期（如 "21:52:19"、"5/15"、"2025-05-15"），重复打开同一记录时OCR结果中最易变化
+_TIME_PATTERN = re.compile(r"\d{1,2}:\d{2}(?::\d{2})?")
+# 日期只匹配带 / - 年月日 分隔且月、日在合法范围内的形式，不误删小数与版本号（如 "3.11"、"12.50"）
+_DATE_PATTERN = re.compile(
+    r"(?<!\d)(?:\d{4}[/\-年])?(?:0?[1-9]|1[0-2])[/\-月](?:0?[1-9]|[12]\d|3[01])(?!\d)日?"
+    r"|(?<!\d)\d{4}年(?:0?[1-9]|1[0-2])月"
+)
+_SPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """规范化OCR文本：全角转半角、去除时间日期与空白、转小写"""
+    text = unicodedata.normalize("NFKC", text or "")
+    text = _TIME_PATTERN.sub("", text)
+    text = _DATE_PATTERN.sub("", text)
+    return _SPACE_PATTERN.sub("", text).lower()
+
+
+def cache_key(kind: str, content: str, prompt: str, model: str) -> str:
+    """由内容、提示词和模型计算缓存键"""
+    digest = hashlib.sha256()
+    for part in (kind, model or "", prompt or "", content):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class VerdictCache:
+    """两级判断结果缓存：内存 LRU（带 TTL）+ 可选的 SQLite 持久层"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 86400.0, db_path: Optional[str] = None,
+                 stats_interval: float = 300.0):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self.stats_interval = stats_interval
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._last_stats = time.monotonic()
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.execute("DELETE FROM verdicts WHERE created < ?", (time.time() - ttl,))
+            self._conn.commit()
+        LOGGER.info(f"Initialized VerdictCache (max_entries={max_entries}, ttl={ttl}s, db={db_path})")
+
+    def _expired(self, created: float) -> bool:
+        return time.time() - created > self.ttl
+
+    def _remember(self, key: str, value: str, created: float) -> None:
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._get_locked(key)
+            if value is None:
+                self.misses += 1
+                METRICS.inc("cache_misses")
+            else:
+                METRICS.inc("cache_hits")
+            self._maybe_log_stats()
+            return value
+
+    def _get_locked(self, key: str) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            if not self._expired(entry[1]):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            del self._memory[key]
+            self.evictions += 1
+        if self._conn is None:
+            return None
+        row = self._conn.execute("SELECT value, created FROM verdicts WHERE key = ?", (key,)).fetchone()
+        if row is None or self._expired(row[1]):
+            return None
+        self._remember(key, row[0], row[1])
+        self.hits += 1
+        self.disk_hits += 1
+        return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        created = time.time()
+        with self._lock:
+            self._remember(key, value, created)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO verdicts (key, value, created) VALUES (?, ?, ?)",
+                    (key, value, created),
+                )
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._memory),
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def _maybe_log_stats(self) -> None:
+        if time.monotonic() - self._last_stats >= self.stats_interval:
+            self._last_stats = time.monotonic()
+            LOGGER.info("Verdict cache stats: " + ", ".join(f"{k}={v}" for k, v in self.stats().items()))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class CachingAnalyzer(AsyncAIAnalyzer):
+    """在任意分析器前加一层判断结果缓存，相同内容的并发请求只调用一次下游"""
+
+    def __init__(self, analyzer: Union[AIAnalyzer, AsyncAIAnalyzer], cache: VerdictCache,
+                 model: Optional[str] = None):
+        self.analyzer = analyzer
+        self.cache = cache
+        self.model = model or getattr(analyzer, "text_model", type(analyzer).__name__)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def _call(self, method: str, *args) -> Optional[str]:
+        func = getattr(self.analyzer, method)
+        if isinstance(self.analyzer, AsyncAIAnalyzer):
+            return await func(*args)
+        return await asyncio.to_thread(func, *args)
+
+    async def _cached(self, key: str, method: str, *args) -> Optional[str]:
+        cached = self.cache.get(key)
+        if cached is not None:
+            LOGGER.debug(f"Verdict cache hit for {method}")
+            return cached
+        if key in self._inflight:
+            return await asyncio.shield(self._inflight[key])
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._call(method, *args)
+            if result is not None:
+                self.cache.put(key, result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 避免无人等待时出现 "exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def analyze_text(self, text: str, prompt: str) -> Optional[str]:
+        key = cache_key("text", normalize_text(text), prompt, self.model)
+        return await self._cached(key, "analyze_text", text, prompt)
+
+    async def analyze_image(self, image_data: str, prompt: str) -> Optional[str]:
+        content = hashlib.sha256(image_data.encode("ascii")).hexdigest()
+        key = cache_key("image", content, prompt, getattr(self.analyzer, "image_model", self.model))
+        return await self._cached(key, "analyze_image", image_data, prompt)
+
+    async def aclose(self) -> None:
+        self.cache.close()
+        if isinstance(self.analyzer, AsyncAIAnalyzer):
+            await self.analyzer.aclose()
@@ -1,15 +1,66 @@
 # 窗口操作与截图接口
 
 from abc import ABC, abstractmethod
-from typing import Optional, Tuple
-import win32gui
-import win32con
-import win32api
-import win32ui
+from typing import Dict, Optional, Tuple
+import asyncio
 import ctypes
-from PIL import Image
+import threading
+import numpy as np
+try:
+    import win32gui
+    import win32con
+    import win32api
+    import win32ui
+except ImportError:  # 非 Windows 平台只能使用其它 WindowManager 实现（如回放）
+    win32gui = win32con = win32api = win32ui = None
+from core.frame import Frame, BGRX
 from utils.logger import LOGGER
 
+class CaptureSession:
+    """绑定到一个窗口标题的截图会话：缓存窗口句柄与位置，截图失败时重新查找。
+
+    通用实现每帧调用 WindowManager.capture_screenshot；平台实现可覆盖 capture
+    以复用设备上下文和缓冲区。
+    """
+
+    def __init__(self, manager: "WindowManager", title: str, buffers: int = 4):
+        self.manager = manager
+        self.title = title
+        self.buffers = max(1, buffers)
+        self._window_info: Optional[dict] = None
+        self._lock = threading.Lock()
+
+    @property
+    def window_info(self) -> Optional[dict]:
+        """缓存的窗口信息，尚未找到时重新查找"""
+        if self._window_info is None:
+            self._window_info = self.manager.find_window(self.title)
+        return self._window_info
+
+    def invalidate(self) -> None:
+        """丢弃缓存的窗口信息，下次截图时重新查找"""
+        self._window_info = None
+
+    def capture(self, region: Optional[Tuple] = None, reuse_buffer: bool = True) -> Optional[Frame]:
+        """截取窗口或区域。reuse_buffer 为 True 时实现可轮换复用缓冲区，帧只在之后 buffers-1 次截图内有效"""
+        with self._lock:
+            info = self.window_info
+            if not info:
+                return None
+            frame = self.manager.capture_screenshot(info["hwnd"], region)
+            if frame is None:
+                self.invalidate()
+            return frame
+
+    def close(self) -> None:
+        self.invalidate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 class WindowManager(ABC):
     @abstractmethod
     def find_window(self, title: str) -> dict:
@@ -17,8 +68,8 @@ class WindowManager(ABC):
         pass
 
     @abstractmethod
-    def capture_screenshot(self, hwnd, region: Optional[Tuple] = None) -> Image.Image:
-        """截取窗口或指定区域"""
+    def capture_screenshot(self, hwnd, region: Optional[Tuple] = None) -> Frame:
+        """截取窗口或指定区域，返回 BGRX 帧"""
         pass
 
     @abstractmethod
@@ -26,6 +77,35 @@ class WindowManager(ABC):
         """模拟鼠标点击"""
         pass
 
+    def open_session(self, title: str, buffers: int = 4) -> CaptureSession:
+        """打开针对某个窗口的截图会话"""
+        return CaptureSession(self, title, buffers)
+
+    async def wait_for_window(self, title: str, timeout: float = 2.0,
+                              poll_interval: float = 0.05) -> Optional[dict]:
+        """每隔 poll_interval 秒查找窗口直到出现，超时返回 None；不阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            info = self.find_window(title)
+            remaining = deadline - loop.time()
+            if info or remaining <= 0:
+                return info
+            await asyncio.sleep(min(poll_interval, remaining))
+
+    async def wait_for_window_closed(self, title: str, timeout: float = 2.0,
+                                     poll_interval: float = 0.05) -> bool:
+        """等待窗口消失，超时仍存在时返回 False"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            if not self.find_window(title):
+                return True
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(poll_interval, remaining))
+
 class WindowsWindowManager(WindowManager):
     def find_window(self, title: str) -> Optional[dict]:
         """查找Windows窗口"""
@@ -44,7 +124,7 @@ class WindowsWindowManager(WindowManager):
         LOGGER.debug(f"Found window {title}: {info}")
         return info
 
-    def capture_screenshot(self, hwnd, region: Optional[Tuple] = None) -> Optional[Image.Image]:
+    def capture_screenshot(self, hwnd, region: Optional[Tuple] = None) -> Optional[Frame]:
         """使用PrintWindow截取窗口"""
         left, top, right, bottom = win32gui.GetWindowRect(hwnd)
         width = right - left
@@ -60,7 +140,8 @@ class WindowsWindowManager(WindowManager):
         result = ctypes.windll.user32.PrintWindow(hwnd, saveDC.GetSafeHdc(), 0)
         bmpinfo = saveBitMap.GetInfo()
         bmpstr = saveBitMap.GetBitmapBits(True)
-        im: Image.Image = Image.frombuffer('RGB', (bmpinfo['bmWidth'], bmpinfo['bmHeight']), bmpstr, 'raw', 'BGRX', 0, 1)
+        # 直接包装位图字节，不经过 PIL 转换
+        frame = Frame.from_bitmap_bits(bmpstr, bmpinfo['bmWidth'], bmpinfo['bmHeight'])
 
         win32gui.DeleteObject(saveBitMap.GetHandle())
         saveDC.DeleteDC()
@@ -73,13 +154,119 @@ class WindowsWindowManager(WindowManager):
 
         if region:
             x, y, w, h = region
-            im = im.crop((x, y, x + w, y + h))
+            frame = frame.roi(x, y, w, h)
         # LOGGER.info("Captured screenshot")
-        return im
+        return frame
 
     def simulate_click(self, hwnd, x: int, y: int) -> None:
         """模拟后台点击"""
         lParam = win32api.MAKELONG(x, y)
         win32gui.SendMessage(hwnd, win32con.WM_LBUTTONDOWN, win32con.MK_LBUTTON, lParam)
         win32gui.SendMessage(hwnd, win32con.WM_LBUTTONUP, None, lParam)
-        LOGGER.debug(f"Simulated click at ({x}, {y})")
\ No newline at end of file
+        LOGGER.debug(f"Simulated click at ({x}, {y})")
+
+    def open_session(self, title: str, buffers: int = 4) -> CaptureSession:
+        """打开复用 GDI 资源的截图会话"""
+        return WindowsCaptureSession(self, title, buffers)
+
+class WindowsCaptureSession(CaptureSession):
+    """复用 GDI 设备上下文与位图的截图会话。
+
+    整窗位图只在窗口尺寸变化时重新分配；PrintWindow 之后只把请求的区域
+    BitBlt 到按尺寸缓存的小位图，再直接读入轮换复用的 NumPy 缓冲区（帧在流水线队列中
+    等待时不会被下一次截图覆盖，只要队列长度小于 buffers）。
+    """
+
+    def __init__(self, manager: "WindowsWindowManager", title: str, buffers: int = 4):
+        super().__init__(manager, title, buffers)
+        self._size: Optional[Tuple[int, int]] = None
+        self._hwnd = None
+        self._hwnd_dc = None
+        self._mfc_dc = None
+        self._save_dc = None
+        self._bitmap = None
+        self._regions: Dict[Tuple[int, int], tuple] = {}
+
+    def _allocate(self, hwnd, width: int, height: int) -> None:
+        self._hwnd = hwnd
+        self._size = (width, height)
+        self._hwnd_dc = win32gui.GetWindowDC(hwnd)
+        self._mfc_dc = win32ui.CreateDCFromHandle(self._hwnd_dc)
+        self._save_dc = self._mfc_dc.CreateCompatibleDC()
+        self._bitmap = win32ui.CreateBitmap()
+        self._bitmap.CreateCompatibleBitmap(self._mfc_dc, width, height)
+        self._save_dc.SelectObject(self._bitmap)
+        LOGGER.debug(f"Allocated capture context for {self.title}: {width}x{height}")
+
+    def _release(self) -> None:
+        for dc, bitmap, *_ in self._regions.values():
+            win32gui.DeleteObject(bitmap.GetHandle())
+            dc.DeleteDC()
+        self._regions = {}
+        if self._bitmap is not None:
+            win32gui.DeleteObject(self._bitmap.GetHandle())
+            self._save_dc.DeleteDC()
+            self._mfc_dc.DeleteDC()
+            win32gui.ReleaseDC(self._hwnd, self._hwnd_dc)
+        self._bitmap = self._save_dc = self._mfc_dc = self._hwnd_dc = None
+        self._size = None
+
+    def _region_target(self, width: int, height: int) -> tuple:
+        """按尺寸缓存的区域 DC、位图和下一个轮换缓冲区"""
+        target = self._regions.get((width, height))
+        if target is None:
+            dc = self._mfc_dc.CreateCompatibleDC()
+            bitmap = win32ui.CreateBitmap()
+            bitmap.CreateCompatibleBitmap(self._mfc_dc, width, height)
+            dc.SelectObject(bitmap)
+            ring = [np.empty((height, width, 4), dtype=np.uint8) for _ in range(self.buffers)]
+            target = [dc, bitmap, ring, 0]
+            self._regions[(width, height)] = target
+        dc, bitmap, ring, index = target
+        target[3] = (index + 1) % len(ring)
+        return dc, bitmap, ring[index]
+
+    def invalidate(self) -> None:
+        super().invalidate()
+        self._release()
+
+    def capture(self, region: Optional[Tuple] = None, reuse_buffer: bool = True) -> Optional[Frame]:
+        with self._lock:
+            info = self.window_info
+            if not info:
+                return None
+            hwnd = info["hwnd"]
+            if not win32gui.IsWindow(hwnd):
+                LOGGER.warning(f"Window handle for {self.title} is no longer valid")
+                self.invalidate()
+                return None
+            left, top, right, bottom = win32gui.GetWindowRect(hwnd)
+            size = (right - left, bottom - top)
+            if size != self._size or hwnd != self._hwnd:
+                self._release()
+                self._allocate(hwnd, *size)
+            info.update({"x": left, "y": top, "width": size[0], "height": size[1]})
+
+            if ctypes.windll.user32.PrintWindow(hwnd, self._save_dc.GetSafeHdc(), 0) != 1:
+                LOGGER.error("Screenshot failed")
+                self.invalidate()
+                return None
+
+            x, y, w, h = region or (0, 0, size[0], size[1])
+            x, y = max(0, x), max(0, y)
+            w, h = min(w, size[0] - x), min(h, size[1] - y)
+            if w <= 0 or h <= 0:
+                LOGGER.error(f"Capture region {region} is outside the window ({size[0]}x{size[1]})")
+                return None
+            dc, bitmap, buffer = self._region_target(w, h)
+            dc.BitBlt((0, 0), (w, h), self._save_dc, (x, y), win32con.SRCCOPY)
+            if not reuse_buffer:
+                buffer = np.empty((h, w, 4), dtype=np.uint8)
+            ctypes.windll.gdi32.GetBitmapBits(
+                ctypes.c_void_p(bitmap.GetHandle()), buffer.nbytes, buffer.ctypes.data_as(ctypes.c_void_p)
+            )
+            return Frame(buffer, BGRX)
+
+    def close(self) -> None:
+        with self._lock:
+            self.invalidate()
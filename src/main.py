@@ -1,56 +1,414 @@
+import argparse
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from core.window_manager import WindowsWindowManager
+import time
+from utils.startup import STARTUP
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+# cv2 随 core.frame 在导入时加载（约 30 ms，占导入 main 的一成）：首帧的变化检测立即需要它，
+# 延迟导入只会把这段耗时移到首帧之后，不缩短开始截图到发现消息的时间
+from core.window_manager import WindowManager, WindowsWindowManager
+from core.replay import RecordingWindowManager, ReplayWindowManager
+from core.frame import Frame
 from core.image_processor import ImageProcessor
-from core.ai_analyzer import DashscopeAnalyzer
+from core.dedup import DedupIndex
+from core.image_store import create_image_store
 from core.chat_monitor import ChatMonitor
-from core.ocr_processor import OCRProcessor
+from core.ocr_processor import LazyEngine, OCRProcessor
+from core.ocr_pool import OCRPool
+from core.preprocess import Preprocessor
+from core.prefilter import PrefilterAnalyzer
+from core.pipeline import Pipeline, build_stage, BLOCK, DROP_OLDEST
+from core.result_store import create_result_store
+from core.verdict import Verdict
+from core.scheduler import CoalescingScheduler
+from core.targets import MonitorTarget
+from core.triggers import AdaptivePoller, ChangeTrigger, create_trigger_sources
 from services.screenshot_service import ScreenshotService
-from services.analysis_service import AnalysisService
-from services.alert_service import AlertService
+from services.analysis_service import AnalysisService, create_analyzer
+from services.alert_service import AlertService, create_alert_service
 from config.config import CONFIG
-from utils.logger import LOGGER
-from utils.file_utils import save_image
-
-async def monitor_chat():
-    """主监控循环"""
-    window_manager = WindowsWindowManager()
-    image_processor = ImageProcessor()
-    ai_analyzer = DashscopeAnalyzer(base_url=CONFIG.get("ai.base_url"))
-    chat_monitor = ChatMonitor(CONFIG.get("thresholds.change_detection"))
-    ocr_processor = OCRProcessor(CONFIG.get("paths.ocr_results"))
-    screenshot_service = ScreenshotService(window_manager, image_processor)
+from config.settings import Settings
+from utils.logger import LOGGER, setup_logger
+from utils.metrics import METRICS
+
+STARTUP.mark("imports")
+
+# 可在运行中生效的配置项：None 表示整项，否则为其中可热加载的键；其余配置修改后需重启
+HOT_RELOADABLE = {
+    "app": None,
+    "targets": None,
+    "chat_box": None,
+    "thresholds": None,
+    "detector": None,
+    "scheduler": None,
+    "details_window": None,
+    "config_reload": None,
+    "trigger": ("min_interval", "max_interval", "backoff", "idle_after", "debounce", "max_event_wakeups",
+                "fallback_max_interval"),
+    "paths": ("screenshots", "judgments"),
+    "ai": ("prompt", "structured", "alert_threshold"),
+}
+
+@dataclass
+class TargetFrame:
+    """某个监控目标的一帧聊天框截图"""
+    target: str
+    screenshot: Frame
+
+@dataclass
+class ChatMessage:
+    """在流水线中传递的一条待处理消息"""
+    screenshot: Frame
+    text: Optional[str] = None
+    record_id: Optional[int] = None
+    result: bool = False
+    verdict: Optional[Verdict] = None
+    created: float = field(default_factory=time.monotonic)
+    target: str = ""
+
+@dataclass
+class TargetContext:
+    """单个监控目标的截图服务及其独立的变化检测与合并状态"""
+    target: MonitorTarget
+    screenshot_service: ScreenshotService
+    chat_monitor: ChatMonitor
+    scheduler: CoalescingScheduler
+
+def create_target_contexts(window_manager: WindowManager, image_processor: ImageProcessor,
+                           targets: List[MonitorTarget],
+                           clock: Callable[[], float] = time.monotonic) -> Dict[str, TargetContext]:
+    """为每个监控目标创建截图会话、变化检测器和合并调度器"""
+    settings = CONFIG.snapshot
+    return {
+        target.name: TargetContext(
+            target=target,
+            screenshot_service=ScreenshotService(window_manager, image_processor, target),
+            chat_monitor=ChatMonitor(settings.detector.change_threshold, **settings.detector.options),
+            scheduler=CoalescingScheduler(
+                quiet_period=settings.scheduler.quiet_period,
+                max_delay=settings.scheduler.max_delay,
+                clock=clock, target=target.name,
+            ),
+        )
+        for target in targets
+    }
+
+def restart_required(old: Settings, new: Settings, changed) -> List[str]:
+    """返回修改后需要重启才能生效的配置项"""
+    pending = []
+    for section in sorted(changed):
+        if section not in HOT_RELOADABLE:
+            pending.append(section)
+            continue
+        keys = HOT_RELOADABLE[section]
+        if keys is None:
+            continue
+        before, after = old.get(section) or {}, new.get(section) or {}
+        pending.extend(f"{section}.{key}" for key in sorted(set(before) | set(after))
+                       if key not in keys and before.get(key) != after.get(key))
+    return pending
+
+def apply_settings(contexts: Dict[str, TargetContext], analysis_service: AnalysisService,
+                   trigger: ChangeTrigger, old: Settings, new: Settings) -> None:
+    """把热加载的配置快照应用到各组件；在主循环两轮截图之间调用，此时没有正在进行的截图"""
+    for name, context in contexts.items():
+        target = new.target(name)
+        if target is None:
+            LOGGER.warning(f"Monitor target {name} was removed from the config; restart to stop monitoring it")
+            continue
+        if target != context.target:
+            context.screenshot_service.apply_target(target)
+            if target.chat_box != context.target.chat_box:
+                context.chat_monitor.reset()
+            context.target = target
+        context.chat_monitor.apply_settings(new.detector.change_threshold, **new.detector.options)
+        context.scheduler.configure(new.scheduler.quiet_period, new.scheduler.max_delay)
+    analysis_service.apply_settings(new.ai)
+    options = new.trigger
+    trigger.configure(options.min_interval, options.max_interval, options.backoff, options.idle_after,
+                      options.debounce, options.max_event_wakeups, options.fallback_max_interval)
+    pending = restart_required(old, new, new.changed_sections(old))
+    pending.extend(f"targets.{t.name}" for t in new.targets if t.name not in contexts)
+    if pending:
+        LOGGER.warning(f"Settings that take effect after a restart changed: {', '.join(pending)}")
+
+def create_window_manager() -> WindowManager:
+    """按 capture 配置创建窗口管理器：windows 实时截图或 replay 回放轨迹，可选同时录制"""
+    capture = CONFIG.get("capture") or {}
+    if capture.get("backend", "windows") == "replay":
+        window_manager = ReplayWindowManager(
+            capture["trace_dir"], speed=capture.get("speed", 1.0), loop=capture.get("loop", False)
+        )
+    else:
+        window_manager = WindowsWindowManager()
+    if capture.get("record_dir"):
+        window_manager = RecordingWindowManager(window_manager, capture["record_dir"])
+    return window_manager
+
+def build_pipeline(contexts: Dict[str, TargetContext], ocr_processor: OCRProcessor,
+                   analysis_service: AnalysisService, alert_service: AlertService,
+                   on_complete: Optional[Callable[[ChatMessage], None]] = None,
+                   on_change: Optional[Callable[[str], None]] = None,
+                   dedup_index: Optional[DedupIndex] = None) -> Pipeline:
+    """组装 detect -> details -> ocr -> classify -> alert 流水线。
+
+    所有监控目标共用同一条流水线（同一个OCR引擎与分析器），各阶段队列按目标轮转出队。
+    给定 dedup_index 时，OCR后与最近判断过的记录近似相同的消息直接丢弃，不再判断、保存与提示；
+    消息在得到判断结果后才记入 dedup_index，判断失败的消息下次仍会重新判断。
+    """
+    async def detect(frame: TargetFrame):
+        context = contexts[frame.target]
+        if context.chat_monitor.check_updates(frame.screenshot):
+            LOGGER.info(f"New chat message detected for {frame.target} in rows "
+                        f"{context.chat_monitor.changed_tiles}")
+            context.scheduler.submit(context.chat_monitor.changed_tiles)
+            if on_change is not None:
+                on_change(frame.target)
+        return context.scheduler.poll()
+
+    async def capture_details(work):
+        started = time.monotonic()
+        screenshot_chat = await contexts[work.target].screenshot_service.capture_details()
+        if not screenshot_chat:
+            return None
+        return ChatMessage(screenshot_chat, created=started, target=work.target)
+
+    async def extract_text(message: ChatMessage):
+        message.text, message.record_id = await ocr_processor.extract_async(
+            message.screenshot, stream=message.target
+        )
+        if dedup_index is not None and message.text and await asyncio.to_thread(dedup_index.seen, message.text):
+            LOGGER.info(f"Skipping duplicate chat record for {message.target}")
+            return None
+        return message
+
+    async def classify(message: ChatMessage):
+        message.verdict = await analysis_service.judge_text(message.text)
+        message.result = analysis_service.should_alert(message.verdict)
+        if message.result:
+            LOGGER.info(f"AI recommends Python for {message.target} (confidence {message.verdict.confidence:.2f})")
+        return message
+
+    def alert(message: ChatMessage):
+        ocr_processor.record_judgment(message.verdict, message.record_id)
+        if dedup_index is not None and message.verdict is not None:
+            # alert 在线程中执行，SQLite 写入不阻塞事件循环
+            dedup_index.record(message.text)
+        if message.result:
+            # 与详情截图内容相同，配置了 ImageStore 时以硬链接引用
+            contexts[message.target].screenshot_service.image_processor.save_image(
+                message.screenshot, CONFIG.snapshot.paths.judgments
+            )
+            alert_service.notify(message.target, message.text,
+                                 message.verdict.confidence if message.verdict is not None else None)
+        if on_complete is not None:
+            on_complete(message)
+
+    options = CONFIG.get("pipeline") or {}
+    # detect 队列长度按目标配置，每轮轮询每个目标各提交一帧
+    detect_options = dict(options.get("detect") or {})
+    detect_options["queue_size"] = detect_options.get("queue_size", 2) * len(contexts)
+    return Pipeline([
+        build_stage("detect", detect, detect_options, policy=DROP_OLDEST, fair=True),
+        build_stage("details", capture_details, options.get("details"), queue_size=4, policy=BLOCK, fair=True),
+        build_stage("ocr", extract_text, options.get("ocr"), queue_size=4, policy=BLOCK, fair=True),
+        build_stage("classify", classify, options.get("classify"), workers=4, queue_size=16, policy=BLOCK,
+                    fair=True),
+        build_stage("alert", alert, options.get("alert"), queue_size=16, policy=BLOCK),
+    ])
+
+def create_trigger(contexts: Dict[str, TargetContext]) -> ChangeTrigger:
+    """按 trigger 配置创建自适应轮询与窗口事件触发"""
+    options = CONFIG.snapshot.trigger
+    poller = AdaptivePoller(
+        min_interval=options.min_interval,
+        max_interval=options.max_interval,
+        backoff=options.backoff,
+        idle_after=options.idle_after,
+    )
+    hwnds = []
+    for context in contexts.values():
+        info = context.screenshot_service.session.window_info
+        if info:
+            hwnds.append(info["hwnd"])
+    sources = create_trigger_sources(options.events, hwnds)
+    return ChangeTrigger(poller, sources, debounce=options.debounce, max_event_wakeups=options.max_event_wakeups,
+                         fallback_max_interval=options.fallback_max_interval)
+
+async def warm_up(step: str, awaitable) -> None:
+    """等待一项后台预热完成并记录到启动耗时；失败只记录日志，首次使用时会再次报错"""
+    try:
+        await awaitable
+        STARTUP.mark(f"{step} ready")
+    except Exception as e:
+        LOGGER.error(f"Warm-up of {step} failed: {e}")
+
+async def monitor_chat(profile_startup: bool = False):
+    """主监控循环：截图轮询 -> 变化检测 -> 详情截图 -> OCR -> AI判断 -> 提示/保存
+
+    startup.warm_start 时OCR模型、OCR进程池与AI客户端在后台预热，截图与变化检测立即开始；
+    profile_startup 时在首帧之后、预热全部完成时输出各步骤耗时。
+    config_reload.enabled 时监视配置文件，修改后的阈值、聊天框、调度与提示词等在两轮截图之间生效。
+    """
+    loop = asyncio.get_running_loop()
+    metrics = CONFIG.get("metrics") or {}
+    if metrics.get("enabled", False):
+        METRICS.configure(enabled=True)
+        if metrics.get("port"):
+            METRICS.start_server(metrics["port"], metrics.get("host", "127.0.0.1"))
+    warm_start = CONFIG.get("startup.warm_start", True)
+    warm_tasks = []
+
+    def in_background(step: str, awaitable) -> None:
+        warm_tasks.append(asyncio.ensure_future(warm_up(step, awaitable)))
+
+    STARTUP.mark("config")
+    window_manager = create_window_manager()
+    image_store = create_image_store(**(CONFIG.get("images") or {}))
+    image_processor = ImageProcessor(image_store)
+    STARTUP.mark("window manager and image store")
+    result_store = create_result_store(CONFIG.get("paths.ocr_results"), **(CONFIG.get("storage") or {}))
+    base_analyzer, ai_analyzer = create_analyzer(result_store)
+    STARTUP.mark("analyzer and result store")
+    use_angle_cls = CONFIG.get("ocr.use_angle_cls", False)
+    preprocessor = Preprocessor.from_config(CONFIG.get("ocr.preprocess"))
+    ocr_pool = None
+    if CONFIG.get("ocr.pool.workers", 0):
+        ocr_pool = OCRPool(
+            workers=CONFIG.get("ocr.pool.workers"),
+            batch_size=CONFIG.get("ocr.pool.batch_size", 4),
+            max_wait=CONFIG.get("ocr.pool.max_wait", 0.05),
+            use_angle_cls=use_angle_cls,
+            preprocessor=preprocessor,
+        )
+        if warm_start:
+            in_background("ocr pool", loop.run_in_executor(None, ocr_pool.warm_up))
+        else:
+            ocr_pool.warm_up()
+    ocr_processor = OCRProcessor(
+        CONFIG.get("paths.ocr_results"), store=result_store,
+        incremental=CONFIG.get("ocr.incremental", False), pool=ocr_pool, warm_start=warm_start,
+        use_angle_cls=use_angle_cls, preprocessor=preprocessor,
+    )
+    if isinstance(ocr_processor.ocr, LazyEngine):
+        in_background("ocr engine", loop.run_in_executor(None, ocr_processor.ocr.get))
+    if warm_start:
+        in_background("ai client", base_analyzer.warm_up())
+    if isinstance(ai_analyzer, PrefilterAnalyzer) and ai_analyzer.model_loader is not None:
+        in_background("prefilter model", ai_analyzer.load_model())
+    STARTUP.mark("ocr processor")
+    contexts = create_target_contexts(window_manager, image_processor, list(CONFIG.snapshot.targets))
+    LOGGER.info(f"Monitoring {len(contexts)} target(s): {', '.join(contexts)}")
     analysis_service = AnalysisService(ai_analyzer, image_processor)
-    alert_service = AlertService()
+    alert_service = create_alert_service(**(CONFIG.get("alerts") or {}))
+    dedup_index = None
+    if CONFIG.get("dedup.enabled", False):
+        dedup_index = DedupIndex(
+            threshold=CONFIG.get("dedup.threshold", 0.6),
+            num_perm=CONFIG.get("dedup.num_perm", 64),
+            bands=CONFIG.get("dedup.bands", 16),
+            max_entries=CONFIG.get("dedup.max_entries", 5000),
+            ttl=CONFIG.get("dedup.ttl", 604800),
+            db_path=CONFIG.get("dedup.db_path") or None,
+        )
 
-    loop = asyncio.get_event_loop()
-    with ThreadPoolExecutor() as pool:
+    trigger = create_trigger(contexts)
+    pipeline = build_pipeline(contexts, ocr_processor, analysis_service, alert_service,
+                              on_change=lambda target: trigger.activity(), dedup_index=dedup_index)
+    pipeline.start()
+    trigger.start()
+    STARTUP.mark("pipeline started")
+
+    config_updates = []
+
+    def on_config_change(old: Settings, new: Settings, changed) -> None:
+        # 在配置监视线程中调用：交给主循环在两轮截图之间应用，并提前唤醒
+        loop.call_soon_threadsafe(config_updates.append, (old, new))
+        trigger.wake()
+
+    CONFIG.subscribe(on_config_change)
+    if CONFIG.get("config_reload.enabled", False):
+        CONFIG.watch(CONFIG.get("config_reload.interval", 1.0))
+
+    first_frame = True
+    stats_interval = (CONFIG.get("pipeline") or {}).get("stats_interval", 60)
+    summary_interval = metrics.get("summary_interval", 60)
+    last_stats = last_summary = time.monotonic()
+    try:
         while True:
-            try:
-                screenshot = screenshot_service.capture_chat_region()
-                if chat_monitor.check_updates(screenshot):
-                    LOGGER.info("New chat message detected")
-                    screenshot_chat = screenshot_service.capture_details()
-                    if screenshot_chat:
-                        chat_text = ocr_processor.extract_text(screenshot_chat)
-                        result = await loop.run_in_executor(
-                            pool, lambda: asyncio.run(analysis_service.analyze_text(chat_text))
-                        )
-                        if result:
-                            save_image(screenshot_chat, CONFIG.get("paths.judgments"))
-                            alert_service.play_alert()
-                await asyncio.sleep(CONFIG.get("app.polling_interval"))
-            except Exception as e:
-                LOGGER.error(f"Error in monitor loop: {e}")
-                await asyncio.sleep(CONFIG.get("app.polling_interval"))
-
-def start_monitor():
+            if config_updates:
+                old, new = config_updates[0][0], config_updates[-1][1]
+                config_updates.clear()
+                try:
+                    apply_settings(contexts, analysis_service, trigger, old, new)
+                except Exception as e:
+                    # 回滚到旧快照：订阅回调会把 (new, old) 放回队列，下一轮把组件恢复为旧配置
+                    LOGGER.error(f"Failed to apply updated settings, keeping previous settings: {e}")
+                    CONFIG.apply(old.raw)
+            for name, context in contexts.items():
+                try:
+                    screenshot = await loop.run_in_executor(None, context.screenshot_service.capture_chat_region)
+                    if screenshot is not None:
+                        await pipeline.submit(TargetFrame(name, screenshot))
+                        if first_frame:
+                            first_frame = False
+                            STARTUP.mark("first frame")
+                            if profile_startup:
+                                warm_tasks.append(asyncio.ensure_future(report_startup(list(warm_tasks))))
+                except Exception as e:
+                    LOGGER.error(f"Error in monitor loop for {name}: {e}")
+            if isinstance(window_manager, ReplayWindowManager) and window_manager.exhausted:
+                await pipeline.join()
+                LOGGER.info(f"Replay finished. Pipeline stats: {pipeline.format_stats()}")
+                break
+            if time.monotonic() - last_stats >= stats_interval:
+                schedulers = "; ".join(f"{name}: {c.scheduler.format_stats()}" for name, c in contexts.items())
+                LOGGER.info(f"Pipeline stats: {pipeline.format_stats()}; schedulers: {schedulers}; "
+                            f"verdicts: {analysis_service.stats()}"
+                            + (f"; dedup: {dedup_index.stats()}" if dedup_index is not None else ""))
+                last_stats = time.monotonic()
+            if METRICS.enabled and time.monotonic() - last_summary >= summary_interval:
+                LOGGER.info(f"Metrics: {METRICS.format_summary()}")
+                last_summary = time.monotonic()
+            # 自适应间隔或外部事件唤醒；有待处理的突发时提前唤醒，保证处理延迟有上界
+            due = [r for r in (c.scheduler.time_until_due() for c in contexts.values()) if r is not None]
+            await trigger.wait(min(due) if due else None)
+    finally:
+        CONFIG.stop_watching()
+        CONFIG.unsubscribe(on_config_change)
+        for task in warm_tasks:
+            task.cancel()
+        trigger.stop()
+        await pipeline.stop()
+        await ai_analyzer.aclose()
+        if ocr_pool is not None:
+            ocr_pool.close()
+        for context in contexts.values():
+            context.screenshot_service.close()
+        alert_service.close()
+        result_store.close()
+        image_store.close()
+        if dedup_index is not None:
+            dedup_index.close()
+        if isinstance(window_manager, RecordingWindowManager):
+            window_manager.close()
+        METRICS.stop_server()
+
+async def report_startup(warm_tasks) -> None:
+    """预热全部完成后输出启动耗时"""
+    await asyncio.gather(*warm_tasks, return_exceptions=True)
+    STARTUP.log_report()
+
+def start_monitor(profile_startup: bool = False):
     """启动监控"""
     try:
-        asyncio.run(monitor_chat())
+        asyncio.run(monitor_chat(profile_startup))
     except KeyboardInterrupt:
         LOGGER.info("Monitoring stopped by user")
 
-LOGGER.info("New chat message detected")
 if __name__ == "__main__":
-    start_monitor()
\ No newline at end of file
+    setup_logger()
+    parser = argparse.ArgumentParser(description="Weixin chat monitor")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="log import, initialization and warm-up timings once the first frame is captured")
+    start_monitor(profile_startup=parser.parse_args().profile_startup)
\ No newline at end of file
@@ -0,0 +1,87 @@
+# 离线批量重处理入口：修改提示词或预处理后，对 paths.screenshots 等目录中已保存的截图重新OCR与判断
+# 用法: python src/reprocess.py [folder] [--output DIR] [--workers N] [--no-classify] [--restart] [--limit N]
+
+import argparse
+import asyncio
+import itertools
+import os
+from core.image_processor import ImageProcessor
+from core.ocr_pool import OCRPool
+from core.ocr_processor import OCRProcessor
+from core.preprocess import Preprocessor
+from core.result_store import create_result_store
+from services.analysis_service import AnalysisService, create_analyzer
+from services.reprocess_service import IMAGE_PATTERNS, BatchReprocessor, Checkpoint, iter_images
+from config.config import CONFIG
+from utils.logger import LOGGER, setup_logger
+from utils.metrics import METRICS
+
+
+async def reprocess(folder: str, output_dir: str, workers: int, classify: bool = True, restart: bool = False,
+                    limit: int = 0) -> dict:
+    """重新处理 folder 下的截图，结果写入 output_dir 中的结果存储；按检查点跳过已处理的文件"""
+    options = CONFIG.get("reprocess") or {}
+    batch_size = options.get("batch_size", 4)
+    checkpoint = Checkpoint(options.get("checkpoint") or os.path.join(output_dir, "checkpoint.txt"), reset=restart)
+    result_store = create_result_store(output_dir, **(CONFIG.get("storage") or {}))
+    use_angle_cls = CONFIG.get("ocr.use_angle_cls", False)
+    preprocessor = Preprocessor.from_config(CONFIG.get("ocr.preprocess"))
+    pool = None
+    if workers:
+        pool = OCRPool(workers=workers, batch_size=batch_size, use_angle_cls=use_angle_cls,
+                       preprocessor=preprocessor)
+        await asyncio.get_running_loop().run_in_executor(None, pool.warm_up)
+    processor = OCRProcessor(output_dir, store=result_store, pool=pool, use_angle_cls=use_angle_cls,
+                             preprocessor=preprocessor)
+    analyzer = None
+    analysis_service = None
+    if classify:
+        _, analyzer = create_analyzer(result_store)
+        analysis_service = AnalysisService(analyzer, ImageProcessor())
+    reprocessor = BatchReprocessor(processor, checkpoint, folder, analysis_service, batch_size=batch_size,
+                                   progress_interval=options.get("progress_interval", 10))
+
+    def images():
+        paths = iter_images(folder, options.get("patterns") or IMAGE_PATTERNS)
+        return itertools.islice(paths, limit) if limit else paths
+
+    total = sum(1 for path in images() if reprocessor.name(path) not in checkpoint)
+    LOGGER.info(f"Reprocessing {total} images from {folder} into {output_dir} "
+                f"({workers or 'no'} OCR workers, classify={classify})")
+    try:
+        return await reprocessor.run(images(), total)
+    finally:
+        if analyzer is not None:
+            await analyzer.aclose()
+        if pool is not None:
+            pool.close()
+        checkpoint.close()
+        result_store.close()
+        if METRICS.enabled:
+            LOGGER.info(f"Metrics: {METRICS.format_summary()}")
+
+
+if __name__ == "__main__":
+    setup_logger()
+    parser = argparse.ArgumentParser(description="Re-run OCR and classification over saved screenshots")
+    parser.add_argument("folder", nargs="?", help="image folder (default: paths.screenshots)")
+    parser.add_argument("--output", help="result store directory (default: reprocess.output_dir)")
+    parser.add_argument("--workers", type=int, help="OCR worker processes, 0 runs OCR in this process "
+                                                    "(default: reprocess.workers)")
+    parser.add_argument("--no-classify", action="store_true", help="only OCR, skip the AI judgment")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and process every image")
+    parser.add_argument("--limit", type=int, default=0, help="process at most N images (0: all)")
+    args = parser.parse_args()
+    options = CONFIG.get("reprocess") or {}
+    METRICS.configure(enabled=CONFIG.get("metrics.enabled", False))
+    try:
+        asyncio.run(reprocess(
+            args.folder or CONFIG.snapshot.paths.screenshots,
+            args.output or options.get("output_dir", "./logs/reprocess"),
+            options.get("workers", 2) if args.workers is None else args.workers,
+            classify=not args.no_classify and options.get("classify", True),
+            restart=args.restart,
+            limit=args.limit,
+        ))
+    except KeyboardInterrupt:
+        LOGGER.info("Reprocessing interrupted; rerun to resume from the checkpoint")
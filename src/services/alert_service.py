@@ -1,15 +1,286 @@
-# 提示服务
+# 提示服务：后台线程预加载提示通道，限速合并后投递
 
+import json
+import queue
+import threading
+import time
+import urllib.request
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, replace
+from typing import List, Optional
 from utils.logger import LOGGER
+from utils.metrics import METRICS
+
+
+@dataclass
+class Alert:
+    """一次提示；count 为合并的提示条数，queued 为最早一条入队的时间（time.monotonic）"""
+    target: str = ""
+    text: str = ""
+    confidence: Optional[float] = None
+    count: int = 1
+    queued: float = field(default_factory=time.monotonic)
+
+    def summary(self, limit: int = 200) -> str:
+        text = " ".join((self.text or "").split())
+        prefix = f"[{self.target}] " if self.target else ""
+        suffix = f" (+{self.count - 1} more)" if self.count > 1 else ""
+        return (prefix + text)[:limit] + suffix
+
+
+class AlertSink(ABC):
+    """提示通道：open() 在后台线程中执行一次（加载资源），deliver() 投递一次提示"""
+    name = "sink"
+
+    def open(self) -> None:
+        pass
+
+    @abstractmethod
+    def deliver(self, alert: Alert) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class SoundSink(AlertSink):
+    """播放提示音：mixer 只初始化一次、音频只解码一次；在固定声道上播放，新的提示打断而不是叠加"""
+    name = "sound"
+
+    def __init__(self, path: str = "alert.wav"):
+        self.path = path
+        self._mixer = None
+        self._sound = None
+        self._channel = None
+
+    def open(self) -> None:
+        from pygame import mixer
+        mixer.init()
+        self._mixer = mixer
+        self._sound = mixer.Sound(self.path)
+        self._channel = mixer.Channel(0)
+
+    def deliver(self, alert: Alert) -> None:
+        self._channel.play(self._sound)
+
+    def close(self) -> None:
+        if self._mixer is not None:
+            self._mixer.quit()
+            self._mixer = None
+
+
+class DesktopSink(AlertSink):
+    """Windows 通知区域的气泡提示（pywin32）"""
+    name = "desktop"
+    _MESSAGE = 0x0400 + 20  # WM_USER + 20
+
+    def __init__(self, title: str = "Weixin Monitor"):
+        self.title = title
+        self._hwnd = None
+        self._icon = None
+
+    def open(self) -> None:
+        import win32api
+        import win32con
+        import win32gui
+        window_class = win32gui.WNDCLASS()
+        window_class.hInstance = win32api.GetModuleHandle(None)
+        window_class.lpszClassName = "WeixinMonitorAlert"
+        window_class.lpfnWndProc = {}
+        try:
+            atom = win32gui.RegisterClass(window_class)
+        except win32gui.error:  # 已注册（重复创建）
+            atom = window_class.lpszClassName
+        self._hwnd = win32gui.CreateWindow(atom, self.title, 0, 0, 0, 0, 0, 0, 0, window_class.hInstance, None)
+        self._icon = win32gui.LoadIcon(0, win32con.IDI_INFORMATION)
+        win32gui.Shell_NotifyIcon(win32gui.NIM_ADD, (self._hwnd, 0, win32gui.NIF_ICON | win32gui.NIF_TIP,
+                                                     self._MESSAGE, self._icon, self.title))
+
+    def deliver(self, alert: Alert) -> None:
+        import win32gui
+        win32gui.Shell_NotifyIcon(win32gui.NIM_MODIFY, (self._hwnd, 0, win32gui.NIF_INFO, self._MESSAGE, self._icon,
+                                                        self.title, alert.summary(250), 200, self.title[:63]))
+
+    def close(self) -> None:
+        if self._hwnd is not None:
+            import win32gui
+            win32gui.Shell_NotifyIcon(win32gui.NIM_DELETE, (self._hwnd, 0))
+            win32gui.DestroyWindow(self._hwnd)
+            self._hwnd = None
+
+
+class WebhookSink(AlertSink):
+    """以 JSON POST 到 url（如本地的通知转发服务）"""
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 2.0):
+        self.url = url
+        self.timeout = timeout
+
+    def deliver(self, alert: Alert) -> None:
+        body = json.dumps({
+            "target": alert.target,
+            "text": alert.text,
+            "confidence": alert.confidence,
+            "count": alert.count,
+            "summary": alert.summary(),
+        }, ensure_ascii=False).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class NullSink(AlertSink):
+    """只记录投递的提示及投递时间（time.monotonic），用于测试与基准"""
+    name = "null"
+
+    def __init__(self):
+        self.delivered: List[tuple] = []
+
+    def deliver(self, alert: Alert) -> None:
+        self.delivered.append((alert, time.monotonic()))
+
+
+SINKS = {"sound": SoundSink, "desktop": DesktopSink, "webhook": WebhookSink, "null": NullSink}
+
 
 class AlertService:
-    def play_alert(self):
-        """播放提示音"""
+    """提示服务。
+
+    各通道在后台线程中打开（提示音只加载一次），notify() 只入队、立即返回；
+    两次投递至少间隔 min_interval 秒，间隔内到达的提示合并为一次投递。队列满时丢弃新的提示。
+    """
+
+    def __init__(self, sinks: Optional[List[AlertSink]] = None, min_interval: float = 1.0, queue_size: int = 256):
+        self.sinks = list(sinks) if sinks is not None else [SoundSink()]
+        self.min_interval = min_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+        self._ready = threading.Event()
+        self._closing = threading.Event()
+        self.received = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="alert-worker", daemon=True)
+        self._thread.start()
+
+    def notify(self, target: str = "", text: str = "", confidence: Optional[float] = None) -> bool:
+        """提交一次提示，不等待投递；队列已满时返回 False"""
         try:
-            from pygame import mixer
-            mixer.init()
-            # 使用系统默认提示音或自定义音效
-            mixer.Sound("alert.wav").play()  # 需要提供alert.wav文件
-            LOGGER.info("Played alert sound")
-        except Exception as e:
-            LOGGER.error(f"Failed to play alert: {e}")
\ No newline at end of file
+            self._queue.put_nowait(Alert(target, text or "", confidence))
+        except queue.Full:
+            self.dropped += 1
+            METRICS.inc("alerts_dropped")
+            return False
+        self.received += 1
+        return True
+
+    def play_alert(self):
+        """播放提示（不带消息内容）"""
+        self.notify()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """等待各通道打开完成"""
+        return self._ready.wait(timeout)
+
+    def flush(self) -> None:
+        """等待已提交的提示全部投递"""
+        self._queue.join()
+
+    def _open_sinks(self) -> None:
+        opened = []
+        for sink in self.sinks:
+            start = time.perf_counter()
+            try:
+                sink.open()
+            except Exception as e:
+                LOGGER.error(f"Failed to open alert sink {sink.name}: {e}")
+                METRICS.inc("errors", operation="alert")
+                continue
+            opened.append(sink)
+            LOGGER.info(f"Alert sink {sink.name} ready in {(time.perf_counter() - start) * 1000:.0f}ms")
+        self.sinks = opened
+        self._ready.set()
+
+    def _run(self) -> None:
+        self._open_sinks()
+        last_delivery = None
+        stop = False
+        while not stop:
+            pending = [self._queue.get()]
+            if pending[0] is None:
+                self._queue.task_done()
+                break
+            if last_delivery is not None:
+                self._closing.wait(last_delivery + self.min_interval - time.monotonic())
+            # 等待期间到达的提示合并为一次
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    self._queue.task_done()
+                    break
+                pending.append(item)
+            try:
+                self._deliver(pending)
+            finally:
+                last_delivery = time.monotonic()
+                for _ in pending:
+                    self._queue.task_done()
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                LOGGER.error(f"Failed to close alert sink {sink.name}: {e}")
+
+    def _deliver(self, pending: List[Alert]) -> None:
+        latest = pending[-1]
+        alert = replace(
+            latest,
+            target=", ".join(dict.fromkeys(a.target for a in pending if a.target)),
+            confidence=max((a.confidence for a in pending if a.confidence is not None), default=None),
+            count=sum(a.count for a in pending),
+            queued=min(a.queued for a in pending),
+        )
+        for sink in self.sinks:
+            try:
+                sink.deliver(alert)
+            except Exception as e:
+                LOGGER.error(f"Failed to deliver alert via {sink.name}: {e}")
+                METRICS.inc("errors", operation="alert")
+                continue
+            METRICS.observe("alert_delivery", time.monotonic() - alert.queued, sink=sink.name)
+            METRICS.inc("alerts_delivered", sink=sink.name)
+        self.delivered += 1
+        if alert.count > 1:
+            self.coalesced += alert.count - 1
+            METRICS.inc("alerts_coalesced", alert.count - 1)
+        LOGGER.info(f"Delivered alert ({alert.count} coalesced) after "
+                    f"{(time.monotonic() - alert.queued) * 1000:.0f}ms: {alert.summary(80)}")
+
+    def stats(self) -> dict:
+        return {"received": self.received, "delivered": self.delivered, "coalesced": self.coalesced,
+                "dropped": self.dropped}
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._closing.set()
+            self._queue.put(None)
+            self._thread.join()
+        LOGGER.info(f"Alert service closed: {self.stats()}")
+
+
+def create_alert_service(min_interval: float = 1.0, queue_size: int = 256,
+                         sinks: Optional[List[dict]] = None) -> AlertService:
+    """按 alerts 配置创建提示服务；sinks 为 [{"type": "sound", "path": ...}, ...]"""
+    created = []
+    for spec in sinks if sinks is not None else [{"type": "sound"}]:
+        options = dict(spec)
+        kind = options.pop("type")
+        if kind not in SINKS:
+            raise ValueError(f"Unknown alert sink: {kind} (expected one of {tuple(SINKS)})")
+        created.append(SINKS[kind](**options))
+    return AlertService(created, min_interval=min_interval, queue_size=queue_size)
@@ -1,18 +1,45 @@
 # 分析服务
 
-from typing import Optional
-from core.ai_analyzer import AIAnalyzer
+import asyncio
+from typing import Optional, Tuple, Union
+from core.ai_analyzer import AIAnalyzer, AsyncAIAnalyzer, AsyncDashscopeAnalyzer
+from core.batch_analyzer import BatchingAnalyzer
 from core.image_processor import ImageProcessor
+from core.prefilter import KeywordRules, PrefilterAnalyzer, load_or_train_model
+from core.verdict import LABELS, Verdict, parse_verdict
+from core.verdict_cache import CachingAnalyzer, VerdictCache
 from config.config import CONFIG
+from config.settings import AISettings
 from utils.logger import LOGGER
+from utils.metrics import METRICS, timed
 from utils.file_utils import copy_image
 
 class AnalysisService:
-    def __init__(self, ai_analyzer: AIAnalyzer, image_processor: ImageProcessor):
+    def __init__(self, ai_analyzer: Union[AIAnalyzer, AsyncAIAnalyzer], image_processor: ImageProcessor):
         self.ai_analyzer = ai_analyzer
         self.image_processor = image_processor
-        self.prompt = CONFIG.get("ai.prompt")
-        self.judgment_folder = CONFIG.get("paths.judgments")
+        self.apply_settings(CONFIG.snapshot.ai)
+        self.labels = {label: 0 for label in LABELS}
+        self.parse_failures = 0
+
+    def apply_settings(self, settings: AISettings) -> None:
+        """使用新的提示词、返回格式与提示阈值（热加载）；正在进行的请求仍使用旧的提示词"""
+        self.prompt = settings.prompt
+        # 判为 yes 且置信度不低于该值时才提示
+        self.threshold = settings.alert_threshold
+        # prompt 是否带 JSON 格式要求随 structured 变化，沿包装链把它同步到发请求的底层分析器
+        analyzer = self.ai_analyzer
+        while analyzer is not None:
+            if hasattr(analyzer, "structured"):
+                analyzer.structured = settings.structured
+            analyzer = getattr(analyzer, "analyzer", None)
+
+    async def _call_analyzer(self, method: str, *args) -> Optional[str]:
+        """调用分析器：异步实现直接await，同步实现放到线程中执行，避免阻塞事件循环"""
+        func = getattr(self.ai_analyzer, method)
+        if isinstance(self.ai_analyzer, AsyncAIAnalyzer):
+            return await func(*args)
+        return await asyncio.to_thread(func, *args)
 
     async def analyze_image(self, image_path: str) -> bool:
         """分析图像并处理结果，返回是否需要保存"""
@@ -22,20 +49,97 @@ class AnalysisService:
         if not base64_image:
             return False
 
-        result = self.ai_analyzer.analyze_image(base64_image, self.prompt)
-        if result and "yes" in result.lower():
+        result = await self._call_analyzer("analyze_image", base64_image, self.prompt)
+        if self.should_alert(self._parse(result)):
             LOGGER.info(f"AI recommends Python for {image_path}")
-            copy_image(image_path, self.judgment_folder)
+            copy_image(image_path, CONFIG.snapshot.paths.judgments)
             return True
         return False
     
-    async def analyze_text(self, text: Optional[str]) -> bool:
-        """分析文本并处理结果，返回是否需要保存"""
+    @timed("analyze_text")
+    async def judge_text(self, text: Optional[str]) -> Optional[Verdict]:
+        """分析文本，返回解析后的判断；没有文本或请求失败时返回 None"""
         if not text:
             LOGGER.warning("No text provided for analysis")
-            return False
-        result = self.ai_analyzer.analyze_text(text, self.prompt)
-        if result and "yes" in result.lower():
+            return None
+        return self._parse(await self._call_analyzer("analyze_text", text, self.prompt))
+
+    def _parse(self, result: Optional[str]) -> Optional[Verdict]:
+        """解析模型回复并计数；请求失败 (None) 时返回 None"""
+        if result is None:
+            return None
+        verdict = parse_verdict(result)
+        self.labels[verdict.label] += 1
+        METRICS.inc("verdicts", label=verdict.label)
+        if not verdict.parsed:
+            self.parse_failures += 1
+            METRICS.inc("verdict_parse_failures")
+            LOGGER.warning(f"Could not parse AI verdict: {result!r}")
+        return verdict
+
+    def should_alert(self, verdict: Optional[Verdict]) -> bool:
+        return verdict is not None and verdict.is_positive(self.threshold)
+
+    async def analyze_text(self, text: Optional[str]) -> bool:
+        """分析文本并处理结果，返回是否需要保存"""
+        if self.should_alert(await self.judge_text(text)):
             LOGGER.info(f"AI recommends Python for {text}")
             return True
-        return False
\ No newline at end of file
+        return False
+
+    def stats(self) -> dict:
+        return {**self.labels, "parse_failures": self.parse_failures}
+
+def create_prefilter(analyzer, result_store) -> PrefilterAnalyzer:
+    """按 prefilter 配置在分析器前加本地预分类；配置了 model_path 时在后台加载或训练本地模型"""
+    options = CONFIG.get("prefilter") or {}
+    rules = KeywordRules(options.get("positive_keywords") or [], options.get("negative_patterns") or [])
+    model_loader = None
+    if options.get("model_path"):
+        def model_loader():
+            return load_or_train_model(options["model_path"], result_store.query(),
+                                       min_samples=options.get("min_samples", 200))
+    return PrefilterAnalyzer(
+        analyzer, rules, model_loader=model_loader,
+        min_chars=options.get("min_chars", 4),
+        positive_threshold=options.get("positive_threshold", 2),
+        low=options.get("low", 0.05),
+        high=options.get("high", 0.95),
+        stats_interval=options.get("stats_interval", 300),
+    )
+
+def create_analyzer(result_store) -> Tuple[AsyncDashscopeAnalyzer, AsyncAIAnalyzer]:
+    """按 ai/cache/prefilter 配置组装分析器：批量合并、判断结果缓存与本地预分类。
+
+    返回 (底层 DashScope 客户端, 最外层分析器)；前者用于预热，后者用于判断。
+    """
+    ai_analyzer = AsyncDashscopeAnalyzer(
+        base_url=CONFIG.get("ai.base_url"),
+        text_model=CONFIG.get("ai.model"),
+        max_concurrency=CONFIG.get("ai.max_concurrency", 4),
+        timeout=CONFIG.get("ai.timeout", 15.0),
+        max_retries=CONFIG.get("ai.max_retries", 3),
+        backoff_base=CONFIG.get("ai.backoff_base", 0.5),
+        backoff_max=CONFIG.get("ai.backoff_max", 8.0),
+        max_connections=CONFIG.get("ai.max_connections", 10),
+        max_tokens=CONFIG.get("ai.max_tokens"),
+        structured=CONFIG.get("ai.structured", False),
+    )
+    base_analyzer = ai_analyzer
+    if CONFIG.get("ai.batch.enabled", False):
+        ai_analyzer = BatchingAnalyzer(
+            ai_analyzer,
+            max_batch=CONFIG.get("ai.batch.max_batch", 8),
+            max_wait=CONFIG.get("ai.batch.max_wait", 0.1),
+        )
+    if CONFIG.get("cache.enabled", True):
+        verdict_cache = VerdictCache(
+            max_entries=CONFIG.get("cache.max_entries", 1024),
+            ttl=CONFIG.get("cache.ttl", 86400),
+            db_path=CONFIG.get("cache.db_path") or None,
+            stats_interval=CONFIG.get("cache.stats_interval", 300),
+        )
+        ai_analyzer = CachingAnalyzer(ai_analyzer, verdict_cache)
+    if CONFIG.get("prefilter.enabled", False):
+        ai_analyzer = create_prefilter(ai_analyzer, result_store)
+    return base_analyzer, ai_analyzer
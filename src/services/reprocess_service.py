@@ -0,0 +1,226 @@
+# 离线批量重处理：对已保存的截图重新OCR与判断
+
+import asyncio
+import fnmatch
+import functools
+import os
+import time
+from collections import deque
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+from core.ocr_processor import OCRProcessor
+from services.analysis_service import AnalysisService
+from utils.logger import LOGGER
+from utils.metrics import METRICS
+
+IMAGE_PATTERNS = ("*.png", "*.webp", "*.pgm", "*.ppm", "*.jpg", "*.jpeg", "*.bmp")
+
+
+def iter_images(folder: str, patterns: Sequence[str] = IMAGE_PATTERNS) -> Iterator[str]:
+    """按路径顺序逐个产出 folder（含子目录）下的图像文件，不一次性列出整个归档"""
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            if any(fnmatch.fnmatch(name.lower(), pattern) for pattern in patterns):
+                yield os.path.join(root, name)
+
+
+class Checkpoint:
+    """已处理文件的追加写清单（每行一个相对路径），中断后重新运行时跳过其中的文件"""
+
+    def __init__(self, path: str, reset: bool = False):
+        self.path = path
+        self.done = set()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if reset and os.path.exists(path):
+            os.remove(path)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.done.update(line.rstrip("\n") for line in f if line.strip())
+            LOGGER.info(f"Resuming from checkpoint {path} ({len(self.done)} files done)")
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.done
+
+    def __len__(self) -> int:
+        return len(self.done)
+
+    def mark(self, name: str) -> None:
+        self.done.add(name)
+        self._file.write(name + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class Throughput:
+    """处理速度（最近 window 秒内的条数/秒）与剩余时间估计"""
+
+    def __init__(self, total: int, window: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.total = total
+        self.window = window
+        self.clock = clock
+        self.done = 0
+        self.started = clock()
+        self._samples = deque([(self.started, 0)])
+
+    def update(self, count: int = 1) -> None:
+        self.done += count
+        now = self.clock()
+        self._samples.append((now, self.done))
+        while len(self._samples) > 2 and now - self._samples[1][0] >= self.window:
+            self._samples.popleft()
+
+    @property
+    def rate(self) -> float:
+        (first, start_done), (last, end_done) = self._samples[0], self._samples[-1]
+        return (end_done - start_done) / (last - first) if last > first else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        rate = self.rate
+        return max(0, self.total - self.done) / rate if rate > 0 else None
+
+    def format(self) -> str:
+        percent = self.done / self.total * 100 if self.total else 100.0
+        eta = self.eta
+        eta_text = "--" if eta is None else time.strftime("%H:%M:%S", time.gmtime(eta))
+        return f"{self.done}/{self.total} images ({percent:.1f}%), {self.rate:.2f} images/s, ETA {eta_text}"
+
+
+class BatchReprocessor:
+    """把图像文件分批送入OCR（有进程池时读取、预处理与识别都在工作进程中进行），
+    结果逐条写入结果存储，可选地再经分析服务（含判断结果缓存）判断并写入判断结果。
+
+    每个文件的结果与判断写入后才记入检查点，中断后重新运行不会遗漏文件
+    （中断时正在处理的文件可能重复写入一次）。判断失败（请求出错）或处理出错的文件计入 failed，
+    不记入检查点，下次运行时重试；无法读取的图像计入 failed 并记入检查点。
+    """
+
+    def __init__(self, processor: OCRProcessor, checkpoint: Checkpoint, root: str,
+                 analysis_service: Optional[AnalysisService] = None, batch_size: int = 4,
+                 max_inflight: Optional[int] = None, progress_interval: float = 10.0):
+        self.processor = processor
+        self.checkpoint = checkpoint
+        self.root = root
+        self.analysis_service = analysis_service
+        self.batch_size = max(1, int(batch_size))
+        pool = processor.pool
+        # 进程池时每个进程保持两批在途；主进程内识别时引擎不能并发调用
+        self.max_inflight = max_inflight or (pool.workers * 2 if pool is not None else 1)
+        self.progress_interval = progress_interval
+        self.meter: Optional[Throughput] = None
+        self.skipped = 0
+        self.failed = 0
+        self.positive = 0
+        self._last_report = 0.0
+
+    def name(self, path: str) -> str:
+        """检查点与结果记录中使用的文件名：相对于 root 的路径"""
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def _pending(self, paths: Iterable[str]) -> Iterator[List[str]]:
+        batch = []
+        for path in paths:
+            if self.name(path) in self.checkpoint:
+                self.skipped += 1
+                continue
+            batch.append(path)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def run(self, paths: Iterable[str], total: int) -> dict:
+        """处理 paths 中未记入检查点的文件；total 为待处理文件数（用于估计剩余时间）"""
+        self.meter = Throughput(total)
+        self._last_report = time.monotonic()
+        slots = asyncio.Semaphore(self.max_inflight)
+        tasks = set()
+
+        def done(task: asyncio.Task, batch: List[str]) -> None:
+            slots.release()
+            tasks.discard(task)
+            # 已完成的任务不再被 gather 等待，异常在这里取出并计入失败，否则会被丢弃
+            if not task.cancelled() and task.exception() is not None:
+                LOGGER.error(f"Reprocessing failed for batch starting at {batch[0]}: {task.exception()}")
+                METRICS.inc("errors", operation="reprocess")
+                self.failed += len(batch)
+
+        for batch in self._pending(paths):
+            await slots.acquire()
+            task = asyncio.ensure_future(self._process_batch(batch))
+            tasks.add(task)
+            task.add_done_callback(functools.partial(done, batch=batch))
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        LOGGER.info(f"Reprocessing finished: {self.meter.format()}; {self.stats()}")
+        return self.stats()
+
+    async def _recognize(self, batch: List[str]) -> List[Optional[str]]:
+        if self.processor.pool is not None:
+            results = await self.processor.pool.submit_files(batch)
+            return [None if lines is None else "\n".join(lines) for lines in results]
+        return await asyncio.to_thread(lambda: [self.processor.recognize_file(path) for path in batch])
+
+    async def _process_batch(self, batch: List[str]) -> None:
+        try:
+            texts = await self._recognize(batch)
+        except Exception as e:
+            # 不记入检查点，下次运行时重试
+            LOGGER.error(f"OCR failed for batch starting at {batch[0]}: {e}")
+            METRICS.inc("errors", operation="ocr")
+            self.failed += len(batch)
+            return
+        await asyncio.gather(*(self._finish(path, text) for path, text in zip(batch, texts)))
+        self._maybe_report()
+
+    async def _finish(self, path: str, text: Optional[str]) -> None:
+        name = self.name(path)
+        done = True
+        if text is None:
+            LOGGER.warning(f"Could not read image {path}")
+            self.failed += 1
+        else:
+            try:
+                done = await self._store_and_judge(path, name, text)
+            except Exception as e:
+                LOGGER.error(f"Failed to store or judge {path}: {e}")
+                METRICS.inc("errors", operation="reprocess")
+                done = False
+            if not done:
+                self.failed += 1
+        if done:
+            self.checkpoint.mark(name)
+        self.meter.update()
+        METRICS.inc("reprocessed")
+
+    async def _store_and_judge(self, path: str, name: str, text: str) -> bool:
+        """写入结果并判断；判断失败时返回 False"""
+        text, record_id = await asyncio.to_thread(self.processor.store_result, name, text,
+                                                  os.path.getmtime(path))
+        if self.analysis_service is None or not text:
+            return True
+        verdict = await self.analysis_service.judge_text(text)
+        if verdict is None:
+            return False
+        result = self.analysis_service.should_alert(verdict)
+        self.positive += result
+        self.processor.record_judgment(verdict, record_id)
+        return True
+
+    def _maybe_report(self) -> None:
+        now = time.monotonic()
+        if now - self._last_report >= self.progress_interval:
+            self._last_report = now
+            LOGGER.info(f"Reprocessing: {self.meter.format()}")
+
+    def stats(self) -> dict:
+        return {
+            "processed": self.meter.done if self.meter else 0,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "positive": self.positive,
+        }
@@ -1,23 +1,34 @@
-from PIL import Image
 from typing import Optional
+from core.frame import Frame
+from core.targets import MonitorTarget
 from core.window_manager import WindowManager
 from core.image_processor import ImageProcessor
 from config.config import CONFIG
 from utils.logger import LOGGER
+from utils.metrics import METRICS, timed
 
-import time
+import asyncio
+import functools
 
 class ScreenshotService:
-    def __init__(self, window_manager: WindowManager, image_processor: ImageProcessor):
+    def __init__(self, window_manager: WindowManager, image_processor: ImageProcessor,
+                 target: Optional[MonitorTarget] = None):
+        """每个监控目标一个实例；未指定 target 时使用配置中的第一个目标"""
         self.window_manager = window_manager
         self.image_processor = image_processor
-        self.window_title = CONFIG.get("app.window_title")
-        self.details_title = CONFIG.get("app.details_window_title")
-        self.chat_box = CONFIG.get("chat_box")
+        self.target = target or CONFIG.snapshot.targets[0]
+        self.window_title = self.target.window_title
+        self.details_title = self.target.details_window_title
+        self.chat_box = self.target.chat_box
+        # 主窗口截图会话：缓存窗口句柄并复用截图资源
+        self.session = window_manager.open_session(self.window_title)
+        # 同一目标的详情窗口交互不能交错
+        self._details_lock = asyncio.Lock()
 
-    def capture_chat_region(self) -> Optional[Image.Image]:
-        """截取聊天框区域"""
-        window_info = self.window_manager.find_window(self.window_title)
+    @timed("capture_chat_region")
+    def capture_chat_region(self) -> Optional[Frame]:
+        """截取聊天框区域（帧缓冲区在下次截图时复用）"""
+        window_info = self.session.window_info
         if not window_info:
             return None
         region = (
@@ -26,55 +37,108 @@ class ScreenshotService:
             self.chat_box["width"],
             self.chat_box["height"]
         )
-        screenshot = self.window_manager.capture_screenshot(window_info["hwnd"], region)
-        return screenshot
+        return self.session.capture(region)
 
-    def capture_details(self) -> Optional[Image.Image]:
-        """Capture details window and return the screenshot image."""
-        window_info = self.window_manager.find_window(self.window_title)
-        if not window_info:
-            LOGGER.error("Main window not found")
-            return None
+    def apply_target(self, target: MonitorTarget) -> None:
+        """热加载：换用新的聊天框位置与窗口标题，主窗口标题变化时重新打开截图会话"""
+        if target.window_title != self.window_title:
+            self.session.close()
+            self.session = self.window_manager.open_session(target.window_title)
+            self.window_title = target.window_title
+        self.target = target
+        self.details_title = target.details_window_title
+        self.chat_box = target.chat_box
 
-        # Calculate center of chat box region for clicking
-        click_x = self.chat_box["x"] + self.chat_box["width"] // 2
-        click_y = window_info["height"] + self.chat_box["y_offset"] + self.chat_box["height"] // 2
-        self.window_manager.simulate_click(window_info["hwnd"], click_x, click_y)
+    def close(self) -> None:
+        self.session.close()
 
-        # Wait for details window to appear
-        time.sleep(0.5)
-        details_info = self.window_manager.find_window(self.details_title)
-        if not details_info:
-            LOGGER.error("Details window not found")
-            return None
+    @timed("capture_details")
+    async def capture_details(self) -> Optional[Frame]:
+        """Open the details window, capture it and close it again.
 
-        # Capture screenshot of details window
-        screenshot: Image.Image = self.window_manager.capture_screenshot(details_info["hwnd"])
-        if not screenshot:
-            LOGGER.error("Failed to capture details screenshot")
-            return None
+        Waits only as long as the UI needs: the details window is polled until it
+        appears/disappears, clicks are retried up to details_window.retries times,
+        and the whole interaction is bounded by details_window.deadline.
+        """
+        async with self._details_lock:
+            loop = asyncio.get_running_loop()
+            # 整个交互使用同一份配置快照
+            settings = CONFIG.snapshot
+            options = settings.details_window
+            deadline = loop.time() + options.deadline
+            window_info = self.session.window_info
+            if not window_info:
+                LOGGER.error(f"Main window not found for target {self.target.name}")
+                return None
 
-        # Convert to grayscale
-        screenshot = screenshot.convert("L")
-        LOGGER.info("Captured and converted details screenshot to grayscale")
+            # Calculate center of chat box region for clicking
+            click_x = self.chat_box["x"] + self.chat_box["width"] // 2
+            click_y = window_info["height"] + self.chat_box["y_offset"] + self.chat_box["height"] // 2
+            details_info = await self._retry_until(
+                "open", deadline, options.retries,
+                lambda: self._click(window_info["hwnd"], click_x, click_y),
+                lambda timeout: self.window_manager.wait_for_window(
+                    self.details_title, timeout, options.poll_interval
+                ),
+                options.open_timeout,
+            )
+            if not details_info:
+                LOGGER.error(f"Details window not found for target {self.target.name}")
+                return None
 
-        screenshot_path = self.image_processor.save_image(
-            screenshot, CONFIG.get("paths.screenshots"), grayscale=True
-        )
+            # Capture screenshot of details window, then convert to grayscale
+            # (cached on the frame, reused by OCR preprocessing)
+            screenshot = await loop.run_in_executor(
+                None, self.window_manager.capture_screenshot, details_info["hwnd"]
+            )
+            if screenshot is None:
+                LOGGER.error("Failed to capture details screenshot")
+            else:
+                screenshot = screenshot.convert("L")
+                LOGGER.info("Captured and converted details screenshot to grayscale")
+                await loop.run_in_executor(
+                    None, functools.partial(self.image_processor.save_image, screenshot,
+                                            settings.paths.screenshots, grayscale=True)
+                )
 
-        # Close details window
-        self.window_manager.simulate_click(details_info["hwnd"], details_info["width"] - 20, 20)
-        time.sleep(0.5)  # Wait for close to complete
+            # Close details window and verify it is gone
+            closed = await self._retry_until(
+                "close", deadline, options.retries,
+                lambda: self._click(details_info["hwnd"], details_info["width"] - 20, 20),
+                lambda timeout: self.window_manager.wait_for_window_closed(
+                    self.details_title, timeout, options.poll_interval
+                ),
+                options.close_timeout,
+            )
+            if not closed:
+                LOGGER.warning("Details window still open")
+                return None
 
-        # Verify details window is closed
-        if self.window_manager.find_window(self.details_title):
-            LOGGER.warning("Details window still open")
-            return None
+            # Click blank area to restore UI
+            blank_y = window_info["height"] - 300
+            LOGGER.debug(f"Clicking blank area at ({self.chat_box['x']}, {blank_y}) to restore UI")
+            await self._click(window_info["hwnd"], self.chat_box["x"], blank_y)
+
+            return screenshot
 
-        # Click blank area to restore UI
-        blank_x = self.chat_box["x"] + self.chat_box["width"]
-        blank_y = window_info["height"] - 300
-        LOGGER.debug(f"Clicking blank area at ({blank_x}, {blank_y}) to restore UI")
-        self.window_manager.simulate_click(window_info["hwnd"], self.chat_box["x"], blank_y)
+    async def _click(self, hwnd, x: int, y: int) -> None:
+        # SendMessage 会等待目标窗口处理完消息，放到线程中执行
+        await asyncio.get_running_loop().run_in_executor(None, self.window_manager.simulate_click, hwnd, x, y)
 
-        return screenshot
\ No newline at end of file
+    async def _retry_until(self, step: str, deadline: float, retries: int, click, wait, timeout: float):
+        """点击后等待结果，未成功时重新点击，最多 retries 次且不超过截止时间"""
+        loop = asyncio.get_running_loop()
+        for attempt in range(retries + 1):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            if attempt:
+                METRICS.inc("details_retries", step=step)
+                LOGGER.warning(f"Retrying details window {step} for target {self.target.name}")
+            started = loop.time()
+            await click()
+            result = await wait(min(timeout, remaining))
+            if result:
+                METRICS.observe(f"details_{step}_wait", loop.time() - started)
+                return result
+        return None
@@ -5,11 +5,14 @@ import shutil
 from typing import Optional
 from datetime import datetime
 from utils.logger import LOGGER
+from utils.metrics import METRICS, timed
 
+@timed("save_image")
 def save_image(image, folder: str, grayscale: bool = False) -> Optional[str]:
     """保存图像到指定文件夹，返回文件路径"""
     os.makedirs(folder, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # 精确到微秒，同一秒内的多次保存不会互相覆盖
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
     filename = f"screenshot_{timestamp}.png"
     filepath = os.path.join(folder, filename)
     
@@ -21,6 +24,7 @@ def save_image(image, folder: str, grayscale: bool = False) -> Optional[str]:
         return filepath
     except Exception as e:
         LOGGER.error(f"Failed to save image: {e}")
+        METRICS.inc("errors", operation="save_image")
         return None
 
 def copy_image(src_path: str, dest_folder: str) -> bool:
@@ -2,16 +2,16 @@
 
 from loguru import logger
 import os
+from typing import Optional
 
-def setup_logger():
-    """配置日志记录"""
-    log_dir = "logs"
-    os.makedirs(log_dir, exist_ok=True)
-    log_file = os.path.join(log_dir, "app.log")
-    
-    # 添加文件日志输出
-    logger.add(log_file, rotation="10 MB", level="INFO", format="{time} - {level} - {message}")
-    
-    return logger
+LOGGER = logger
+_file_sink: Optional[int] = None
 
-LOGGER = setup_logger()
\ No newline at end of file
+def setup_logger(log_dir: str = "logs"):
+    """配置日志记录：添加文件日志输出。由程序入口调用，导入时不创建目录；重复调用只添加一次"""
+    global _file_sink
+    if _file_sink is None:
+        os.makedirs(log_dir, exist_ok=True)
+        log_file = os.path.join(log_dir, "app.log")
+        _file_sink = logger.add(log_file, rotation="10 MB", level="INFO", format="{time} - {level} - {message}")
+    return logger
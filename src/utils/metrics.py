@@ -0,0 +1,248 @@
+# 运行指标：计时直方图、计数器与 /metrics 接口
+
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from utils.logger import LOGGER
+
+PREFIX = "weixin_monitor"
+# 秒；覆盖从变化检测（亚毫秒）到详情截图与AI请求（数秒）的范围
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    """固定桶的累计直方图，按标签组合分别计数"""
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[LabelKey, list] = {}
+
+    def observe(self, value: float, key: LabelKey = ()) -> None:
+        series = self.series.get(key)
+        if series is None:
+            # [各桶计数..., +Inf 计数, 总和]
+            series = self.series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def quantile(self, q: float, key: LabelKey = ()) -> float:
+        """按桶线性插值估计分位数"""
+        series = self.series.get(key)
+        if not series:
+            return 0.0
+        counts = series[:-1]
+        rank = q * sum(counts)
+        seen = 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for key, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(key, ('le', repr(bound)))} {cumulative}"
+            cumulative += series[len(self.buckets)]
+            yield f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(key)} {series[-1]}"
+            yield f"{self.name}_count{_format_labels(key)} {cumulative}"
+
+
+class Counter:
+    """单调递增计数器，按标签组合分别计数"""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.series: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, key: LabelKey = ()) -> None:
+        self.series[key] = self.series.get(key, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for key, value in sorted(self.series.items()):
+            yield f"{self.name}{_format_labels(key)} {value}"
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry: "MetricsRegistry", name: str, labels: dict):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        if exc_type is not None and not issubclass(exc_type, asyncio.CancelledError):
+            self.registry.inc("errors", operation=self.name)
+        return False
+
+
+class MetricsRegistry:
+    """进程内指标注册表。
+
+    未启用时 timer() 返回共享的空上下文、inc()/observe() 立即返回，开销只有一次属性判断。
+    计时指标命名为 <prefix>_<name>_seconds，计数器为 <prefix>_<name>_total。
+    """
+
+    def __init__(self, enabled: bool = False, prefix: str = PREFIX, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def configure(self, enabled: bool = True, buckets: Optional[Iterable[float]] = None) -> None:
+        self.enabled = enabled
+        if buckets:
+            self.buckets = tuple(buckets)
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(
+                    f"{self.prefix}_{name}_seconds", f"Duration of {name} in seconds", self.buckets
+                )
+            histogram.observe(seconds, _label_key(labels))
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            counter = self.counters.get(name)
+            if counter is None:
+                counter = self.counters[name] = Counter(f"{self.prefix}_{name}_total", f"Number of {name}")
+            counter.inc(amount, _label_key(labels))
+
+    def timer(self, name: str, **labels):
+        """计时上下文：with METRICS.timer("capture_details"): ...；异常时同时计入 errors"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        with self._lock:
+            lines = []
+            for metric in list(self.counters.values()) + list(self.histograms.values()):
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def format_summary(self) -> str:
+        """单行摘要：各计时项的次数与 p50/p95，以及各计数器的合计"""
+        with self._lock:
+            parts = []
+            for name, histogram in sorted(self.histograms.items()):
+                for key in sorted(histogram.series):
+                    label = name + ("[" + ",".join(v for _, v in key) + "]" if key else "")
+                    count = sum(histogram.series[key][:-1])
+                    parts.append(f"{label}: n={count} p50={histogram.quantile(0.5, key) * 1000:.1f}ms "
+                                 f"p95={histogram.quantile(0.95, key) * 1000:.1f}ms")
+            for name, counter in sorted(self.counters.items()):
+                parts.append(f"{name}={sum(counter.series.values()):g}")
+        return "; ".join(parts) or "no samples"
+
+    def start_server(self, port: int = 9108, host: str = "127.0.0.1") -> None:
+        """在后台线程中提供 GET /metrics"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        LOGGER.info(f"Serving metrics on http://{host}:{self._server.server_address[1]}/metrics")
+
+    def stop_server(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def timed(name: str):
+    """为同步或异步函数计时的装饰器，未启用指标时直接调用原函数"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not METRICS.enabled:
+                    return await func(*args, **kwargs)
+                with METRICS.timer(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return func(*args, **kwargs)
+            with METRICS.timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+METRICS = MetricsRegistry()
@@ -0,0 +1,37 @@
+# 启动耗时：记录导入与各初始化步骤完成的时间点，--profile-startup 时输出
+
+import threading
+import time
+from typing import List, Tuple
+from utils.logger import LOGGER
+
+
+class StartupProfile:
+    """从进程开始导入主模块起计时，按完成顺序记录各步骤（含后台预热）的时间点"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.marks: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    def mark(self, step: str) -> float:
+        """记录某一步骤完成，返回距开始的秒数；可在后台线程中调用"""
+        elapsed = time.perf_counter() - self.origin
+        with self._lock:
+            self.marks.append((step, elapsed))
+        return elapsed
+
+    def format_report(self) -> str:
+        with self._lock:
+            marks = sorted(self.marks, key=lambda mark: mark[1])
+        lines, previous = [], 0.0
+        for step, elapsed in marks:
+            lines.append(f"  {elapsed * 1000:8.0f}ms  (+{(elapsed - previous) * 1000:6.0f}ms)  {step}")
+            previous = elapsed
+        return "\n".join(lines)
+
+    def log_report(self) -> None:
+        LOGGER.info("Startup profile:\n" + self.format_report())
+
+
+STARTUP = StartupProfile()
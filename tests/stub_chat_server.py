@@ -0,0 +1,99 @@
+# 本地模拟 /chat/completions 接口，用于离线测试和基准测试
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubChatServer:
+    """模拟 OpenAI 兼容的 /chat/completions 接口。
+
+    reply 可以是固定字符串，也可以是接收 messages 列表、返回字符串的函数；
+    latency 为每次请求的模拟延迟（秒）；token_latency 为每个输出 token（按空白分词近似）的生成耗时，
+    回复按请求的 max_tokens 截断；fail_statuses 中的状态码按顺序返回给最先到达的请求。
+    """
+
+    def __init__(self, reply="yes", latency: float = 0.0, fail_statuses=None,
+                 host: str = "127.0.0.1", port: int = 0, token_latency: float = 0.0):
+        self.reply = reply
+        self.latency = latency
+        self.token_latency = token_latency
+        self.fail_statuses = list(fail_statuses or [])
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, payload):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                if not self.path.endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": "not found"}})
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with stub._lock:
+                    stub.requests.append(request)
+                    status = stub.fail_statuses.pop(0) if stub.fail_statuses else None
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if status:
+                    self._send(status, {"error": {"message": f"stub error {status}"}})
+                    return
+                messages = request.get("messages", [])
+                content = stub.reply(messages) if callable(stub.reply) else stub.reply
+                tokens = content.split(" ")
+                if request.get("max_tokens"):
+                    tokens = tokens[:request["max_tokens"]]
+                    content = " ".join(tokens)
+                if stub.token_latency:
+                    time.sleep(stub.token_latency * len(tokens))
+                self._send(200, {
+                    "id": f"chatcmpl-stub-{len(stub.requests)}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+                })
+
+        return Handler
+
+    def start(self) -> "StubChatServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,149 @@
+# 单元测试 - 提示服务：后台投递、限速合并、Webhook 与通道失败隔离
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from services.alert_service import (Alert, AlertService, AlertSink, NullSink, WebhookSink,
+                                    create_alert_service)
+
+
+class SlowSink(NullSink):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def deliver(self, alert):
+        time.sleep(self.delay)
+        super().deliver(alert)
+
+
+class BrokenSink(AlertSink):
+    name = "broken"
+
+    def deliver(self, alert):
+        raise RuntimeError("no audio device")
+
+
+class UnavailableSink(AlertSink):
+    name = "unavailable"
+
+    def open(self):
+        raise ImportError("pygame")
+
+    def deliver(self, alert):
+        raise AssertionError("should have been dropped")
+
+
+def test_notify_does_not_wait_for_delivery():
+    sink = SlowSink(0.3)
+    service = AlertService([sink], min_interval=0)
+    start = time.perf_counter()
+    assert service.notify("a", "hello", 0.9)
+    assert time.perf_counter() - start < 0.05
+    service.flush()
+    assert [alert.text for alert, _ in sink.delivered] == ["hello"]
+    service.close()
+
+
+def test_burst_is_coalesced_and_rate_limited():
+    sink = NullSink()
+    service = AlertService([sink], min_interval=0.3)
+    service.wait_ready()
+    service.notify("a", "first", 0.6)
+    time.sleep(0.05)
+    for i in range(5):
+        service.notify("b" if i % 2 else "a", f"burst {i}", 0.5 + i / 10)
+    service.flush()
+    service.close()
+    assert [alert.count for alert, _ in sink.delivered] == [1, 5]
+    first, second = sink.delivered
+    assert second[1] - first[1] >= 0.29
+    assert second[0].text == "burst 4"
+    assert second[0].target == "a, b"
+    assert second[0].confidence == pytest.approx(0.9)
+    assert service.stats() == {"received": 6, "delivered": 2, "coalesced": 4, "dropped": 0}
+
+
+def test_failing_sinks_do_not_block_others():
+    sink = NullSink()
+    service = AlertService([UnavailableSink(), BrokenSink(), sink], min_interval=0)
+    service.play_alert()
+    service.flush()
+    service.close()
+    assert [s.name for s in service.sinks] == ["broken", "null"]
+    assert len(sink.delivered) == 1
+
+
+def test_full_queue_drops_alerts():
+    sink = SlowSink(0.2)
+    service = AlertService([sink], min_interval=0, queue_size=1)
+    service.wait_ready()
+    results = [service.notify(text=str(i)) for i in range(5)]
+    service.close()
+    assert not all(results)
+    assert service.stats()["dropped"] == results.count(False)
+
+
+@contextlib.contextmanager
+def webhook_server(status=204):
+    """本地 Webhook 接收端，返回 (url, 收到的 JSON 列表)"""
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            received.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            self.send_response(status)
+            self.end_headers()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/alert", received
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_webhook_posts_json():
+    with webhook_server() as (url, received):
+        service = create_alert_service(min_interval=0, sinks=[{"type": "webhook", "url": url}])
+        service.notify("wx", "需要写个脚本", 0.8)
+        service.flush()
+        service.close()
+    assert received == [{"target": "wx", "text": "需要写个脚本", "confidence": 0.8, "count": 1,
+                         "summary": "[wx] 需要写个脚本"}]
+
+
+def test_webhook_sink_raises_on_error_status_and_service_keeps_going():
+    with webhook_server(status=500) as (url, received):
+        with pytest.raises(urllib.error.HTTPError):
+            WebhookSink(url).deliver(Alert("wx", "a"))
+        sink = NullSink()
+        service = AlertService([WebhookSink(url, timeout=1.0), sink], min_interval=0)
+        service.notify("wx", "b")
+        service.flush()
+        service.close()
+    assert [entry["text"] for entry in received] == ["a", "b"]
+    assert [alert.text for alert, _ in sink.delivered] == ["b"]
+
+
+def test_create_alert_service_rejects_unknown_sink():
+    with pytest.raises(ValueError):
+        create_alert_service(sinks=[{"type": "pager"}])
+
+
+def test_summary_mentions_coalesced_count():
+    assert Alert("wx", "a\n b", count=3).summary() == "[wx] a b (+2 more)"
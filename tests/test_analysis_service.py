@@ -0,0 +1,73 @@
+# 单元测试 - AnalysisService（使用本地模拟接口，无需网络）
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+from config.settings import AISettings
+from core.ai_analyzer import AsyncDashscopeAnalyzer
+from core.image_processor import ImageProcessor
+from core.verdict_cache import CachingAnalyzer, VerdictCache
+from services.analysis_service import AnalysisService
+from stub_chat_server import StubChatServer
+
+
+def make_service(server, structured=False):
+    analyzer = AsyncDashscopeAnalyzer(api_key="test", base_url=server.base_url, backoff_base=0.01,
+                                      structured=structured)
+    service = AnalysisService(CachingAnalyzer(analyzer, VerdictCache()), ImageProcessor())
+    return service, analyzer
+
+
+def test_structured_setting_is_hot_reloaded_into_the_client():
+    with StubChatServer(reply='{"label": "yes", "confidence": 0.9}') as server:
+        service, analyzer = make_service(server)
+        service.apply_settings(AISettings(prompt="Python? JSON", structured=True, alert_threshold=0.5))
+
+        async def run():
+            try:
+                return await service.judge_text("python developer wanted")
+            finally:
+                await analyzer.aclose()
+
+        verdict = asyncio.run(run())
+    assert analyzer.structured
+    assert server.requests[0]["response_format"] == {"type": "json_object"}
+    assert verdict.label == "yes" and verdict.parsed
+
+
+def _analyze_image(server, path):
+    service, analyzer = make_service(server)
+
+    async def run():
+        try:
+            return await service.analyze_image(path)
+        finally:
+            await analyzer.aclose()
+
+    return asyncio.run(run())
+
+
+def test_image_negative_verdict_mentioning_yes_does_not_alert(tmp_path, monkeypatch):
+    copied = []
+    monkeypatch.setattr("services.analysis_service.copy_image", lambda *args: copied.append(args))
+    path = str(tmp_path / "chat.png")
+    Image.new("RGB", (40, 20), "white").save(path)
+    reply = '{"label": "no", "confidence": 0.9, "reason": "says yes to lunch, not about Python"}'
+    with StubChatServer(reply=reply) as server:
+        assert _analyze_image(server, path) is False
+    assert copied == []
+
+
+def test_image_positive_verdict_is_copied_to_judgments(tmp_path, monkeypatch):
+    copied = []
+    monkeypatch.setattr("services.analysis_service.copy_image", lambda *args: copied.append(args))
+    path = str(tmp_path / "chat.png")
+    Image.new("RGB", (40, 20), "white").save(path)
+    with StubChatServer(reply='{"label": "yes", "confidence": 0.9}') as server:
+        assert _analyze_image(server, path) is True
+    assert copied[0][0] == path
@@ -0,0 +1,65 @@
+# 单元测试 - AsyncDashscopeAnalyzer（使用本地模拟接口，无需网络）
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.ai_analyzer import AsyncDashscopeAnalyzer
+from stub_chat_server import StubChatServer
+
+PROMPT = "Please answer 'yes', 'no' or 'not sure'."
+
+
+def make_analyzer(server, **options):
+    options.setdefault("backoff_base", 0.01)
+    return AsyncDashscopeAnalyzer(api_key="test", base_url=server.base_url, **options)
+
+
+async def _analyze_many(analyzer, count):
+    try:
+        return await asyncio.gather(*(analyzer.analyze_text(f"message {i}", PROMPT) for i in range(count)))
+    finally:
+        await analyzer.aclose()
+
+
+def test_analyze_text_sends_prompt_as_system_message():
+    with StubChatServer(reply="yes") as server:
+        results = asyncio.run(_analyze_many(make_analyzer(server), 1))
+    assert results == ["yes"]
+    messages = server.requests[0]["messages"]
+    assert messages[0] == {"role": "system", "content": PROMPT}
+    assert messages[1] == {"role": "user", "content": "message 0"}
+
+
+def test_retries_on_rate_limit_and_server_error():
+    with StubChatServer(reply="no", fail_statuses=[429, 503]) as server:
+        results = asyncio.run(_analyze_many(make_analyzer(server, max_retries=3), 1))
+    assert results == ["no"]
+    assert len(server.requests) == 3
+
+
+def test_does_not_retry_client_error():
+    with StubChatServer(fail_statuses=[400]) as server:
+        results = asyncio.run(_analyze_many(make_analyzer(server, max_retries=3), 1))
+    assert results == [None]
+    assert len(server.requests) == 1
+
+
+def test_timeout_returns_none():
+    with StubChatServer(latency=0.5) as server:
+        results = asyncio.run(_analyze_many(make_analyzer(server, timeout=0.1, max_retries=0), 1))
+    assert results == [None]
+
+
+def test_concurrency_limit():
+    with StubChatServer(latency=0.2) as server:
+        start = time.perf_counter()
+        results = asyncio.run(_analyze_many(make_analyzer(server, max_concurrency=2), 4))
+        elapsed = time.perf_counter() - start
+    assert results == ["yes"] * 4
+    # 4 个请求、并发上限 2、每个 0.2s，至少需要两轮
+    assert elapsed >= 0.4
@@ -0,0 +1,72 @@
+# 单元测试 - AI判断微批处理（使用本地模拟接口，无需网络）
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.ai_analyzer import AsyncDashscopeAnalyzer
+from core.batch_analyzer import BatchingAnalyzer, format_batch, parse_batch
+from stub_chat_server import StubChatServer
+
+PROMPT = "Please answer 'yes', 'no' or 'not sure'."
+
+
+def batch_reply(messages):
+    content = messages[-1]["content"]
+    if "### Record" not in content:
+        return "single:" + content
+    count = content.count("### Record")
+    return json.dumps({"results": [{"id": i, "answer": f"batched:{i}"} for i in range(1, count + 1)]})
+
+
+async def _analyze(server, texts, **options):
+    analyzer = BatchingAnalyzer(AsyncDashscopeAnalyzer(api_key="test", base_url=server.base_url), **options)
+    try:
+        return await asyncio.gather(*(analyzer.analyze_text(text, PROMPT) for text in texts)), analyzer.stats()
+    finally:
+        await analyzer.aclose()
+
+
+def test_parse_batch_accepts_fenced_json_and_skips_bad_entries():
+    content = '```json\n{"results": [{"id": 2, "answer": "no"}, {"id": "1", "answer": "yes"}, {"id": 9, "answer": "x"}]}\n```'
+    assert parse_batch(content, 2) == {1: "yes", 2: "no"}
+    assert parse_batch("yes, no", 2) == {}
+    assert format_batch(["a", "b"]).endswith("### Record 1\na\n\n### Record 2\nb")
+
+
+def test_concurrent_messages_share_one_request():
+    with StubChatServer(reply=batch_reply) as server:
+        results, stats = asyncio.run(_analyze(server, ["a", "b", "c"], max_batch=8, max_wait=0.05))
+    assert results == ["batched:1", "batched:2", "batched:3"]
+    assert len(server.requests) == 1
+    assert server.requests[0]["response_format"] == {"type": "json_object"}
+    assert stats["batches"] == 1
+
+
+def test_unparsable_batch_falls_back_to_single_requests():
+    with StubChatServer(reply=lambda messages: "not json" if "### Record" in messages[-1]["content"]
+                        else "single") as server:
+        results, stats = asyncio.run(_analyze(server, ["a", "b"], max_batch=2, max_wait=1.0))
+    assert results == ["single", "single"]
+    assert len(server.requests) == 3
+    assert stats["fallbacks"] == 2
+
+
+def test_failed_batch_request_resolves_to_none_without_single_retries():
+    async def run(server):
+        analyzer = BatchingAnalyzer(AsyncDashscopeAnalyzer(api_key="test", base_url=server.base_url, max_retries=0),
+                                    max_batch=3, max_wait=1.0)
+        try:
+            return await asyncio.gather(*(analyzer.analyze_text(t, PROMPT) for t in "abc")), analyzer.stats()
+        finally:
+            await analyzer.aclose()
+
+    with StubChatServer(reply=batch_reply, fail_statuses=[500]) as server:
+        results, stats = asyncio.run(run(server))
+    assert results == [None, None, None]
+    assert len(server.requests) == 1
+    assert (stats["failures"], stats["fallbacks"]) == (3, 0)
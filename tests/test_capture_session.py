@@ -0,0 +1,147 @@
+# 单元测试 - 截图会话：窗口信息缓存与失效重查、Windows 会话的轮换缓冲区复用（以假的 win32 模块驱动）
+
+import ctypes
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import core.window_manager as window_manager
+from core.frame import Frame
+from core.window_manager import CaptureSession, WindowManager, WindowsCaptureSession
+
+
+class FakeManager(WindowManager):
+    """记录查找次数的窗口管理器；frames 中的 None 表示截图失败"""
+
+    def __init__(self, frames=(), rect=(100, 50, 180, 110)):
+        self.frames = list(frames)
+        self.rect = rect
+        self.finds = 0
+        self.hwnd = 7
+
+    def find_window(self, title):
+        self.finds += 1
+        return {"hwnd": self.hwnd} if self.hwnd else None
+
+    def capture_screenshot(self, hwnd, region=None):
+        return self.frames.pop(0)
+
+    def simulate_click(self, hwnd, x, y):
+        pass
+
+
+def test_session_caches_window_and_refinds_after_failure_or_invalidate():
+    frame = Frame(np.zeros((2, 2, 4), dtype=np.uint8))
+    manager = FakeManager([frame, frame, None, frame, frame])
+    with manager.open_session("chat") as session:
+        assert isinstance(session, CaptureSession)
+        assert session.capture() is frame and session.capture() is frame
+        assert manager.finds == 1
+        assert session.capture() is None  # 截图失败，丢弃窗口信息
+        assert session.capture() is frame
+        assert manager.finds == 2
+        session.invalidate()
+        session.capture()
+        assert manager.finds == 3
+    manager.hwnd = None
+    assert manager.open_session("gone").capture() is None
+
+
+class FakeDC:
+    def __init__(self, log):
+        self.log = log
+
+    def CreateCompatibleDC(self):
+        return FakeDC(self.log)
+
+    def SelectObject(self, bitmap):
+        pass
+
+    def BitBlt(self, dest, size, source, origin, op):
+        self.log.append(("blt", size, origin))
+
+    def GetSafeHdc(self):
+        return 1
+
+    def DeleteDC(self):
+        self.log.append("delete_dc")
+
+
+class FakeBitmap:
+    def CreateCompatibleBitmap(self, dc, width, height):
+        self.size = (width, height)
+
+    def GetHandle(self):
+        return 2
+
+
+@pytest.fixture
+def fake_win32(monkeypatch):
+    """以假对象替换 win32gui/win32ui/win32con 与 ctypes.windll；GetBitmapBits 依次写入 1, 2, 3..."""
+    log = []
+    state = {"manager": None, "fill": 0}
+
+    def get_bitmap_bits(handle, nbytes, pointer):
+        state["fill"] += 1
+        ctypes.memset(pointer, state["fill"], nbytes)
+
+    monkeypatch.setattr(window_manager, "win32gui", SimpleNamespace(
+        IsWindow=lambda hwnd: True,
+        GetWindowRect=lambda hwnd: state["manager"].rect,
+        GetWindowDC=lambda hwnd: log.append("get_dc") or 3,
+        DeleteObject=lambda handle: None,
+        ReleaseDC=lambda hwnd, dc: log.append("release_dc"),
+    ))
+    monkeypatch.setattr(window_manager, "win32ui", SimpleNamespace(
+        CreateDCFromHandle=lambda dc: FakeDC(log),
+        CreateBitmap=FakeBitmap,
+    ))
+    monkeypatch.setattr(window_manager, "win32con", SimpleNamespace(SRCCOPY=0))
+    monkeypatch.setattr(window_manager, "ctypes", SimpleNamespace(
+        windll=SimpleNamespace(user32=SimpleNamespace(PrintWindow=lambda hwnd, dc, flags: 1),
+                               gdi32=SimpleNamespace(GetBitmapBits=get_bitmap_bits)),
+        c_void_p=ctypes.c_void_p,
+    ))
+    return state, log
+
+
+def test_windows_session_rotates_and_reuses_buffers(fake_win32):
+    state, log = fake_win32
+    manager = state["manager"] = FakeManager()
+    session = WindowsCaptureSession(manager, "chat", buffers=2)
+    frames = [session.capture((10, 5, 40, 20)) for _ in range(3)]
+    assert [f.size for f in frames] == [(40, 20)] * 3
+    assert [int(f.buffer[0, 0, 0]) for f in frames] == [3, 2, 3]
+    # buffers=2：第 1、3 帧共用同一缓冲区，第 2 帧不同
+    assert frames[0].buffer is frames[2].buffer
+    assert not np.shares_memory(frames[0].buffer, frames[1].buffer)
+    # 设备上下文只分配一次，窗口信息按最新位置更新
+    assert log.count("get_dc") == 1
+    assert session.window_info["width"] == 80 and session.window_info["x"] == 100
+
+    fresh = session.capture((10, 5, 40, 20), reuse_buffer=False)
+    assert not any(np.shares_memory(fresh.buffer, f.buffer) for f in frames[:2])
+    # 区域超出窗口时裁剪到窗口内
+    assert session.capture((60, 50, 40, 40)).size == (20, 10)
+
+
+def test_windows_session_reallocates_on_resize_and_invalidate(fake_win32):
+    state, log = fake_win32
+    manager = state["manager"] = FakeManager()
+    session = WindowsCaptureSession(manager, "chat", buffers=2)
+    session.capture()
+    manager.rect = (100, 50, 200, 110)
+    assert session.capture().size == (100, 60)
+    assert log.count("get_dc") == 2 and log.count("release_dc") == 1
+
+    session.invalidate()
+    assert log.count("release_dc") == 2
+    session.capture()
+    assert manager.finds == 2 and log.count("get_dc") == 3
+    session.close()
+    assert log.count("release_dc") == 3
@@ -0,0 +1,64 @@
+# 单元测试 - 变化检测：分块哈希短路、按行带统计差异、PIL 各模式的单通道转换
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.change_detector import ChangeDetector
+
+
+def blank(height=120, width=80):
+    return np.full((height, width), 200, dtype=np.uint8)
+
+
+def test_unchanged_frame_short_circuits_on_block_hash():
+    detector = ChangeDetector(change_threshold=10, downscale=1)
+    assert detector.detect(blank()).changed is False
+    result = detector.detect(blank())
+    assert result.changed is False and result.hash_hit is True
+
+
+def test_small_change_below_threshold_reuses_cached_diff():
+    detector = ChangeDetector(change_threshold=1000, downscale=1)
+    detector.detect(blank())
+    frame = blank()
+    frame[10:14, 10:14] = 0
+    first = detector.detect(frame)
+    assert first.changed is False and first.hash_hit is False and first.diff_pixels == 16
+    second = detector.detect(frame.copy())
+    assert second.hash_hit is True and second.diff_pixels == 16
+
+
+def test_changed_rows_are_reported_as_tiles():
+    detector = ChangeDetector(change_threshold=10, downscale=1, tile_rows=6)
+    detector.detect(blank())
+    frame = blank()
+    frame[45:55, :] = 0
+    result = detector.detect(frame)
+    assert result.changed is True
+    assert result.diff_pixels == 10 * 80
+    assert result.tiles == [(40, 60)]
+    # 检测到变化后基准帧已更新
+    assert detector.detect(frame.copy()).hash_hit is True
+
+
+def test_tiles_are_in_original_coordinates_when_downscaled():
+    detector = ChangeDetector(change_threshold=10, downscale=2, tile_rows=6)
+    detector.detect(blank())
+    frame = blank()
+    frame[100:120, :] = 0
+    result = detector.detect(frame)
+    assert result.changed is True
+    assert result.tiles == [(100, 120)]
+
+
+@pytest.mark.parametrize("mode", ["RGB", "RGBA", "P", "1", "LA", "I", "L"])
+def test_pil_modes_convert_to_single_channel(mode):
+    image = Image.new("RGB", (16, 8), (0, 200, 0)).convert(mode)
+    gray = ChangeDetector(change_threshold=10, downscale=1).to_gray(image)
+    assert gray.shape == (8, 16)
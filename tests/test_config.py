@@ -0,0 +1,155 @@
+# 单元测试 - 配置快照：嵌套键读取、校验、原子替换、文件热加载与组件更新
+
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from config.config import Config
+from config.settings import ConfigError, Settings
+from core.chat_monitor import ChatMonitor
+from core.scheduler import CoalescingScheduler
+from core.triggers import AdaptivePoller
+
+BASE = {
+    "app": {"window_title": "main", "details_window_title": "details", "polling_interval": 5},
+    "paths": {"screenshots": "./screenshots", "judgments": "./judgments"},
+    "chat_box": {"x": 10, "y_offset": -100, "width": 80, "height": 40},
+    "thresholds": {"change_detection": 5000},
+    "scheduler": {"quiet_period": 2, "max_delay": 10},
+    "ai": {"prompt": "Python?", "structured": False, "alert_threshold": 0.5, "max_tokens": None},
+    "detector": {"downscale": 2},
+    "pipeline": {"stats_interval": 0},
+}
+
+
+def write_config(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(data, f, allow_unicode=True)
+
+
+def with_changes(**sections):
+    return {**BASE, **sections}
+
+
+def test_get_does_not_stop_at_values_equal_to_default():
+    settings = Settings.from_dict(BASE)
+    # 旧实现在中间值等于 default 时提前返回
+    assert settings.get("pipeline.stats_interval", 0) == 0
+    assert settings.get("ai.max_tokens", 24) is None
+    assert settings.get("ai.model", "qwen") == "qwen"
+    assert settings.get("ai.prompt.missing", "x") == "x"
+    assert settings.get("missing.key") is None
+    assert settings.get("app.polling_interval") == 5
+
+
+def test_snapshot_is_typed_and_read_only():
+    settings = Settings.from_dict(with_changes(ai={**BASE["ai"], "structured": True}))
+    assert settings.detector.change_threshold == 5000
+    assert settings.scheduler.quiet_period == 2.0
+    assert settings.trigger.max_interval == 5.0  # 未配置时沿用 app.polling_interval
+    assert settings.trigger.fallback_max_interval == 6.5 and settings.trigger.max_event_wakeups == 30
+    assert settings.ai.prompt.startswith("Python? ") and "JSON" in settings.ai.prompt
+    assert settings.targets[0].chat_box["width"] == 80
+    with pytest.raises(Exception):
+        settings.scheduler.quiet_period = 0
+    with pytest.raises(TypeError):
+        settings.raw["paths"]["screenshots"] = "/tmp"
+
+
+@pytest.mark.parametrize("sections", [
+    {"thresholds": {"change_detection": "a lot"}},
+    {"scheduler": {"quiet_period": -1}},
+    {"ai": {"alert_threshold": 1.5}},
+    {"chat_box": {"x": 10, "y_offset": -100, "width": 0, "height": 40}},
+    {"targets": [{"name": "a"}, {"name": "a"}]},
+    {"paths": "./screenshots"},
+])
+def test_invalid_settings_are_rejected(sections):
+    with pytest.raises(ConfigError):
+        Settings.from_dict(with_changes(**sections))
+
+
+def test_unknown_detector_option_is_rejected():
+    with pytest.raises(ConfigError, match="detector.tile_row"):
+        Settings.from_dict(with_changes(detector={"tile_row": 6}))
+
+
+@pytest.mark.parametrize("value", ["abc", 1.5, True])
+def test_detector_option_must_be_an_integer(value):
+    with pytest.raises(ConfigError, match="detector.pixel_tolerance"):
+        Settings.from_dict(with_changes(detector={"pixel_tolerance": value}))
+
+
+def test_apply_swaps_snapshot_and_notifies_subscribers(tmp_path):
+    path = tmp_path / "config.yaml"
+    write_config(path, BASE)
+    config = Config(str(path))
+    before = config.snapshot
+    calls = []
+    config.subscribe(lambda old, new, changed: calls.append((old, new, changed)))
+    after = config.apply(with_changes(thresholds={"change_detection": 800}))
+    assert config.snapshot is after
+    assert before.detector.change_threshold == 5000  # 旧快照不变
+    assert calls == [(before, after, frozenset({"thresholds"}))]
+    with pytest.raises(ConfigError):
+        config.apply(with_changes(thresholds={"change_detection": -1}))
+    assert config.snapshot is after
+    assert len(calls) == 1
+
+
+def test_watcher_reloads_modified_file_and_keeps_snapshot_on_errors(tmp_path):
+    path = tmp_path / "config.yaml"
+    write_config(path, BASE)
+    config = Config(str(path))
+    updated = threading.Event()
+    config.subscribe(lambda old, new, changed: updated.set())
+    config.watch(interval=0.02)
+    try:
+        write_config(path, with_changes(chat_box={**BASE["chat_box"], "x": 20}))
+        assert updated.wait(2)
+        assert config.snapshot.targets[0].chat_box["x"] == 20
+        good = config.snapshot
+        updated.clear()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("chat_box: [unclosed")
+        time.sleep(0.2)
+        assert not updated.is_set()
+        assert config.snapshot is good
+    finally:
+        config.stop_watching()
+
+
+def test_components_apply_new_settings_without_losing_state():
+    monitor = ChatMonitor(5000, downscale=2)
+    frame = np.full((40, 80), 200, dtype=np.uint8)
+    changed = frame.copy()
+    changed[:20, :40] = 0  # 800 像素
+    assert not monitor.check_updates(frame)
+    assert not monitor.check_updates(changed)
+    monitor.apply_settings(500, downscale=2)
+    assert monitor.check_updates(changed)  # 保留了基准帧，按新阈值判断
+
+    scheduler = CoalescingScheduler(quiet_period=2, max_delay=10)
+    scheduler.configure(0.5, 0.1)
+    assert (scheduler.quiet_period, scheduler.max_delay) == (0.5, 0.5)
+
+    poller = AdaptivePoller(min_interval=0.5, max_interval=30, idle_after=0, clock=lambda: 100.0)
+    for _ in range(20):
+        poller.next_interval()
+    poller.configure(0.5, 5, 1.5, 0)
+    assert poller.interval == 5
+
+
+def test_restart_required_lists_only_settings_read_at_startup():
+    from main import restart_required
+    old = Settings.from_dict(BASE)
+    new = Settings.from_dict(with_changes(ai={**BASE["ai"], "prompt": "Script?", "model": "qwen-plus"},
+                                          ocr={"incremental": True}, scheduler={"quiet_period": 1}))
+    assert restart_required(old, new, new.changed_sections(old)) == ["ai.model", "ocr"]
@@ -0,0 +1,77 @@
+# 单元测试 - 消息去重的 MinHash 签名、近似匹配、淘汰与持久化
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.dedup import DedupIndex, MinHasher, similarity
+
+RECORD = (
+    "张伟 10:21\n每天要把三十个Excel表格合并成一个，有没有办法自动处理\n"
+    "王芳 10:23\n可以写个脚本，按sheet名称汇总到一张总表里\n"
+    "张伟 10:24\n好的，那麻烦帮忙看一下格式，附件在群文件里"
+)
+# 同一条记录再次OCR：时间不同、个别字识别错误、空白不同
+NOISY = RECORD.replace("10:21", "10:22").replace("汇总", "汇忠").replace("\n", " \n")
+OTHER = (
+    "李娜 15:02\n下午三点在302会议室开会，请大家准时参加\n"
+    "刘洋 15:05\n收到，会议纪要谁来写？上次是陈静写的"
+)
+
+
+def test_signature_is_stable_under_whitespace_and_time():
+    hasher = MinHasher()
+    reformatted = RECORD.replace("10:21", "09:00").replace("\n", "  \n")
+    assert (hasher.signature(RECORD) == hasher.signature(reformatted)).all()
+
+
+def test_noisy_ocr_is_similar_and_unrelated_text_is_not():
+    hasher = MinHasher()
+    assert similarity(hasher.signature(RECORD), hasher.signature(NOISY)) >= 0.6
+    assert similarity(hasher.signature(RECORD), hasher.signature(OTHER)) < 0.2
+
+
+def test_seen_only_looks_up_and_record_stores():
+    index = DedupIndex()
+    assert not index.seen(RECORD)
+    assert not index.seen(RECORD)
+    index.record(RECORD)
+    assert index.seen(RECORD)
+    assert index.seen(NOISY)
+    index.record(NOISY)  # 近似相同，不重复记录
+    assert not index.seen(OTHER)
+    index.record(OTHER)
+    assert index.stats() == {"size": 2, "duplicates": 2, "new": 2}
+
+
+def test_max_entries_evicts_oldest():
+    index = DedupIndex(max_entries=1)
+    index.record(RECORD)
+    index.record(OTHER)
+    assert len(index) == 1
+    assert not index.seen(RECORD)
+
+
+def test_ttl_expires_fingerprints():
+    index = DedupIndex(ttl=0.0)
+    index.record(RECORD)
+    assert not index.seen(RECORD)
+
+
+def test_fingerprints_persist_across_restarts(tmp_path):
+    db_path = str(tmp_path / "dedup.db")
+    index = DedupIndex(db_path=db_path)
+    index.record(RECORD)
+    index.record(OTHER)
+    index.close()
+
+    reopened = DedupIndex(db_path=db_path)
+    assert len(reopened) == 2
+    assert reopened.seen(NOISY)
+    reopened.close()
+
+    limited = DedupIndex(max_entries=1, db_path=db_path)
+    assert len(limited) == 1
+    assert limited.seen(OTHER)
+    limited.close()
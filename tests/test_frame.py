@@ -0,0 +1,104 @@
+# 单元测试 - 单缓冲区帧：区域视图、派生结果缓存、灰度/BGR 转换、PIL 与文件读取
+
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.frame import BGRX, GRAY, Frame, as_frame
+
+
+def bgrx(height=20, width=30):
+    buffer = np.zeros((height, width, 4), dtype=np.uint8)
+    buffer[..., 0] = np.arange(width, dtype=np.uint8)  # B
+    buffer[..., 1] = 100  # G
+    buffer[..., 2] = np.arange(height, dtype=np.uint8)[:, None]  # R
+    return buffer
+
+
+def test_rejects_buffers_of_the_wrong_shape():
+    with pytest.raises(ValueError):
+        Frame(np.zeros((4, 4), dtype=np.uint8), BGRX)
+    with pytest.raises(ValueError):
+        Frame(np.zeros((4, 4, 4), dtype=np.uint8), GRAY)
+
+
+def test_roi_shares_buffer_and_reuses_computed_gray():
+    frame = Frame(bgrx())
+    gray = frame.gray
+    view = frame.roi(5, 2, 10, 8)
+    assert view.size == (10, 8)
+    assert np.shares_memory(view.buffer, frame.buffer)
+    assert np.shares_memory(view.gray, gray)
+    assert np.array_equal(view.gray, gray[2:10, 5:15])
+    # 负坐标被截到 0
+    assert frame.roi(-3, -1, 4, 4).buffer.shape[:2] == (4, 4)
+
+
+def test_roi_before_gray_computes_its_own():
+    frame = Frame(bgrx())
+    view = frame.roi(5, 2, 10, 8)
+    assert "gray" not in frame._cache
+    expected = cv2.cvtColor(np.ascontiguousarray(frame.buffer[2:10, 5:15]), cv2.COLOR_BGRA2GRAY)
+    assert np.array_equal(view.gray, expected)
+
+
+def test_cached_computes_once_per_key():
+    frame = Frame(bgrx())
+    calls = []
+
+    def compute(f):
+        calls.append(1)
+        return f.gray + 1
+
+    first = frame.cached(("plus", 1), compute)
+    assert frame.cached(("plus", 1), compute) is first
+    frame.cached(("plus", 2), compute)
+    assert len(calls) == 2
+    assert frame.gray is frame.gray
+    assert frame.threshold(50) is frame.threshold(50)
+    assert frame.threshold(50) is not frame.threshold(50, clahe=(2.0, (8, 8)))
+
+
+def test_gray_and_bgr_conversions():
+    frame = Frame(bgrx())
+    assert np.array_equal(frame.gray, cv2.cvtColor(frame.buffer, cv2.COLOR_BGRA2GRAY))
+    assert frame.bgr.shape == (20, 30, 3) and np.array_equal(frame.bgr, frame.buffer[..., :3])
+    gray = Frame(np.full((5, 6), 7, dtype=np.uint8), GRAY)
+    assert gray.gray is gray.buffer and gray.mode == "L"
+    assert gray.bgr.shape == (5, 6, 3) and (gray.bgr == 7).all()
+    assert frame.convert("L").format == GRAY and frame.convert("L").buffer is frame.gray
+    with pytest.raises(ValueError):
+        frame.convert("RGB")
+
+
+def test_from_pil_and_to_pil_round_trip():
+    image = Image.new("RGB", (6, 4), (10, 20, 30))
+    frame = Frame.from_pil(image)
+    assert frame.format == BGRX and tuple(frame.buffer[0, 0, :3]) == (30, 20, 10)
+    assert frame.to_pil().getpixel((0, 0)) == (10, 20, 30)
+    gray = Frame.from_pil(Image.new("L", (6, 4), 99))
+    assert gray.format == GRAY and gray.size == (6, 4)
+    assert as_frame(frame) is frame and as_frame(None) is None
+    assert as_frame(np.zeros((4, 6, 3), dtype=np.uint8)).format == BGRX
+    with pytest.raises(TypeError):
+        as_frame("not an image")
+
+
+def test_load_and_save(tmp_path):
+    path = str(tmp_path / "截图.png")
+    Frame(bgrx()).save(path)
+    loaded = Frame.load(path)
+    assert loaded.format == BGRX
+    assert loaded.size == (30, 20)
+    assert np.array_equal(loaded.bgr, Frame(bgrx()).bgr)
+    Frame(np.full((4, 5), 3, dtype=np.uint8), GRAY).save(str(tmp_path / "gray.png"))
+    assert Frame.load(str(tmp_path / "gray.png")).format == GRAY
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not a png")
+    assert Frame.load(str(broken)) is None
@@ -0,0 +1,41 @@
+# 单元测试 - 后台图片存储的内容去重与硬链接
+
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.frame import Frame, BGRX, GRAY
+from core.image_store import ImageStore
+
+
+def gray_frame(value):
+    return Frame(np.full((20, 30), value, dtype=np.uint8), GRAY)
+
+
+def test_identical_frames_are_stored_once_and_judgments_linked(tmp_path):
+    store = ImageStore(format="png")
+    screenshots, judgments = str(tmp_path / "screenshots"), str(tmp_path / "judgments")
+    first = store.save(gray_frame(10), screenshots)
+    assert store.save(gray_frame(10), screenshots) == first
+    other = store.save(gray_frame(200), screenshots)
+    linked = store.save(gray_frame(10), judgments)
+    store.close()
+    assert first != other
+    assert sorted(os.listdir(screenshots)) == sorted([os.path.basename(first), os.path.basename(other)])
+    assert os.path.samefile(first, linked)
+    assert (store.written, store.linked, store.deduplicated) == (2, 1, 1)
+
+
+@pytest.mark.parametrize("format, ext", [("png", "png"), ("webp", "webp"), ("raw", "pgm")])
+def test_formats_are_lossless(tmp_path, format, ext):
+    store = ImageStore(format=format)
+    pixels = np.random.default_rng(0).integers(0, 256, (20, 30, 4), dtype=np.uint8)
+    path = store.save(Frame(pixels, BGRX), str(tmp_path), grayscale=True)
+    store.close()
+    assert path.endswith("." + ext)
+    assert np.array_equal(cv2.imread(path, cv2.IMREAD_GRAYSCALE), Frame(pixels, BGRX).gray)
@@ -0,0 +1,88 @@
+# 单元测试 - 增量OCR：只识别新增/变化的文本行、按来源计算新增行、量化哈希冲突时复用识别结果
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.incremental_ocr import IncrementalOCR, crop_hash, sort_boxes
+
+LINE_HEIGHT = 20
+
+
+def frame(*values):
+    """每个值画成一行文本（该灰度的矩形条），行之间留白"""
+    image = np.full((len(values) * LINE_HEIGHT * 2 + 10, 200, 3), 255, dtype=np.uint8)
+    for row, value in enumerate(values):
+        y = 10 + row * LINE_HEIGHT * 2
+        image[y:y + LINE_HEIGHT, 10:190] = value
+    return image
+
+
+class FakeEngine:
+    """检测非白色的行带，识别结果为裁剪图的平均灰度；记录送入识别模型的裁剪数"""
+
+    def __init__(self):
+        self.recognized = []
+
+    def text_detector(self, image):
+        rows = (image[:, :, 0] < 255).any(axis=1).astype(np.int8)
+        edges = np.diff(np.concatenate(([0], rows, [0])))
+        boxes = [np.array([[10, y0], [190, y0], [190, y1], [10, y1]], dtype=np.float32)
+                 for y0, y1 in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))]
+        # 检测器输出顺序不保证从上到下
+        return np.array(boxes[::-1]), 0.01
+
+    def text_recognizer(self, crops):
+        self.recognized.append(len(crops))
+        return [(f"line {int(round(crop.mean()))}", 0.9) for crop in crops], 0.01
+
+
+def test_only_new_lines_reach_recognizer_and_diff_is_per_stream():
+    engine = FakeEngine()
+    ocr = IncrementalOCR(engine)
+    first = ocr.process(frame(10, 60, 110), stream="a")
+    assert first.lines == ["line 10", "line 60", "line 110"]
+    assert first.added == first.lines and first.recognized == 3
+
+    # 聊天滚动：旧行上移，底部出现一行新消息
+    second = ocr.process(frame(60, 110, 160), stream="a")
+    assert second.lines == ["line 60", "line 110", "line 160"]
+    assert second.added == ["line 160"]
+    assert (second.recognized, second.reused) == (1, 2)
+
+    # 另一个来源的上一帧为空，全部算新增，但识别结果从共享缓存复用
+    other = ocr.process(frame(10, 60), stream="b")
+    assert other.added == ["line 10", "line 60"] and other.recognized == 0
+    assert engine.recognized == [3, 1]
+    assert ocr.process(frame(), stream="a").lines == []
+
+
+def test_duplicate_lines_in_one_frame_are_recognized_once():
+    engine = FakeEngine()
+    diff = IncrementalOCR(engine).process(frame(30, 30, 90))
+    assert diff.lines == ["line 30", "line 30", "line 90"]
+    assert engine.recognized == [2]
+
+
+def test_lines_differing_below_quantization_step_share_a_hash_and_text():
+    # 灰度 32 与 47 量化（>> 4）后相同，哈希冲突；与 48 不同
+    a, b, c = (frame(v)[10:10 + LINE_HEIGHT, 10:190] for v in (32, 47, 48))
+    assert crop_hash(a) == crop_hash(b) != crop_hash(c)
+
+    engine = FakeEngine()
+    ocr = IncrementalOCR(engine)
+    ocr.process(frame(32))
+    diff = ocr.process(frame(32, 47))
+    # 冲突的行不再识别，直接复用已缓存的文本
+    assert diff.lines == ["line 32", "line 32"]
+    assert (diff.recognized, diff.reused) == (0, 2)
+    assert diff.added == ["line 32"]
+    assert engine.recognized == [1]
+
+
+def test_sort_boxes_orders_same_row_left_to_right():
+    boxes = [np.array([[x, y], [x + 10, y], [x + 10, y + 5], [x, y + 5]]) for x, y in ((50, 12), (5, 40), (0, 10))]
+    assert [tuple(b[0]) for b in sort_boxes(boxes)] == [(0, 10), (50, 12), (5, 40)]
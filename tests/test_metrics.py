@@ -0,0 +1,63 @@
+# 单元测试 - 指标注册表与 /metrics 接口
+
+import asyncio
+import os
+import sys
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from utils.metrics import MetricsRegistry
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    with registry.timer("capture_details"):
+        pass
+    registry.inc("changes_detected")
+    assert registry.histograms == {} and registry.counters == {}
+    assert registry.format_summary() == "no samples"
+
+
+def test_timer_counts_errors_and_renders_prometheus_text():
+    registry = MetricsRegistry(enabled=True, buckets=(0.1, 1.0))
+    registry.observe("stage", 0.05, stage="ocr")
+    registry.observe("stage", 0.5, stage="ocr")
+    registry.inc("cache_hits", 2)
+    try:
+        with registry.timer("extract_text"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    text = registry.render()
+    assert 'weixin_monitor_stage_seconds_bucket{stage="ocr",le="0.1"} 1' in text
+    assert 'weixin_monitor_stage_seconds_bucket{stage="ocr",le="+Inf"} 2' in text
+    assert 'weixin_monitor_stage_seconds_count{stage="ocr"} 2' in text
+    assert "weixin_monitor_cache_hits_total 2" in text
+    assert 'weixin_monitor_errors_total{operation="extract_text"} 1' in text
+
+
+def test_cancellation_is_not_an_error():
+    registry = MetricsRegistry(enabled=True)
+
+    async def cancelled():
+        with registry.timer("analyze_text"):
+            raise asyncio.CancelledError
+
+    try:
+        asyncio.run(cancelled())
+    except asyncio.CancelledError:
+        pass
+    assert "errors" not in registry.counters
+
+
+def test_http_endpoint():
+    registry = MetricsRegistry(enabled=True)
+    registry.inc("changes_detected")
+    registry.start_server(0)
+    try:
+        port = registry._server.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+    finally:
+        registry.stop_server()
+    assert "weixin_monitor_changes_detected_total 1" in body
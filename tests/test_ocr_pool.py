@@ -0,0 +1,85 @@
+# 单元测试 - 多进程OCR引擎池：按 batch_size / max_wait 凑批、识别异常与工作进程崩溃的传递
+
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.ocr_pool import OCRPool
+
+
+class ValueEngine:
+    """返回图像左上角像素值的假OCR引擎；值为 0 时识别出错，值为 1 时工作进程直接退出"""
+
+    def ocr(self, image, cls=False):
+        value = int(image[0, 0])
+        if value == 0:
+            raise ValueError("bad image")
+        if value == 1:
+            os._exit(1)
+        return [[(None, (f"value {value}", 0.9))]]
+
+
+def image(value):
+    return np.full((4, 4), value, dtype=np.uint8)
+
+
+def test_submit_groups_by_batch_size_and_flushes_after_max_wait():
+    async def scenario(pool):
+        futures = [pool.submit(image(v)) for v in (10, 11, 12, 13, 14)]
+        # 前两批已凑满立即发送，最后一张等待 max_wait
+        assert pool.batches == 2 and len(pool._pending) == 1
+        start = time.perf_counter()
+        last = await futures[-1]
+        waited = time.perf_counter() - start
+        return [await f for f in futures[:-1]] + [last], waited
+
+    pool = OCRPool(workers=1, batch_size=2, max_wait=0.2, engine_factory=ValueEngine)
+    try:
+        pool.warm_up()
+        results, waited = asyncio.run(scenario(pool))
+        assert results == [["value 10"], ["value 11"], ["value 12"], ["value 13"], ["value 14"]]
+        assert waited >= 0.15
+        assert pool.stats() == {"images": 5, "batches": 3, "avg_batch": 1.67}
+    finally:
+        pool.close()
+
+
+def test_recognition_error_fails_only_its_batch():
+    async def scenario(pool):
+        bad = [pool.submit(image(v)) for v in (0, 20)]
+        good = [pool.submit(image(v)) for v in (21, 22)]
+        results = await asyncio.gather(*bad, return_exceptions=True)
+        return results, [await f for f in good]
+
+    pool = OCRPool(workers=1, batch_size=2, max_wait=0.05, engine_factory=ValueEngine)
+    try:
+        bad, good = asyncio.run(scenario(pool))
+        assert all(isinstance(result, ValueError) for result in bad)
+        assert good == [["value 21"], ["value 22"]]
+    finally:
+        pool.close()
+
+
+def test_worker_crash_is_reported_instead_of_hanging():
+    async def scenario(pool):
+        futures = [pool.submit(image(v)) for v in (1, 30)]
+        return await asyncio.wait_for(asyncio.gather(*futures, return_exceptions=True), 30)
+
+    async def submit_files(pool):
+        return await pool.submit_files(["missing.png"])
+
+    pool = OCRPool(workers=1, batch_size=2, max_wait=0.05, engine_factory=ValueEngine)
+    try:
+        results = asyncio.run(scenario(pool))
+        assert all(isinstance(result, BrokenProcessPool) for result in results)
+        with pytest.raises(BrokenProcessPool):
+            asyncio.run(submit_files(pool))
+    finally:
+        pool.close()
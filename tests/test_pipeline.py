@@ -0,0 +1,93 @@
+# 单元测试 - 分阶段异步流水线：block 与 drop_oldest 背压、按目标轮转出队、join 与停止
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.pipeline import BLOCK, DROP_OLDEST, FairQueue, Pipeline, Stage, build_stage, percentile
+
+
+def test_block_policy_makes_producer_wait_for_free_slot():
+    async def scenario():
+        stage = Stage("s", lambda item: item, queue_size=2, policy=BLOCK)
+        await stage.put(1)
+        await stage.put(2)
+        blocked = asyncio.ensure_future(stage.put(3))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        assert stage.queue.get_nowait() == 1
+        stage.queue.task_done()
+        await asyncio.wait_for(blocked, 1)
+        return [stage.queue.get_nowait() for _ in range(2)], stage.dropped
+
+    assert asyncio.run(scenario()) == ([2, 3], 0)
+
+
+def test_drop_oldest_policy_never_blocks_and_counts_drops():
+    async def scenario():
+        stage = Stage("s", lambda item: item, queue_size=2, policy=DROP_OLDEST)
+        for i in range(5):
+            await asyncio.wait_for(stage.put(i), 0.1)
+        return [stage.queue.get_nowait() for _ in range(2)], stage.dropped
+
+    assert asyncio.run(scenario()) == ([3, 4], 3)
+
+
+def test_fair_queue_round_robins_targets_and_drops_from_largest_backlog():
+    async def scenario():
+        queue = FairQueue(10, key=lambda item: item.target)
+        items = [SimpleNamespace(target=t, n=n) for t, n in (("a", 1), ("a", 2), ("a", 3), ("b", 1), ("c", 1))]
+        for item in items:
+            queue.put_nowait(item)
+        dropped = queue.drop_oldest()
+        order = [(item.target, item.n) for item in (queue.get_nowait() for _ in range(4))]
+        return (dropped.target, dropped.n), order
+
+    dropped, order = asyncio.run(scenario())
+    assert dropped == ("a", 1)
+    assert order == [("a", 2), ("b", 1), ("c", 1), ("a", 3)]
+
+
+def test_pipeline_join_waits_for_all_stages_and_stop_cancels_workers():
+    async def scenario():
+        results = []
+
+        async def slow_double(item):
+            await asyncio.sleep(0.01)
+            return None if item == 3 else item * 2
+
+        def collect(item):
+            if item == 8:
+                raise RuntimeError("boom")
+            results.append(item)
+
+        pipeline = Pipeline([Stage("double", slow_double, workers=2), build_stage("collect", collect, None)])
+        pipeline.start()
+        for item in range(1, 6):
+            await pipeline.submit(item)
+        await asyncio.wait_for(pipeline.join(), 2)
+        tasks = list(pipeline.stage("double")._tasks) + list(pipeline.stage("collect")._tasks)
+        await pipeline.stop()
+        return sorted(results), pipeline, tasks
+
+    results, pipeline, tasks = asyncio.run(scenario())
+    # 3 在第一阶段返回 None 不再传递，8 在第二阶段出错
+    assert results == [2, 4, 10]
+    assert pipeline.stage("double").processed == 5
+    assert pipeline.stage("collect").errors == 1
+    assert all(task.cancelled() for task in tasks)
+    with pytest.raises(KeyError):
+        pipeline.stage("missing")
+
+
+def test_unknown_policy_and_percentiles():
+    with pytest.raises(ValueError):
+        Stage("s", print, policy="drop_newest")
+    assert percentile([], 50) == 0.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 99) == 4.0
@@ -0,0 +1,97 @@
+# 单元测试 - 本地预分类规则、模型与升级到大模型
+
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.ai_analyzer import AsyncAIAnalyzer
+from core.prefilter import KeywordRules, PrefilterAnalyzer, PrefilterModel, load_or_train_model
+from core.verdict import FREE_TEXT_CONFIDENCE, NO, UNSURE, YES, Verdict, parse_verdict
+
+RULES = KeywordRules(["Python", "脚本", "爬虫"], [r"(好的|收到|谢谢)[!！]*", r"(\[表情\])+"])
+
+
+class CountingAnalyzer(AsyncAIAnalyzer):
+    def __init__(self):
+        self.calls = 0
+
+    async def analyze_text(self, text, prompt):
+        self.calls += 1
+        return "not sure"
+
+    async def analyze_image(self, image_data, prompt):
+        return "no"
+
+
+def test_rules_short_circuit_and_escalate():
+    analyzer = CountingAnalyzer()
+    prefilter = PrefilterAnalyzer(analyzer, RULES, positive_threshold=2)
+
+    async def run():
+        return [await prefilter.analyze_text(text, "prompt") for text in (
+            "张伟 12:30\n好的！\n李娜 12:31\n[表情][表情]",
+            "能用 Python 写个爬虫吗",
+            "下午三点在会议室开会，请准时参加",
+        )]
+
+    assert [parse_verdict(reply) for reply in asyncio.run(run())] == [
+        Verdict(NO, source="rule"), Verdict(YES, source="rule"), Verdict(UNSURE, FREE_TEXT_CONFIDENCE)]
+    assert analyzer.calls == 1
+    assert prefilter.stats()["llm_rate"] == round(1 / 3, 3)
+
+
+def test_model_separates_training_classes(tmp_path):
+    texts = [f"每天要把{i}个表格合并，能自动处理吗" for i in range(40)] + \
+            [f"今天{i}点在食堂吃饭，大家准时到" for i in range(40)]
+    labels = [True] * 40 + [False] * 40
+    records = [{"text": t, "judgment": l, "source": "llm"} for t, l in zip(texts, labels)]
+    path = str(tmp_path / "model.npz")
+    model = load_or_train_model(path, records, min_samples=50)
+    assert os.path.exists(path)
+    assert model.predict("每天要把99个表格合并，能自动处理吗") > 0.9
+    assert PrefilterModel.load(path).predict("今天99点在食堂吃饭，大家准时到") < 0.1
+
+
+def test_model_needs_enough_samples(tmp_path):
+    records = [{"text": "好的", "judgment": False, "source": "llm"}] * 10
+    assert load_or_train_model(str(tmp_path / "model.npz"), records, min_samples=50) is None
+
+
+def test_model_trains_only_on_llm_judgments(tmp_path):
+    records = [{"text": f"每天合并{i}个表格", "judgment": True, "source": "llm"} for i in range(30)] + \
+              [{"text": f"今天{i}点吃饭", "judgment": False, "source": source}
+               for i in range(30) for source in ("rule", "model", None)]
+    # 只有大模型的判断计入样本：30 条且只有一个类别
+    assert load_or_train_model(str(tmp_path / "model.npz"), records, min_samples=20) is None
+
+
+def test_model_loads_in_background_while_rules_keep_working():
+    analyzer = CountingAnalyzer()
+    model = PrefilterModel()
+    model.train([f"每天要把{i}个表格合并" for i in range(20)] + [f"今天{i}点吃饭" for i in range(20)],
+                [True] * 20 + [False] * 20)
+    release = threading.Event()
+
+    def loader():
+        release.wait(5)
+        return model
+
+    prefilter = PrefilterAnalyzer(analyzer, RULES, model_loader=loader)
+
+    async def run():
+        first = await prefilter.analyze_text("每天要把99个表格合并", "prompt")
+        # 训练完成前不确定的消息交给下游
+        assert prefilter.model is None and analyzer.calls == 1
+        release.set()
+        await prefilter.load_model()
+        second = await prefilter.analyze_text("每天要把99个表格合并", "prompt")
+        await prefilter.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert prefilter.model is model
+    assert parse_verdict(first) == Verdict(UNSURE, FREE_TEXT_CONFIDENCE)
+    assert parse_verdict(second) == Verdict(YES, source="model")
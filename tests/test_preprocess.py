@@ -0,0 +1,108 @@
+# 单元测试 - OCR预处理流水线：配置解析、默认步骤、ROI裁剪、按文本高度缩放与方向分类开关
+
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.frame import Frame
+from core.ocr_processor import OCRProcessor
+from core.preprocess import Clahe, Crop, Preprocessor, Scale, Threshold, text_height
+
+
+def details_window(line_height=14, lines=8):
+    """深色标题栏 + 白底消息列表，列表中有若干深色“文本行”，右侧与底部留白"""
+    image = np.full((600, 500), 250, dtype=np.uint8)
+    image[:40] = 60
+    for row in range(lines):
+        y = 60 + row * line_height * 2
+        image[y:y + line_height, 30:300] = 20
+    return image
+
+
+def chat_with_avatars(line_height=13, gap=4, messages=6):
+    """每条消息左侧一个 40 像素的头像，右侧三行文本；头像高度跨过多行文本"""
+    image = np.full((messages * 70 + 20, 480), 245, dtype=np.uint8)
+    for message in range(messages):
+        y = 10 + message * 70
+        image[y:y + 40, 10:50] = 90
+        for line in range(3):
+            top = y + line * (line_height + gap)
+            image[top:top + line_height, 60:60 + 400 - line * 80] = 30
+    return image
+
+
+class ShapeEngine:
+    """返回输入图像尺寸并记录 cls 参数的假OCR引擎"""
+
+    def __init__(self):
+        self.cls = []
+
+    def ocr(self, image, cls=False):
+        self.cls.append(cls)
+        return [[(None, (f"{image.shape[1]}x{image.shape[0]}", 0.9))]]
+
+
+def test_default_stages_match_fixed_clahe_threshold():
+    image = np.random.default_rng(0).integers(0, 256, size=(120, 160), dtype=np.uint8)
+    enhanced = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(image)
+    expected = cv2.threshold(enhanced, 180, 255, cv2.THRESH_BINARY)[1]
+    frame = Frame(image, "GRAY")
+    result = Preprocessor().apply(frame)
+    assert np.array_equal(result, expected)
+    assert Preprocessor().apply(frame) is result
+    assert Preprocessor().prepare(frame).shape == (120, 160, 3)
+
+
+def test_from_config_builds_stages_and_rejects_unknown_ones():
+    preprocessor = Preprocessor.from_config([
+        {"type": "crop", "top": 40, "trim": True},
+        {"type": "scale", "text_height": 24},
+        {"type": "clahe"},
+        {"type": "threshold", "value": 0},
+    ])
+    assert preprocessor.stages == (Crop(top=40, trim=True), Scale(text_height=24), Clahe(), Threshold(value=0))
+    assert Preprocessor.from_config(None).stages == (Clahe(), Threshold())
+    with pytest.raises(ValueError, match="deskew"):
+        Preprocessor.from_config([{"type": "deskew"}])
+    with pytest.raises(ValueError, match="crop"):
+        Preprocessor.from_config([{"type": "crop", "margin": 3}])
+
+
+def test_crop_removes_title_bar_and_trims_background_margins():
+    image = details_window()
+    assert Crop(top=40)(image).shape == (560, 500)
+    cropped = Crop(top=40, trim=True, padding=4)(image)
+    # 文本行占 y 60..270、x 30..300（裁掉标题栏后 y 20..230），四周各留 4 像素
+    assert cropped.shape == (210 + 8, 270 + 8)
+    assert cropped[0, 0] == 250 and cropped[4, 4] == 20
+
+
+def test_scale_downscales_only_tall_text():
+    assert text_height(details_window(line_height=16)) == 16
+    # 整行统计时头像把三行文本连成一段，测得 40 以上
+    assert text_height(chat_with_avatars()) == 13
+    assert Scale(text_height=32)(chat_with_avatars()).shape == chat_with_avatars().shape
+    small = details_window(line_height=16)
+    assert Scale(text_height=32)(small) is small
+    large = details_window(line_height=48, lines=5)
+    scaled = Scale(text_height=32)(large)
+    assert scaled.shape == (400, 333)
+    assert abs(text_height(scaled) - 32) <= 1
+
+
+def test_processor_skips_angle_classifier_and_uses_preprocessor(tmp_path):
+    path = str(tmp_path / "shot.png")
+    cv2.imwrite(path, details_window())
+    engine = ShapeEngine()
+    processor = OCRProcessor(str(tmp_path), engine=engine,
+                             preprocessor=Preprocessor([Crop(top=40), Threshold()]))
+    assert processor.recognize_file(path) == "500x560"
+    assert engine.cls == [False]
+    processor = OCRProcessor(str(tmp_path), engine=engine, use_angle_cls=True)
+    assert processor.recognize_file(path) == "500x600"
+    assert engine.cls == [False, True]
@@ -0,0 +1,67 @@
+# 单元测试 - 截图轨迹录制与回放（无需 Windows）
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.frame import Frame, BGRX
+from core.replay import RecordingWindowManager, ReplayWindowManager
+from core.window_manager import WindowManager
+
+
+class FakeWindowManager(WindowManager):
+    def __init__(self):
+        self.value = 0
+
+    def find_window(self, title):
+        return {"hwnd": 7, "x": 0, "y": 0, "width": 40, "height": 30} if title == "main" else None
+
+    def capture_screenshot(self, hwnd, region=None):
+        return Frame(np.full((30, 40, 4), self.value, dtype=np.uint8), BGRX)
+
+    def simulate_click(self, hwnd, x, y):
+        self.value += 10
+
+
+def record(trace_dir):
+    inner = FakeWindowManager()
+    now = [0.0]
+    recorder = RecordingWindowManager(inner, trace_dir, clock=lambda: now[0])
+    info = recorder.find_window("main")
+    for i in range(4):
+        now[0] = float(i)
+        recorder.capture_screenshot(info["hwnd"])
+        if i == 1:
+            recorder.simulate_click(info["hwnd"], 1, 1)
+    recorder.close()
+
+
+def test_round_trip_deduplicates_frames(tmp_path):
+    record(str(tmp_path))
+    # 两种画面各保存一次
+    assert len(os.listdir(tmp_path / "frames")) == 2
+    replay = ReplayWindowManager(str(tmp_path), speed=0)
+    info = replay.find_window("main")
+    assert info["hwnd"] == 7
+    assert replay.find_window("missing") is None
+    values = []
+    while not replay.exhausted:
+        frame = replay.capture_screenshot(info["hwnd"])
+        values.append(int(frame.buffer[0, 0, 0]))
+    assert values == [0, 0, 10, 10]
+    assert replay.clock() == 3.0
+    assert replay.capture_screenshot(info["hwnd"]) is None
+
+
+def test_loop_keeps_clock_monotonic(tmp_path):
+    record(str(tmp_path))
+    replay = ReplayWindowManager(str(tmp_path), speed=0, loop=True)
+    times = []
+    for _ in range(6):
+        assert replay.capture_screenshot(7) is not None
+        times.append(replay.clock())
+    assert times == sorted(times)
+    assert times[-1] > 3.0
@@ -0,0 +1,174 @@
+# 单元测试 - 离线批量重处理：结果存储、判断、检查点续跑、进程池读文件与速度估计
+
+import asyncio
+import itertools
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.ocr_pool import OCRPool
+from core.ocr_processor import OCRProcessor
+from core.result_store import JsonlResultStore
+from core.verdict import Verdict
+from services.reprocess_service import BatchReprocessor, Checkpoint, Throughput, iter_images
+
+
+class WidthEngine:
+    """按图像宽度返回文本的假OCR引擎"""
+
+    def ocr(self, image, cls=False):
+        return [[(None, (f"width {image.shape[1]}", 0.9))]]
+
+
+class FakeAnalysis:
+    def __init__(self):
+        self.texts = []
+
+    async def judge_text(self, text):
+        self.texts.append(text)
+        return Verdict("yes" if text == "width 40" else "no", 0.9)
+
+    def should_alert(self, verdict):
+        return verdict.is_positive()
+
+
+class FailingAnalysis(FakeAnalysis):
+    """width 30 的请求失败（None），width 40 的判断抛出异常"""
+
+    async def judge_text(self, text):
+        if text == "width 40":
+            raise RuntimeError("boom")
+        return None if text == "width 30" else await super().judge_text(text)
+
+
+class UncertainAnalysis(FakeAnalysis):
+    """width 40 为低置信度 yes（不提示），width 50 为 not sure"""
+
+    async def judge_text(self, text):
+        self.texts.append(text)
+        return {"width 40": Verdict("yes", 0.3), "width 50": Verdict("not sure", 0.9)}.get(text, Verdict("no", 0.9))
+
+
+def make_images(folder):
+    os.makedirs(os.path.join(folder, "2024-05"))
+    for i, width in enumerate((20, 30, 40, 50, 60)):
+        subfolder = "2024-05" if i >= 3 else ""
+        cv2.imwrite(os.path.join(folder, subfolder, f"shot{i}.png"), np.full((10, width), 255, dtype=np.uint8))
+    with open(os.path.join(folder, "broken.png"), "wb") as f:
+        f.write(b"not an image")
+    with open(os.path.join(folder, "notes.txt"), "w") as f:
+        f.write("skip me")
+
+
+def run(folder, output, limit=None, analysis=None):
+    store = JsonlResultStore(output)
+    checkpoint = Checkpoint(os.path.join(output, "checkpoint.txt"))
+    processor = OCRProcessor(output, store=store, engine=WidthEngine())
+    analysis = analysis or FakeAnalysis()
+    reprocessor = BatchReprocessor(processor, checkpoint, folder, analysis, batch_size=2)
+    paths = itertools.islice(iter_images(folder), limit) if limit else iter_images(folder)
+    stats = asyncio.run(reprocessor.run(paths, total=limit or 6))
+    checkpoint.close()
+    records = list(store.query())
+    store.close()
+    return stats, records, analysis
+
+
+def test_reprocess_writes_results_and_resumes_from_checkpoint(tmp_path):
+    folder, output = str(tmp_path / "screenshots"), str(tmp_path / "out")
+    make_images(folder)
+    names = [os.path.relpath(p, folder).replace(os.sep, "/") for p in iter_images(folder)]
+    assert names == ["broken.png", "shot0.png", "shot1.png", "shot2.png", "2024-05/shot3.png",
+                     "2024-05/shot4.png"]
+
+    stats, records, analysis = run(folder, output, limit=3)
+    assert stats["processed"] == 3 and stats["failed"] == 1
+    assert len(records) == 2
+
+    stats, records, analysis = run(folder, output)
+    assert stats == {"processed": 3, "skipped": 3, "failed": 0, "positive": 1}
+    assert sorted(analysis.texts) == ["width 40", "width 50", "width 60"]
+    assert sorted(r["text"] for r in records) == ["width 20", "width 30", "width 40", "width 50", "width 60"]
+    by_text = {r["text"]: r for r in records}
+    assert by_text["width 40"]["judgment"] is True
+    assert by_text["width 50"]["judgment"] is False
+    assert by_text["width 60"]["file"] == "2024-05/shot4.png"
+    assert by_text["width 60"]["timestamp"] == os.path.getmtime(os.path.join(folder, "2024-05", "shot4.png"))
+
+
+def test_failed_judgments_are_not_checkpointed_and_retried(tmp_path):
+    folder, output = str(tmp_path / "screenshots"), str(tmp_path / "out")
+    make_images(folder)
+    stats, records, analysis = run(folder, output, analysis=FailingAnalysis())
+    # broken.png 无法读取，shot1 判断失败，shot2 判断出错
+    assert stats["failed"] == 3 and stats["processed"] == 6
+    assert {r["text"]: r["judgment"] for r in records}["width 30"] is None
+
+    stats, records, analysis = run(folder, output)
+    assert stats == {"processed": 2, "skipped": 4, "failed": 0, "positive": 1}
+    assert sorted(analysis.texts) == ["width 30", "width 40"]
+
+
+def test_stored_judgment_is_the_verdict_label_not_the_alert(tmp_path):
+    folder, output = str(tmp_path / "screenshots"), str(tmp_path / "out")
+    make_images(folder)
+    stats, records, analysis = run(folder, output, analysis=UncertainAnalysis())
+    assert stats["positive"] == 0
+    by_text = {r["text"]: r for r in records}
+    assert (by_text["width 40"]["judgment"], by_text["width 40"]["confidence"]) == (True, 0.3)
+    assert by_text["width 50"]["judgment"] is None  # not sure 不作为负样本
+    assert (by_text["width 60"]["judgment"], by_text["width 60"]["source"]) == (False, "llm")
+
+
+def test_batch_task_errors_are_counted_not_lost(tmp_path):
+    folder, output = str(tmp_path / "screenshots"), str(tmp_path / "out")
+    make_images(folder)
+    checkpoint = Checkpoint(os.path.join(output, "checkpoint.txt"))
+    processor = OCRProcessor(output, store=JsonlResultStore(output), engine=WidthEngine())
+    reprocessor = BatchReprocessor(processor, checkpoint, folder, batch_size=4)
+
+    async def crash(batch):
+        raise RuntimeError("boom")
+
+    reprocessor._process_batch = crash
+    stats = asyncio.run(reprocessor.run(iter_images(folder), total=6))
+    checkpoint.close()
+    processor.store.close()
+    assert stats["failed"] == 6 and len(checkpoint) == 0
+
+
+def test_pool_reads_and_recognizes_files_in_workers(tmp_path):
+    good = str(tmp_path / "good.png")
+    bad = str(tmp_path / "bad.png")
+    cv2.imwrite(good, np.full((10, 30), 255, dtype=np.uint8))
+    with open(bad, "wb") as f:
+        f.write(b"\x89PNG broken")
+
+    async def submit(pool):
+        return await pool.submit_files([good, bad])
+
+    pool = OCRPool(workers=1, engine_factory=WidthEngine)
+    try:
+        assert asyncio.run(submit(pool)) == [["width 30"], None]
+    finally:
+        pool.close()
+
+
+def test_throughput_uses_recent_rate_for_eta():
+    now = [0.0]
+    meter = Throughput(total=100, window=10, clock=lambda: now[0])
+    for _ in range(10):
+        now[0] += 1
+        meter.update()
+    assert meter.rate == 1.0
+    assert meter.eta == 90
+    for _ in range(20):
+        now[0] += 0.5
+        meter.update()
+    assert meter.rate == 2.0
+    assert meter.eta == 35
+    assert meter.format() == "30/100 images (30.0%), 2.00 images/s, ETA 00:00:35"
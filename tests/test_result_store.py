@@ -0,0 +1,95 @@
+# 单元测试 - OCR结果存储：追加、查询、判断结果、JSONL 索引重建与分段滚动、SQLite 定时提交
+
+import os
+import sqlite3
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.result_store import JsonlResultStore, SqliteResultStore, create_result_store
+
+
+def fill(store):
+    ids = [store.append({"timestamp": t, "file": f"shot{t}.png", "text": f"text {t}"}) for t in (30, 10, 20)]
+    store.set_judgment(ids[1], True, "llm", 0.8)
+    store.set_judgment(ids[2], False, "rule")
+    return ids
+
+
+@pytest.mark.parametrize("backend", ["jsonl", "sqlite"])
+def test_append_query_and_judgments(tmp_path, backend):
+    store = create_result_store(str(tmp_path), backend=backend)
+    ids = fill(store)
+    assert len(store) == 3 and len(set(ids)) == 3
+    assert [r["timestamp"] for r in store.query()] == [10, 20, 30]
+    assert [r["file"] for r in store.query(since=15, until=30)] == ["shot20.png", "shot30.png"]
+    assert [r["text"] for r in store.query(judgment=True)] == ["text 10"]
+    assert [r["judgment"] for r in store.query()] == [True, False, None]
+    assert [r["source"] for r in store.query()] == ["llm", "rule", None]
+    assert [r["confidence"] for r in store.query()] == [0.8, None, None]
+    store.close()
+
+    reopened = create_result_store(str(tmp_path), backend=backend)
+    assert [r["judgment"] for r in reopened.query()] == [True, False, None]
+    assert [r["source"] for r in reopened.query()] == ["llm", "rule", None]
+    assert [r["confidence"] for r in reopened.query()] == [0.8, None, None]
+    assert reopened.append({"timestamp": 40, "file": "next.png", "text": None}) == max(ids) + 1
+    reopened.close()
+
+
+def test_jsonl_rebuilds_missing_index(tmp_path):
+    store = JsonlResultStore(str(tmp_path))
+    fill(store)
+    store.close()
+    os.remove(os.path.join(str(tmp_path), "ocr_results.idx"))
+    with open(os.path.join(str(tmp_path), store._segment_name), "a", encoding="utf-8") as f:
+        f.write("{broken\n")
+
+    rebuilt = JsonlResultStore(str(tmp_path))
+    assert os.path.exists(rebuilt.index_path)
+    assert [(r["text"], r["judgment"], r["source"], r["confidence"]) for r in rebuilt.query()] == [
+        ("text 10", True, "llm", 0.8), ("text 20", False, "rule", None), ("text 30", None, None, None)]
+    rebuilt.close()
+
+
+def test_sqlite_adds_source_and_confidence_columns_to_old_tables(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "ocr_results.db"))
+    conn.execute("CREATE TABLE ocr_results (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp REAL NOT NULL, "
+                 "file TEXT, text TEXT, judgment INTEGER)")
+    conn.execute("INSERT INTO ocr_results (timestamp, file, text, judgment) VALUES (1, 'a.png', 'old', 1)")
+    conn.commit()
+    conn.close()
+    store = SqliteResultStore(str(tmp_path))
+    assert [(r["text"], r["judgment"], r["source"], r["confidence"]) for r in store.query()] == [
+        ("old", True, None, None)]
+    store.close()
+
+
+def test_jsonl_rotates_segments_by_size(tmp_path):
+    store = JsonlResultStore(str(tmp_path), max_bytes=200)
+    for i in range(10):
+        store.append({"timestamp": i + 1, "file": f"{i}.png", "text": "x" * 50})
+    segments = store._segments()
+    store.close()
+    assert len(segments) > 1
+    assert all(os.path.getsize(os.path.join(str(tmp_path), name)) < 200 + 150 for name in segments)
+    reopened = JsonlResultStore(str(tmp_path))
+    assert [r["file"] for r in reopened.query()] == [f"{i}.png" for i in range(10)]
+    reopened.close()
+
+
+def test_sqlite_commits_idle_writes_within_batch_interval(tmp_path):
+    store = SqliteResultStore(str(tmp_path), batch_size=100, batch_interval=0.1)
+    store.append({"timestamp": 1, "file": "a.png", "text": "a"})
+    reader = sqlite3.connect(store.db_path)
+    count = lambda: reader.execute("SELECT COUNT(*) FROM ocr_results").fetchone()[0]
+    assert count() == 0
+    deadline = time.monotonic() + 2
+    while count() == 0 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert count() == 1
+    reader.close()
+    store.close()
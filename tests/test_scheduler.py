@@ -0,0 +1,61 @@
+# 单元测试 - 变化事件合并调度：静默期合并、最长延迟上界、关闭后丢弃
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.scheduler import CoalescingScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_within_quiet_period_dispatches_once():
+    clock = FakeClock()
+    scheduler = CoalescingScheduler(quiet_period=2.0, max_delay=10.0, clock=clock, target="a")
+    assert scheduler.poll() is None and scheduler.time_until_due() is None
+    scheduler.submit([(40, 60)])
+    for _ in range(3):
+        clock.now += 1.0
+        scheduler.submit([(0, 20), (40, 60)])
+        assert scheduler.poll() is None
+    assert scheduler.time_until_due() == 2.0
+    clock.now += 2.0
+    work = scheduler.poll()
+    assert work.events == 4 and work.tiles == [(0, 20), (40, 60)] and work.target == "a"
+    assert scheduler.poll() is None
+    assert scheduler.stats() == {"submitted": 4, "coalesced": 3, "dispatched": 1, "dropped": 0,
+                                 "max_latency": 5.0}
+
+
+def test_continuous_burst_is_dispatched_after_max_delay():
+    clock = FakeClock()
+    scheduler = CoalescingScheduler(quiet_period=2.0, max_delay=5.0, clock=clock)
+    dispatched = []
+    for _ in range(12):
+        scheduler.submit()
+        work = scheduler.poll()
+        if work is not None:
+            dispatched.append((clock.now, work.events))
+        clock.now += 1.0
+    # 每秒一个事件，静默期永远不会结束，只能由 max_delay 派发
+    assert dispatched == [(105.0, 6), (111.0, 6)]
+    assert scheduler.max_latency == 5.0
+
+
+def test_configure_keeps_max_delay_at_least_quiet_period_and_close_drops_events():
+    clock = FakeClock()
+    scheduler = CoalescingScheduler(quiet_period=2.0, max_delay=10.0, clock=clock)
+    scheduler.configure(quiet_period=4.0, max_delay=1.0)
+    assert scheduler.max_delay == 4.0
+    scheduler.submit()
+    work = scheduler.close()
+    assert work.events == 1 and scheduler.pending is None
+    scheduler.submit()
+    assert scheduler.pending is None and scheduler.dropped == 1
@@ -0,0 +1,105 @@
+# 单元测试 - 延迟导入、OCR引擎后台加载、AI客户端预热与启动耗时记录
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.ai_analyzer import AsyncDashscopeAnalyzer
+from core.ocr_processor import LazyEngine
+from stub_chat_server import StubChatServer
+from utils.startup import StartupProfile
+
+
+class FakeEngine:
+    def ocr(self, image, cls=True):
+        return [[(None, ("hello", 0.9))]]
+
+
+def test_importing_main_defers_heavy_modules():
+    code = ("import sys; sys.path.insert(0, sys.argv[1]); import main; "
+            "print(','.join(m for m in ('openai', 'httpx', 'paddleocr', 'pygame', 'yaml', 'http.server') "
+            "if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code, SRC], capture_output=True, text=True, timeout=60,
+                            cwd=os.path.join(SRC, ".."))
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
+
+
+def test_importing_main_adds_no_log_file_and_logs_nothing(tmp_path):
+    code = "import sys; sys.path.insert(0, sys.argv[1]); import main"
+    result = subprocess.run([sys.executable, "-c", code, SRC], capture_output=True, text=True, timeout=60,
+                            cwd=str(tmp_path))
+    assert result.returncode == 0, result.stderr
+    assert result.stderr == ""
+    assert not os.path.exists(tmp_path / "logs")
+
+
+def test_lazy_engine_loads_in_background():
+    calls = []
+
+    def loader():
+        calls.append(threading.current_thread().name)
+        time.sleep(0.2)
+        return FakeEngine()
+
+    start = time.perf_counter()
+    engine = LazyEngine(loader, background=True)
+    assert time.perf_counter() - start < 0.1
+    assert not engine.ready
+    assert engine.ocr(None)[0][0][1][0] == "hello"
+    assert engine.ready
+    engine.get()
+    assert calls == ["ocr-warm-up"]
+
+
+def test_lazy_engine_loads_on_first_use_without_background():
+    calls = []
+    engine = LazyEngine(lambda: calls.append(1) or FakeEngine())
+    assert calls == []
+    assert isinstance(engine.get(), FakeEngine)
+    engine.ocr(None)
+    assert calls == [1]
+
+
+def test_lazy_engine_reraises_load_errors():
+    def loader():
+        raise RuntimeError("model missing")
+
+    engine = LazyEngine(loader, background=True)
+    with pytest.raises(RuntimeError, match="model missing"):
+        engine.ocr(None)
+
+
+def test_analyzer_creates_client_on_warm_up():
+    async def run(server):
+        analyzer = AsyncDashscopeAnalyzer(api_key="test", base_url=server.base_url)
+        assert analyzer.http_client is None
+        await analyzer.warm_up()
+        assert analyzer.http_client is not None
+        try:
+            return await analyzer.analyze_text("message", "prompt")
+        finally:
+            await analyzer.aclose()
+
+    with StubChatServer(reply="yes") as server:
+        assert asyncio.run(run(server)) == "yes"
+
+
+def test_startup_profile_orders_marks_from_threads():
+    profile = StartupProfile()
+    profile.mark("imports")
+    thread = threading.Thread(target=profile.mark, args=("ocr engine ready",))
+    thread.start()
+    thread.join()
+    report = profile.format_report().splitlines()
+    assert [line.split()[-1] for line in report] == ["imports", "ready"]
+    assert "ocr engine ready" in report[1]
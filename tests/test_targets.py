@@ -0,0 +1,127 @@
+# 单元测试 - 多目标配置、公平队列与按来源的增量OCR
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.incremental_ocr import IncrementalOCR
+from core.pipeline import DROP_OLDEST, Stage
+from core.targets import load_targets
+
+
+class DictConfig:
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, key, default=None):
+        value = self.data
+        for k in key.split("."):
+            if not isinstance(value, dict) or k not in value:
+                return default
+            value = value[k]
+        return value
+
+
+BASE = {
+    "app": {"window_title": "main", "details_window_title": "details"},
+    "chat_box": {"x": 310, "y_offset": -290, "width": 330, "height": 150},
+}
+
+
+def test_legacy_config_is_a_single_target():
+    targets = load_targets(DictConfig(BASE))
+    assert len(targets) == 1
+    assert targets[0].name == "default"
+    assert targets[0].window_title == "main"
+    assert targets[0].chat_box["width"] == 330
+
+
+def test_targets_override_global_settings():
+    config = DictConfig({**BASE, "targets": [{"name": "a"}, {"name": "b", "window_title": "other",
+                                                              "chat_box": {"x": 10}}]})
+    a, b = load_targets(config)
+    assert (a.window_title, a.chat_box["x"]) == ("main", 310)
+    assert (b.window_title, b.chat_box["x"], b.chat_box["width"]) == ("other", 10, 330)
+
+
+def test_targets_are_immutable_and_hashable():
+    config = DictConfig(BASE)
+    target, = load_targets(config)
+    with pytest.raises(TypeError):
+        target.chat_box["x"] = 0
+    BASE["chat_box"]["x"] = 1
+    try:
+        assert target.chat_box["x"] == 310
+    finally:
+        BASE["chat_box"]["x"] = 310
+    assert target == load_targets(config)[0]
+    assert len({target, load_targets(config)[0]}) == 1
+
+
+def test_fair_stage_alternates_targets():
+    async def run():
+        order = []
+
+        async def handler(item):
+            order.append(item.target)
+
+        stage = Stage("details", handler, queue_size=16, fair=True)
+        for _ in range(4):
+            await stage.put(SimpleNamespace(target="busy"))
+        await stage.put(SimpleNamespace(target="quiet"))
+        stage.start()
+        await stage.queue.join()
+        await stage.stop()
+        return order
+
+    assert asyncio.run(run())[:3] == ["busy", "quiet", "busy"]
+
+
+def test_fair_drop_oldest_drops_from_the_busiest_target():
+    async def run():
+        stage = Stage("detect", lambda item: item, queue_size=3, policy=DROP_OLDEST, fair=True)
+        for i in range(3):
+            await stage.put(SimpleNamespace(target="busy", i=i))
+        await stage.put(SimpleNamespace(target="quiet", i=0))
+        return stage, [stage.queue.get_nowait() for _ in range(stage.queue.qsize())]
+
+    stage, items = asyncio.run(run())
+    assert stage.dropped == 1
+    assert [(item.target, item.i) for item in items] == [("busy", 1), ("quiet", 0), ("busy", 2)]
+
+
+class LineEngine:
+    """每个非空行带识别为其灰度值"""
+
+    def text_detector(self, image):
+        boxes = []
+        for y in range(0, image.shape[0], 10):
+            if image[y, 0, 0]:
+                boxes.append(np.array([[0, y], [20, y], [20, y + 8], [0, y + 8]], dtype=np.float32))
+        return boxes, 0.0
+
+    def text_recognizer(self, crops):
+        return [(str(int(crop[0, 0, 0])), 0.99) for crop in crops], 0.0
+
+
+def image(*values):
+    img = np.zeros((len(values) * 10, 20, 3), dtype=np.uint8)
+    for i, value in enumerate(values):
+        img[i * 10:i * 10 + 8] = value
+    return img
+
+
+def test_incremental_ocr_diffs_per_stream():
+    ocr = IncrementalOCR(LineEngine())
+    assert ocr.process(image(40, 120), "a").added == ["40", "120"]
+    assert ocr.process(image(200), "b").added == ["200"]
+    # 另一来源的帧不影响 a 的新增行计算，识别缓存仍共享
+    diff = ocr.process(image(40, 120, 200), "a")
+    assert diff.added == ["200"]
+    assert diff.reused == 3
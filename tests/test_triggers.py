@@ -0,0 +1,84 @@
+# 单元测试 - 自适应轮询间隔与事件唤醒
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.triggers import AdaptivePoller, ChangeTrigger, ManualTriggerSource, create_trigger_sources
+
+
+class InactiveSource(ManualTriggerSource):
+    """模拟钩子安装失败的事件来源"""
+
+    @property
+    def active(self):
+        return False
+
+
+def test_poller_backs_off_when_idle_and_resets_on_activity():
+    now = [0.0]
+    poller = AdaptivePoller(min_interval=0.5, max_interval=4.0, backoff=2.0, idle_after=10.0,
+                            clock=lambda: now[0])
+    assert poller.next_interval() == 0.5
+    now[0] = 11.0
+    assert [poller.next_interval() for _ in range(4)] == [1.0, 2.0, 4.0, 4.0]
+    poller.activity()
+    assert poller.next_interval() == 0.5
+
+
+def test_trigger_wakes_on_event_before_timer():
+    async def run():
+        source = ManualTriggerSource()
+        trigger = ChangeTrigger(AdaptivePoller(min_interval=5.0, max_interval=5.0), [source], debounce=0.0)
+        trigger.start()
+        asyncio.get_running_loop().call_later(0.01, source.fire)
+        reason = await asyncio.wait_for(trigger.wait(), 1.0)
+        timed_out = await trigger.wait(timeout=0.01)
+        trigger.stop()
+        return reason, timed_out, trigger.wakeups
+
+    reason, timed_out, wakeups = asyncio.run(run())
+    assert reason == "event"
+    assert timed_out == "timer"
+    assert wakeups == {"timer": 1, "event": 1}
+
+
+def test_no_event_sources_off_windows():
+    assert create_trigger_sources("none", [1]) == []
+    if sys.platform != "win32":
+        assert create_trigger_sources("auto", [1]) == []
+
+
+def test_poll_interval_falls_back_without_active_event_source():
+    async def run(sources):
+        trigger = ChangeTrigger(AdaptivePoller(min_interval=3.0, max_interval=30.0), sources,
+                                fallback_max_interval=6.5)
+        trigger.start()
+        limits = [trigger.poller.max_interval]
+        trigger.configure(3.0, 60.0, 1.1, 20.0, 0.2, 30, 8.0)
+        limits.append(trigger.poller.max_interval)
+        trigger.stop()
+        return limits
+
+    assert asyncio.run(run([])) == [6.5, 8.0]
+    assert asyncio.run(run([InactiveSource()])) == [6.5, 8.0]
+    assert asyncio.run(run([ManualTriggerSource()])) == [30.0, 60.0]
+
+
+def test_event_wakeups_are_capped_per_minute():
+    async def run():
+        source = ManualTriggerSource()
+        trigger = ChangeTrigger(AdaptivePoller(min_interval=0.05, max_interval=0.05), [source], debounce=0.0,
+                                max_event_wakeups=2)
+        trigger.start()
+        reasons = []
+        for _ in range(4):
+            source.fire()
+            reasons.append(await asyncio.wait_for(trigger.wait(), 1.0))
+        trigger.stop()
+        return reasons
+
+    # 超出上限的事件推迟到定时唤醒
+    assert asyncio.run(run()) == ["event", "event", "timer", "timer"]
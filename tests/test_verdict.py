@@ -0,0 +1,47 @@
+# 单元测试 - AI判断结果解析
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.verdict import FREE_TEXT_CONFIDENCE, NO, UNSURE, YES, Verdict, format_verdict, parse_verdict
+
+
+def test_parses_json_and_clamps_confidence():
+    assert parse_verdict('{"label": "Yes", "confidence": 0.8}') == Verdict(YES, 0.8)
+    assert parse_verdict('```json\n{"label": "no", "confidence": 3}\n```') == Verdict(NO, 1.0)
+    assert parse_verdict('{"label": "unsure"}') == Verdict(UNSURE, 1.0)
+
+
+def test_plain_text_must_start_with_label():
+    assert parse_verdict("Yes. Python would help here.") == Verdict(YES, FREE_TEXT_CONFIDENCE)
+    assert parse_verdict("not sure, yes maybe") == Verdict(UNSURE, FREE_TEXT_CONFIDENCE)
+    assert parse_verdict(" no ") == Verdict(NO, FREE_TEXT_CONFIDENCE)
+    assert parse_verdict("是否需要？Yes！") == Verdict(UNSURE, 0.0, parsed=False)
+    assert not parse_verdict("eyes").parsed
+    assert not parse_verdict("No idea").parsed
+    assert not parse_verdict("yes/no").parsed
+    assert not parse_verdict("Yesterday it worked").parsed
+    assert not parse_verdict('{"label": "perhaps"}').parsed
+    assert not parse_verdict(None).parsed
+
+
+def test_threshold():
+    assert parse_verdict("Yes.").is_positive(0.5)
+    assert not parse_verdict("Yes.").is_positive(0.8)
+    assert Verdict(YES, 0.7).is_positive(0.5)
+    assert not Verdict(YES, 0.4).is_positive(0.5)
+    assert not Verdict(UNSURE, 1.0).is_positive(0.0)
+
+
+def test_stored_judgment_follows_label_not_threshold():
+    assert Verdict(YES, 0.1).judgment is True
+    assert Verdict(NO, 0.9).judgment is False
+    assert Verdict(UNSURE, 1.0).judgment is None
+    assert parse_verdict("eyes").judgment is None
+
+
+def test_local_verdicts_keep_their_source():
+    assert parse_verdict(format_verdict(NO, "rule")) == Verdict(NO, source="rule")
+    assert parse_verdict('{"label": "yes"}').source == "llm"
@@ -0,0 +1,99 @@
+# 单元测试 - AI判断结果缓存：文本规范化、LRU 与 TTL、SQLite 持久层、并发请求合并
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.ai_analyzer import AsyncAIAnalyzer
+from core.verdict_cache import CachingAnalyzer, VerdictCache, cache_key, normalize_text
+
+
+@pytest.mark.parametrize("a, b", [
+    ("张三 21:52:19\n明天发货", "张三 09:03\n明天发货"),
+    ("2025-05-15 会议", "2025/5/16 会议"),
+    ("5月15日 到货", "12月1日 到货"),
+    ("２０２５年５月１５日　ＯＫ", "2024年1月2日 ok"),
+])
+def test_normalize_ignores_times_dates_width_and_case(a, b):
+    assert normalize_text(a) == normalize_text(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("升级到 Python 3.11", "升级到 Python 3.12"),
+    ("报价 12.50 元", "报价 99.99 元"),
+    ("数量 13/40", "数量 13/41"),
+    ("版本 1.2.3", "版本 1.2.4"),
+])
+def test_normalize_keeps_decimals_versions_and_non_dates(a, b):
+    assert normalize_text(a) != normalize_text(b)
+
+
+def test_cache_key_depends_on_prompt_and_model():
+    key = cache_key("text", "abc", "prompt", "model")
+    assert key == cache_key("text", "abc", "prompt", "model")
+    assert key != cache_key("text", "abc", "other prompt", "model")
+    assert key != cache_key("text", "abc", "prompt", "other model")
+    assert key != cache_key("image", "abc", "prompt", "model")
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    cache = VerdictCache(max_entries=2, ttl=10)
+    cache.put("a", "yes")
+    cache.put("b", "no")
+    assert cache.get("a") == "yes"
+    cache.put("c", "yes")
+    assert cache.get("b") is None and cache.evictions == 1
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "verdicts.db")
+    cache = VerdictCache(db_path=path)
+    cache.put("k", "yes")
+    cache.close()
+    reopened = VerdictCache(db_path=path)
+    assert reopened.get("k") == "yes"
+    assert reopened.disk_hits == 1
+    assert reopened.get("k") == "yes"
+    assert reopened.disk_hits == 1
+    reopened.close()
+
+
+class CountingAnalyzer(AsyncAIAnalyzer):
+    def __init__(self):
+        self.calls = 0
+
+    async def analyze_text(self, text, prompt):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return None if "fail" in text else "yes"
+
+    async def analyze_image(self, image_data, prompt):
+        return "no"
+
+    async def aclose(self):
+        pass
+
+
+def test_caching_analyzer_merges_concurrent_requests_and_skips_none():
+    async def scenario():
+        analyzer = CountingAnalyzer()
+        caching = CachingAnalyzer(analyzer, VerdictCache(), model="m")
+        results = await asyncio.gather(*(caching.analyze_text("张三 21:52 你好", "p") for _ in range(3)))
+        again = await caching.analyze_text("张三 08:00 你好", "p")
+        failed = [await caching.analyze_text("fail", "p") for _ in range(2)]
+        return results, again, failed, analyzer.calls
+
+    results, again, failed, calls = asyncio.run(scenario())
+    assert results == ["yes"] * 3 and again == "yes"
+    # 失败（None）不写入缓存，下次重新请求
+    assert failed == [None, None]
+    assert calls == 3
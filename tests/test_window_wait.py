@@ -0,0 +1,161 @@
+# 单元测试 - 等待窗口出现/消失，详情窗口 打开-截图-关闭 的重试、截止时间与串行化
+
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from config.settings import Settings
+from core.window_manager import WindowManager
+from services import screenshot_service
+from services.screenshot_service import ScreenshotService
+
+
+class DelayedWindowManager(WindowManager):
+    """窗口在 visible_from 到 visible_until 之间存在"""
+
+    def __init__(self, visible_from, visible_until=float("inf")):
+        self.visible_from = visible_from
+        self.visible_until = visible_until
+        self.finds = 0
+
+    def find_window(self, title):
+        self.finds += 1
+        now = time.monotonic()
+        return {"hwnd": 3} if self.visible_from <= now < self.visible_until else None
+
+    def capture_screenshot(self, hwnd, region=None):
+        return None
+
+    def simulate_click(self, hwnd, x, y):
+        pass
+
+
+def test_wait_for_window_returns_as_soon_as_it_appears():
+    manager = DelayedWindowManager(time.monotonic() + 0.05)
+    start = time.monotonic()
+    info = asyncio.run(manager.wait_for_window("details", timeout=1.0, poll_interval=0.01))
+    assert info == {"hwnd": 3}
+    assert time.monotonic() - start < 0.5
+
+
+def test_wait_for_window_times_out():
+    manager = DelayedWindowManager(float("inf"))
+    assert asyncio.run(manager.wait_for_window("details", timeout=0.05, poll_interval=0.01)) is None
+    assert manager.finds >= 3
+
+
+def test_wait_for_window_closed():
+    now = time.monotonic()
+    assert asyncio.run(DelayedWindowManager(now, now + 0.03).wait_for_window_closed("details", 1.0, 0.01))
+    assert not asyncio.run(DelayedWindowManager(now).wait_for_window_closed("details", 0.03, 0.01))
+
+
+MAIN, DETAILS = 1, 2
+# 主窗口高 600：点击聊天框中心 y = 600 - 100 + 20，点击空白处 y = 600 - 300
+OPEN_Y, BLANK_Y = 520, 300
+
+
+class DetailsWindowManager(WindowManager):
+    """第 open_after 次点击聊天框后详情窗口出现，第 close_after 次点击关闭按钮后消失"""
+
+    def __init__(self, open_after=1, close_after=1):
+        self.open_after = open_after
+        self.close_after = close_after
+        self.open_clicks = self.close_clicks = 0
+        self.details_open = False
+        self.events = []
+
+    def find_window(self, title):
+        if title == "main":
+            return {"hwnd": MAIN, "width": 800, "height": 600}
+        return {"hwnd": DETAILS, "width": 400, "height": 300} if self.details_open else None
+
+    def capture_screenshot(self, hwnd, region=None):
+        return Image.new("RGB", (40, 30), "white")
+
+    def simulate_click(self, hwnd, x, y):
+        if hwnd == MAIN and y == BLANK_Y:
+            self.events.append("blank")
+        elif hwnd == MAIN:
+            self.events.append("open")
+            self.open_clicks += 1
+            self.details_open = self.details_open or self.open_clicks >= self.open_after
+        else:
+            self.events.append("close")
+            self.close_clicks += 1
+            if self.close_clicks >= self.close_after:
+                self.details_open = False
+                self.open_clicks = self.close_clicks = 0
+
+
+class FakeImageProcessor:
+    def __init__(self):
+        self.saved = []
+
+    def save_image(self, image, folder, grayscale=False):
+        self.saved.append(image)
+
+
+def make_service(monkeypatch, manager, **details_window):
+    options = {"open_timeout": 0.1, "close_timeout": 0.1, "poll_interval": 0.01, "retries": 1, "deadline": 2.0}
+    settings = Settings.from_dict({
+        "app": {"window_title": "main", "details_window_title": "details"},
+        "chat_box": {"x": 10, "y_offset": -100, "width": 80, "height": 40},
+        "details_window": {**options, **details_window},
+    })
+    monkeypatch.setattr(screenshot_service, "CONFIG", SimpleNamespace(snapshot=settings))
+    return ScreenshotService(manager, FakeImageProcessor(), settings.targets[0])
+
+
+def test_capture_details_retries_open_click(monkeypatch):
+    manager = DetailsWindowManager(open_after=2)
+    service = make_service(monkeypatch, manager)
+    screenshot = asyncio.run(service.capture_details())
+    assert screenshot is not None and screenshot.mode == "L"
+    assert manager.events == ["open", "open", "close", "blank"]
+    assert service.image_processor.saved == [screenshot]
+
+
+def test_capture_details_gives_up_at_deadline_and_releases_lock(monkeypatch):
+    manager = DetailsWindowManager(open_after=float("inf"))
+    service = make_service(monkeypatch, manager, retries=10, deadline=0.25)
+
+    async def run():
+        start = time.monotonic()
+        result = await service.capture_details()
+        return result, time.monotonic() - start
+
+    result, elapsed = asyncio.run(run())
+    assert result is None
+    assert elapsed < 0.5
+    assert 2 <= manager.events.count("open") <= 4  # 受截止时间限制，没有用完 10 次重试
+    assert not service._details_lock.locked()
+    manager.open_after = 1
+    assert asyncio.run(service.capture_details()) is not None
+
+
+def test_capture_details_retries_close_click(monkeypatch):
+    manager = DetailsWindowManager(close_after=2)
+    service = make_service(monkeypatch, manager)
+    assert asyncio.run(service.capture_details()) is not None
+    assert manager.events == ["open", "close", "close", "blank"]
+    assert not manager.details_open
+
+
+def test_capture_details_serializes_calls_for_the_same_target(monkeypatch):
+    manager = DetailsWindowManager(open_after=2, close_after=2)
+    service = make_service(monkeypatch, manager)
+
+    async def run():
+        return await asyncio.gather(service.capture_details(), service.capture_details())
+
+    results = asyncio.run(run())
+    assert all(result is not None for result in results)
+    # 第二次交互在第一次点击空白处之后才开始，点击没有交错
+    assert manager.events == ["open", "open", "close", "close", "blank"] * 2